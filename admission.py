@@ -0,0 +1,104 @@
+##This is the file where admission control for LLM-bound questions is defined.
+# A bounded number of questions run at once; the rest wait in per-user queues served round-robin, with a deadline.
+
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+from metrics import METRICS
+
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_QUEUE_TIMEOUT = 30.0  # seconds a question may wait for a slot
+
+
+class Overloaded(Exception):
+    """Raised when a question cannot be admitted: the queue is full or its deadline passed."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Service busy ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    def __init__(self, user: str):
+        self.user = user
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded queue, a wait deadline and per-user fairness.
+    Slots freed by finished questions go to queued users in turn, so one user sending
+    many questions cannot starve the others. When the queue is full new questions are
+    rejected at once instead of waiting. Limits default to ADMISSION_MAX_CONCURRENT,
+    ADMISSION_QUEUE_SIZE and ADMISSION_QUEUE_TIMEOUT (seconds)."""
+
+    def __init__(self, max_concurrent: Optional[int] = None, queue_size: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        self.max_concurrent = max_concurrent or int(os.getenv("ADMISSION_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT))
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv("ADMISSION_QUEUE_SIZE", DEFAULT_QUEUE_SIZE))
+        self.queue_timeout = queue_timeout or float(os.getenv("ADMISSION_QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT))
+        self.active = 0
+        self._queued = 0
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, user: str):
+        """Hold a slot for the enclosed block, waiting in the user's queue if all slots are taken."""
+        self._acquire(user)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, user: str):
+        with self._lock:
+            if self.active < self.max_concurrent and self._queued == 0:
+                self.active += 1
+                METRICS.increment("admission_admitted")
+                return
+            if self._queued >= self.queue_size:
+                METRICS.increment("admission_rejected")
+                raise Overloaded("queue_full", self.queue_timeout)
+            waiter = _Waiter(user)
+            self._queues.setdefault(user, deque()).append(waiter)
+            self._queued += 1
+
+        with METRICS.span("admission_wait"):
+            waiter.event.wait(self.queue_timeout)
+        with self._lock:
+            if waiter.admitted:  # possibly just as the deadline passed
+                METRICS.increment("admission_admitted")
+                return
+            queue = self._queues[user]
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[user]
+            self._queued -= 1
+        METRICS.increment("admission_timeouts")
+        raise Overloaded("deadline", self.queue_timeout)
+
+    def _release(self):
+        with self._lock:
+            self.active -= 1
+            # Hand free slots to the user at the head of the rotation, then move that user to the back
+            while self.active < self.max_concurrent and self._queues:
+                user, queue = next(iter(self._queues.items()))
+                waiter = queue.popleft()
+                del self._queues[user]
+                if queue:
+                    self._queues[user] = queue
+                self._queued -= 1
+                self.active += 1
+                waiter.admitted = True
+                waiter.event.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"active": self.active, "queued": self._queued, "waiting_users": len(self._queues),
+                    "max_concurrent": self.max_concurrent, "queue_size": self.queue_size}
@@ -1,12 +1,30 @@
 ##This is the file where the agent is defined using OPEN AI GPT-4o model
 
-from langchain_openai import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
 from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate, ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from pdf_processor import PDFProcessor
-from typing import Dict, Any, Optional
+from retrieval import VectorStoreSearchRetriever, search_options
+from document_router import DocumentRouter, DEFAULT_ROUTE_DOCUMENTS
+from corpus_registry import CorpusRegistry
+from intent_router import IntentRouter, GREETING, OFF_TOPIC
+from metrics import METRICS
+from token_accounting import LEDGER, TokenBudget, estimate_tokens
+from llm_callbacks import StageTimingHandler, TokenUsageHandler
+from http_clients import get_http_client, warm_up_in_background
+from single_flight import SingleFlight
+from admission import AdmissionController, Overloaded
+from summary_index import SummaryIndex, is_broad_question
+from table_store import TableStore
+from clause_index import ClauseIndex, MAX_ANSWER_CLAUSES
+from request_log import RequestLog
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+import os
+import time
+import uuid
+import openai
 import logging
+import threading
 
 # Define the system prompt for the aviation agent
 SYSTEM_PROMPT = """You are an expert Aviation Planning Assistant with deep knowledge of airport design, planning, and regulatory compliance. Your role is to:
@@ -27,12 +45,79 @@ Guidelines for responses:
 
 Remember: You can only answer based on the information in the provided documents. If you're unsure or the information isn't available, say so clearly."""
 
+# Chunks retrieved per question: between RETRIEVAL_MIN_K and RETRIEVAL_K, dropping chunks that score
+# more than RETRIEVAL_SCORE_MARGIN below the best one or under RETRIEVAL_SCORE_THRESHOLD
+RETRIEVAL_K = 4
+RETRIEVAL_MIN_K = 2
+RETRIEVAL_SCORE_MARGIN = 0.1
+
+# Rough sizes used to estimate a query's tokens before it is sent
+CHUNK_TOKENS_ESTIMATE = 250  # 1000-character chunks
+CONDENSE_OVERHEAD_TOKENS = 100
+EXPECTED_COMPLETION_TOKENS = 500
+
+# Conversation memories kept for the most recently active sessions
+MAX_SESSION_HISTORIES = 1000
+
+# Broad questions ("What is this document about?") are answered from document summaries
+SUMMARY_CONTEXT_CHARS = 6000
+SUMMARY_PROMPT = """You are an Aviation Planning Assistant. Using only the document summaries below, give a short
+overview that answers the question. Name the documents you describe, and say if the summaries do not cover it."""
+
+BUSY_ANSWER = ("The assistant is handling more questions than it can answer right now, so yours was not sent. "
+               "Please try again in a moment.")
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation do not make two questions different."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
 class AviationAgent:
-    def __init__(self, openai_api_key: str):
-        """Initialize the aviation agent with OpenAI API key."""
+    def __init__(self, openai_api_key: str, openai_base_url: Optional[str] = None,
+                 pdf_processor: Optional[PDFProcessor] = None, token_budget: Optional[TokenBudget] = None):
+        """Initialize the aviation agent with OpenAI API key.
+        openai_base_url (default: the OPENAI_BASE_URL environment variable) points the
+        chat client at a compatible endpoint such as the local fake server.
+        token_budget (default: TOKEN_BUDGET_* environment variables) limits tokens per
+        query and per session; over-budget questions are downgraded or refused.
+        Each query is routed to the ROUTE_DOCUMENTS (default 2) most relevant documents
+        before chunk search; 0 searches every document. The number of chunks adapts to
+        their relevance scores (RETRIEVAL_MIN_K, RETRIEVAL_MAX_K, RETRIEVAL_SCORE_THRESHOLD
+        and RETRIEVAL_SCORE_MARGIN). Named corpora from CORPORA_FILE
+        can be targeted per question; the loaded documents are the "default" corpus.
+        Chat and embeddings calls share one keep-alive connection pool (see http_clients.py),
+        warmed while the documents load when HTTP_WARMUP is true.
+        Identical questions asked while one is already being answered wait for that
+        answer instead of running retrieval and completion again. At most
+        ADMISSION_MAX_CONCURRENT questions call the LLM at once; others queue per session
+        and get a "busy" answer when the queue is full or their wait times out.
+        Questions naming a row of an extracted standards table are answered from the
+        table directly, without an LLM call (disable with TABLE_LOOKUP=false). Questions
+        citing a section or paragraph number ("paragraph 305", "AC 150/5300-13B section
+        3.2.1") get that clause's text from the clause index (disable with CLAUSE_LOOKUP=false).
+        With REQUEST_LOG set, every question is appended to that JSONL file with its
+        timings, for replay by benchmark_replay.py."""
         self.openai_api_key = openai_api_key
-        self.pdf_processor = PDFProcessor(openai_api_key)
+        self.openai_base_url = openai_base_url or os.getenv("OPENAI_BASE_URL")
+        self.token_budget = token_budget or TokenBudget.from_env()
+        self.pdf_processor = pdf_processor or PDFProcessor(openai_api_key, openai_base_url=self.openai_base_url,
+                                                           token_budget=self.token_budget)
         self.vector_store = None
+        self.router = None
+        self.route_documents = int(os.getenv("ROUTE_DOCUMENTS", DEFAULT_ROUTE_DOCUMENTS))
+        self.retrieval_min_k = int(os.getenv("RETRIEVAL_MIN_K", RETRIEVAL_MIN_K))
+        self.retrieval_max_k = int(os.getenv("RETRIEVAL_MAX_K", RETRIEVAL_K))
+        self.score_threshold = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", 0.0))
+        self.score_margin = float(os.getenv("RETRIEVAL_SCORE_MARGIN", RETRIEVAL_SCORE_MARGIN))
+        self.corpora = CorpusRegistry(self.pdf_processor)
+        self.intent_router = IntentRouter.from_env()
+        self.llm = None
+        self.warm_up_thread = None
+        self.single_flight = SingleFlight("questions_coalesced")
+        self.corpus_version = 0
+        self.admission = AdmissionController()
+        self.table_lookup = os.getenv("TABLE_LOOKUP", "true").lower() not in ("0", "false", "no")
+        self.clause_lookup = os.getenv("CLAUSE_LOOKUP", "true").lower() not in ("0", "false", "no")
+        self.request_log = RequestLog.from_env()
         self.qa_chain = None
         self.setup_logging()
         
@@ -51,11 +136,15 @@ class AviationAgent:
             Answer: Let me help you with that based on the aviation design documents:""")
         ])
         
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="answer"
-        )
+        self.summary_template = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(SUMMARY_PROMPT),
+            HumanMessagePromptTemplate.from_template("Document summaries:\n{context}\n\nQuestion: {question}")
+        ])
+        
+        self.memory = self._new_memory()  # the default session's
+        self.session_memories: "OrderedDict[str, ConversationBufferMemory]" = OrderedDict()
+        self._memories_lock = threading.Lock()
+        self.prompt_overhead_tokens = estimate_tokens(SYSTEM_PROMPT) + 100
 
     def setup_logging(self):
         """Setup logging configuration."""
@@ -68,27 +157,44 @@ class AviationAgent:
     def load_documents(self, pdf_path: Optional[str] = None, directory_path: Optional[str] = None) -> bool:
         """Load documents from either a single PDF or a directory of PDFs.
         Returns True if successful, False otherwise."""
+        if self.warm_up_thread is None:
+            # Open the API connection while the index loads
+            self.warm_up_thread = warm_up_in_background(self.openai_api_key, self.openai_base_url)
         try:
             if pdf_path:
                 self.vector_store = self.pdf_processor.process_pdf(pdf_path)
+            elif directory_path:
+                self.vector_store = self.pdf_processor.process_directory(directory_path)
             else:
                 self.vector_store = self.pdf_processor.process_pdf(None)
                 
             if not self.vector_store:
                 self.logger.error("Failed to create vector store from documents")
                 return False
+            
+            # Per-document centroids and indexes for two-stage retrieval
+            self.router = DocumentRouter.from_vector_store(self.vector_store)
+            if self.router is None:
+                self.logger.warning("Chunks have no source documents; every query searches all chunks "
+                                    "(rebuild the cache to enable document routing)")
+            self.corpora.pin("default", self.vector_store, self.router)
+            self.corpus_version += 1  # in-flight answers from the old documents are not shared
                 
+            from langchain.chains import ConversationalRetrievalChain
+            
             # Initialize QA chain with custom prompt
             self.qa_chain = ConversationalRetrievalChain.from_llm(
-                llm=ChatOpenAI(
-                    temperature=0.3,  # Lower temperature for more focused, policy-based responses
-                    openai_api_key=self.openai_api_key,
-                    model_name="gpt-4o-mini"
-                ),
-                retriever=self.vector_store.as_retriever(
-                    search_kwargs={"k": 4}  # Retrieve top 4 most relevant chunks
+                llm=self.get_llm(),
+                retriever=VectorStoreSearchRetriever(
+                    vector_store=self.vector_store,
+                    k=self.retrieval_max_k,  # Retrieve up to 4 relevant chunks
+                    min_k=self.retrieval_min_k,
+                    score_threshold=self.score_threshold,
+                    score_margin=self.score_margin,
+                    router=self.router,
+                    route_documents=self.route_documents,
+                    registry=self.corpora
                 ),
-                memory=self.memory,
                 return_source_documents=True,
                 combine_docs_chain_kwargs={"prompt": self.qa_template}
             )
@@ -98,43 +204,356 @@ class AviationAgent:
             self.logger.error(f"Error loading documents: {str(e)}")
             return False
     
-    def ask_question(self, question: str) -> Dict[str, Any]:
-        """Ask a question about the loaded documents."""
+    def get_llm(self):
+        """The chat model used to condense and answer questions, created once and reused
+        by every chain; its requests go through the shared connection pool."""
+        if self.llm is None:
+            from langchain_openai import ChatOpenAI
+            self.llm = ChatOpenAI(
+                temperature=0.3,  # Lower temperature for more focused, policy-based responses
+                openai_api_key=self.openai_api_key,
+                openai_api_base=self.openai_base_url,
+                model_name="gpt-4o-mini",
+                http_client=get_http_client()
+            )
+        return self.llm
+    
+    def ask_question(self, question: str, session_id: Optional[str] = None,
+                     documents: Optional[List[str]] = None, corpora: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Ask a question about the loaded documents.
+        Token usage is recorded for the query and for session_id; the result's "usage"
+        field holds the query's totals. documents (file names, see get_document_names)
+        restricts retrieval to those documents instead of routing automatically.
+        corpora (see get_corpus_names) searches those corpora instead of the loaded documents.
+        A result shared from an identical question already in flight has "coalesced" set;
+        its usage belongs to the query that ran."""
         if not self.qa_chain:
             raise ValueError("No documents loaded. Please load documents first using load_documents().")
         
-        # Check if this is a casual greeting or non-aviation question
-        casual_greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening", "how are you", "what's up"]
-        question_lower = question.lower().strip()
+        arrived_at = time.time()
+        error = None
+        try:
+            with METRICS.trace(session_id or "default") as trace, METRICS.span("ask_question"):
+                return self._answer_question(question, trace, session_id or "default", documents, corpora)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            if self.request_log is not None:
+                self.request_log.record(question, trace, arrived_at, session_id or "default", documents, corpora, error)
+    
+    def get_corpus_names(self) -> List[str]:
+        """Get the names of the corpora that questions can target."""
+        return self.corpora.names()
+    
+    def get_document_names(self, corpora: Optional[List[str]] = None) -> List[str]:
+        """Get the file names of the documents that questions can be restricted to,
+        in the loaded documents or in the given corpora (which are loaded if needed)."""
+        if not corpora:
+            return list(self.router.sources) if self.router else []
+        names = set()
+        for name in corpora:
+            router = self.corpora.get(name).router
+            if router is not None:
+                names.update(router.sources)
+        return sorted(names)
+    
+    @staticmethod
+    def _new_memory() -> ConversationBufferMemory:
+        return ConversationBufferMemory(memory_key="chat_history", return_messages=True, output_key="answer")
+    
+    def get_session_memory(self, session_id: Optional[str] = None) -> ConversationBufferMemory:
+        """The conversation memory of one session (self.memory for the default session).
+        Only the MAX_SESSION_HISTORIES most recently active sessions keep their history."""
+        if not session_id or session_id == "default":
+            return self.memory
+        with self._memories_lock:
+            memory = self.session_memories.get(session_id)
+            if memory is None:
+                memory = self.session_memories[session_id] = self._new_memory()
+                while len(self.session_memories) > MAX_SESSION_HISTORIES:
+                    self.session_memories.popitem(last=False)
+            else:
+                self.session_memories.move_to_end(session_id)
+            return memory
+    
+    def _estimate_query_tokens(self, question: str, k: int, messages: list) -> int:
+        """Estimate the prompt and completion tokens the chain will use for a question
+        with the given history."""
+        history_tokens = estimate_tokens("\n".join(str(m.content) for m in messages))
+        question_tokens = estimate_tokens(question)
+        tokens = self.prompt_overhead_tokens + history_tokens + question_tokens + k * CHUNK_TOKENS_ESTIMATE
+        if history_tokens:
+            # The condense-question call sends the history and question once more
+            tokens += CONDENSE_OVERHEAD_TOKENS + history_tokens + question_tokens
+        return tokens + EXPECTED_COMPLETION_TOKENS
+    
+    def _apply_token_budget(self, question: str, session_id: str) -> Tuple[int, Optional[str]]:
+        """Fit a question into its budgets by trimming the session's old history and retrieving
+        fewer chunks. Returns the k to use and a budget action: None, "downgraded" or "refused"."""
+        k = self.retrieval_max_k
+        action = None
+        messages = self.get_session_memory(session_id).chat_memory.messages
+        estimate = self._estimate_query_tokens(question, k, messages)
+        query_limit = self.token_budget.query_tokens
+        if query_limit and estimate > query_limit:
+            while estimate > query_limit and messages:
+                del messages[:2]  # oldest question and answer
+                action = "downgraded"
+                estimate = self._estimate_query_tokens(question, k, messages)
+            while estimate > query_limit and k > 1:
+                k -= 1
+                action = "downgraded"
+                estimate = self._estimate_query_tokens(question, k, messages)
+            if estimate > query_limit:
+                return k, "refused"
+        
+        session_limit = self.token_budget.session_tokens
+        if session_limit:
+            used = LEDGER.get_usage(f"session:{session_id}")["total_tokens"]
+            if used + estimate > session_limit:
+                return k, "refused"
+        return k, action
+    
+    def _answer_question(self, question: str, trace: Dict[str, Any], session_id: str,
+                         documents: Optional[List[str]] = None,
+                         corpora: Optional[List[str]] = None) -> Dict[str, Any]:
+        if corpora:
+            unknown = [name for name in corpora if name not in self.get_corpus_names()]
+            if unknown:
+                trace["route"] = "unknown_corpus"
+                return {
+                    "answer": f"I couldn't find the corpus {', '.join(unknown)}. Available corpora: {', '.join(self.get_corpus_names())}.",
+                    "source_documents": []
+                }
+        
+        if documents:
+            unknown = [name for name in documents if name not in self.get_document_names(corpora)]
+            if unknown:
+                trace["route"] = "unknown_document"
+                available = ", ".join(self.get_document_names(corpora)) or "none"
+                return {
+                    "answer": f"I couldn't find {', '.join(unknown)} among the loaded documents. Available documents: {available}.",
+                    "source_documents": []
+                }
         
-        # If it's a casual greeting, respond conversationally
-        if any(greeting in question_lower for greeting in casual_greetings):
+        # Cited clauses ("what does paragraph 305 say") are quoted from the clause index, with no LLM call
+        if self.clause_lookup:
+            with METRICS.span("clause_lookup"):
+                clause_matches = self._lookup_clauses(question, documents, corpora)
+            if clause_matches:
+                trace["route"] = "clause"
+                return self._clause_response(question, session_id, clause_matches)
+        
+        # Table lookups ("runway width for ADG III") are answered directly, with no LLM call
+        if self.table_lookup:
+            with METRICS.span("table_lookup"):
+                table_result = self._lookup_table(question, documents, corpora)
+            if table_result is not None:
+                trace["route"] = "table"
+                return self._table_response(question, session_id, table_result)
+        
+        # Greetings and off-topic questions get a canned answer; cited clauses and table lookups
+        # are checked first, so "Hello, what does paragraph 305 say?" is still answered
+        intent = self.intent_router.route(question)
+        if intent == GREETING:
+            trace["route"] = "greeting"
             return {
                 "answer": "Hello! I'm the Arup Aviation Intelligence assistant. I'm here to help you with questions about aviation planning, airport design, and regulatory compliance. What would you like to know about aviation standards or planning requirements?",
                 "source_documents": []
             }
         
-        # Check if the question is clearly not aviation-related
-        non_aviation_keywords = ["weather", "news", "sports", "food", "movie", "music", "travel", "shopping"]
-        if any(keyword in question_lower for keyword in non_aviation_keywords) and not any(aviation_word in question_lower for aviation_word in ["airport", "aviation", "aircraft", "runway", "taxiway", "terminal", "airspace", "navigation", "approach", "departure"]):
+        if intent == OFF_TOPIC:
+            trace["route"] = "off_topic"
             return {
                 "answer": "I'm specialized in aviation planning and airport design. I can help you with questions about aviation standards, airport infrastructure, regulatory compliance, and planning requirements. Is there something specific about aviation you'd like to know?",
                 "source_documents": []
             }
         
-        try:
-            response = self.qa_chain.invoke({"question": question})
+        k, budget_action = self._apply_token_budget(question, session_id)
+        if budget_action == "refused":
+            trace["route"] = "budget_refused"
+            METRICS.increment("budget_refusals")
             return {
-                "answer": response["answer"],
-                "source_documents": response["source_documents"]
+                "answer": "This question would exceed the token budget for this query or session, so it was not sent. Please ask a shorter question or start a new session.",
+                "source_documents": [],
+                "budget_action": budget_action
             }
+        
+        # Broad questions are answered from the document summaries with a small prompt
+        summary_index = self._get_summary_index(corpora) if is_broad_question(question) else None
+        if summary_index is not None and summary_index.document_summaries(documents):
+            trace["route"] = "summary"
+            run = lambda: self._run_summary(question, session_id, summary_index, budget_action, documents)
+        else:
+            trace["route"] = "retrieval"
+            run = lambda: self._run_retrieval(question, session_id, k, budget_action, documents, corpora)
+        # Concurrent identical questions against the same documents share one run;
+        # a question that follows earlier turns is condensed with them, so it is not shared
+        memory = self.get_session_memory(session_id)
+        key = (trace["route"], normalize_question(question), tuple(sorted(documents or [])),
+               tuple(sorted(corpora or [])), k, self.corpus_version,
+               session_id if memory.chat_memory.messages else None)
+        result, shared = self.single_flight.do(key, run)
+        if result.get("busy"):
+            trace["route"] = "busy"
+        if "query_id" in result:  # answered, not busy or failed
+            memory.save_context({"question": question}, {"answer": result["answer"]})
+        if shared:
+            trace["coalesced"] = True
+            return dict(result, source_documents=list(result["source_documents"]), coalesced=True)
+        return result
+    
+    def _get_stores(self, corpora: Optional[List[str]] = None) -> List[Any]:
+        """The vector stores a question searches: the loaded documents or the given corpora."""
+        return [self.corpora.get(name).vector_store for name in corpora] if corpora else [self.vector_store]
+    
+    def _lookup_table(self, question: str, documents: Optional[List[str]] = None,
+                      corpora: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Match the question to a row of the tables extracted from the searched documents."""
+        table_stores = [getattr(vector_store, "table_store", None) for vector_store in self._get_stores(corpora)]
+        table_stores = [table_store for table_store in table_stores if table_store]
+        if not table_stores:
+            return None
+        table_store = table_stores[0] if len(table_stores) == 1 else \
+            TableStore([table for table_store in table_stores for table in table_store.tables])
+        return table_store.lookup(question, documents or None)
+    
+    def _lookup_clauses(self, question: str, documents: Optional[List[str]] = None,
+                        corpora: Optional[List[str]] = None) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Resolve section and paragraph numbers cited in the question against the searched documents."""
+        clause_indexes = [getattr(vector_store, "clause_index", None) for vector_store in self._get_stores(corpora)]
+        clause_indexes = [clause_index for clause_index in clause_indexes if clause_index]
+        if not clause_indexes:
+            return []
+        clause_index = clause_indexes[0] if len(clause_indexes) == 1 else \
+            ClauseIndex({source: clauses for index in clause_indexes for source, clauses in index.documents.items()})
+        return clause_index.resolve(question, documents or None)
+    
+    def _clause_response(self, question: str, session_id: str,
+                         matches: List[Tuple[str, str, Dict[str, Any]]]) -> Dict[str, Any]:
+        from langchain_core.documents import Document
+        METRICS.increment("clause_answers")
+        answer = ClauseIndex.format_answer(matches)
+        self.get_session_memory(session_id).save_context({"question": question}, {"answer": answer})
+        return {
+            "answer": answer,
+            "source_documents": [Document(page_content=entry["text"],
+                                          metadata={"source": source, "clause": number, "level": "clause"})
+                                 for source, number, entry in matches[:MAX_ANSWER_CLAUSES]],
+            "level": "clause"
+        }
+    
+    def _table_response(self, question: str, session_id: str, table_result: Dict[str, Any]) -> Dict[str, Any]:
+        from langchain_core.documents import Document
+        METRICS.increment("table_answers")
+        answer = TableStore.format_answer(table_result)
+        self.get_session_memory(session_id).save_context({"question": question}, {"answer": answer})
+        return {
+            "answer": answer,
+            "source_documents": [Document(page_content=TableStore.format_table(table),
+                                          metadata={"source": table["source"], "table": table["table"], "level": "table"})
+                                 for table in table_result["tables"]],
+            "level": "table"
+        }
+    
+    def _get_summary_index(self, corpora: Optional[List[str]] = None) -> Optional[SummaryIndex]:
+        """The summaries of the loaded documents or of the given corpora, if every index has them."""
+        indexes = [getattr(vector_store, "summary_index", None) for vector_store in self._get_stores(corpora)]
+        if not indexes or any(index is None for index in indexes):
+            return None
+        if len(indexes) == 1:
+            return indexes[0]
+        return SummaryIndex({source: entry for index in indexes for source, entry in index.documents.items()})
+    
+    def _run_guarded(self, session_id: str, run) -> Dict[str, Any]:
+        """Run an LLM-bound answer under admission control, turning overload and errors into answers."""
+        try:
+            with self.admission.admit(session_id):
+                return run()
+        except Overloaded as e:
+            self.logger.warning(f"Question not admitted: {e.reason}")
+            return self._busy_response(e.retry_after)
         except Exception as e:
+            if isinstance(e, openai.RateLimitError):  # the API is overloaded too, after the client's retries
+                METRICS.increment("rate_limited")
+                return self._busy_response(self.admission.queue_timeout)
+            METRICS.increment("question_errors")
             self.logger.error(f"Error processing question: {str(e)}")
             return {
                 "answer": "I apologize, but I encountered an error while processing your question. Please try again.",
                 "source_documents": []
             }
     
-    def get_chat_history(self) -> list:
-        """Get the conversation history."""
-        return self.memory.chat_memory.messages 
\ No newline at end of file
+    def _run_retrieval(self, question: str, session_id: str, k: int, budget_action: Optional[str],
+                       documents: Optional[List[str]], corpora: Optional[List[str]]) -> Dict[str, Any]:
+        """Answer a question with the retrieval chain and the session's history, recording usage
+        for the query and session."""
+        query_id = uuid.uuid4().hex
+        scopes = [f"query:{query_id}", f"session:{session_id}"]
+        history = list(self.get_session_memory(session_id).chat_memory.messages)
+        
+        def run():
+            with search_options(k=k, usage_scopes=scopes, documents=documents or None, corpora=corpora or None):
+                response = self.qa_chain.invoke(
+                    {"question": question, "chat_history": history},
+                    config={"callbacks": [StageTimingHandler(), TokenUsageHandler(scopes)]}
+                )
+            return {
+                "answer": response["answer"],
+                "source_documents": response["source_documents"],
+                "scores": [document.metadata.get("score") for document in response["source_documents"]],
+                "query_id": query_id,
+                "usage": LEDGER.get_usage(f"query:{query_id}"),
+                "budget_action": budget_action
+            }
+        return self._run_guarded(session_id, run)
+    
+    def _run_summary(self, question: str, session_id: str, summary_index: SummaryIndex,
+                     budget_action: Optional[str], documents: Optional[List[str]]) -> Dict[str, Any]:
+        """Answer a broad question from document summaries in one small completion."""
+        query_id = uuid.uuid4().hex
+        scopes = [f"query:{query_id}", f"session:{session_id}"]
+        summaries = summary_index.document_summaries(documents)
+        # Many documents share the context budget, so each summary is shortened
+        per_document = max(300, SUMMARY_CONTEXT_CHARS // max(1, len(summaries)))
+        context = "\n\n".join(f"[{summary.metadata['source']}]\n{summary.page_content[:per_document]}"
+                               for summary in summaries)
+        
+        def run():
+            with METRICS.span("summary_answer"):
+                message = self.get_llm().invoke(
+                    self.summary_template.format_messages(context=context, question=question),
+                    config={"callbacks": [TokenUsageHandler(scopes)]}
+                )
+            METRICS.increment("summary_answers")
+            return {
+                "answer": message.content,
+                "source_documents": summaries,
+                "level": "summary",
+                "query_id": query_id,
+                "usage": LEDGER.get_usage(f"query:{query_id}"),
+                "budget_action": budget_action
+            }
+        return self._run_guarded(session_id, run)
+    
+    def _busy_response(self, retry_after: float) -> Dict[str, Any]:
+        METRICS.increment("busy_responses")
+        return {"answer": BUSY_ANSWER, "source_documents": [], "busy": True, "retry_after": retry_after}
+    
+    def get_session_usage(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get the token usage and estimated cost of a session."""
+        return LEDGER.get_usage(f"session:{session_id or 'default'}")
+    
+    def get_chat_history(self, session_id: Optional[str] = None) -> list:
+        """Get a session's conversation history."""
+        return self.get_session_memory(session_id).chat_memory.messages
+    
+    def clear_chat_history(self, session_id: Optional[str] = None):
+        """Forget one session's conversation history, or every session's."""
+        if session_id is not None:
+            self.get_session_memory(session_id).clear()
+            return
+        self.memory.clear()
+        with self._memories_lock:
+            self.session_memories.clear() 
\ No newline at end of file
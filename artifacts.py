@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Portable index artifacts: a cached index packed as one compressed, checksummed file.
+Cache keys depend only on PDF file names and contents, so an artifact exported from a
+build machine is found by any deployment serving the same PDFs, with no embedding calls.
+
+    python artifacts.py export                      # vector_cache index of test_pdfs -> index_artifacts/
+    python artifacts.py import index_artifacts/directory_<hash>.tar.gz
+    python artifacts.py verify index_artifacts/directory_<hash>.tar.gz
+"""
+
+import io
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import tarfile
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional
+
+ARTIFACT_FORMAT = 1
+ARTIFACT_SUFFIX = ".tar.gz"
+MANIFEST_NAME = "manifest.json"
+INDEX_PREFIX = "index/"
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_artifacts")
+
+
+class ArtifactError(Exception):
+    """An artifact that is unreadable, fails its checksums or does not match the cache."""
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def artifact_path(artifact_dir: str, cache_key: str) -> str:
+    return os.path.join(artifact_dir, f"{cache_key}{ARTIFACT_SUFFIX}")
+
+
+def export_artifact(cache_dir: str, cache_key: str, output_dir: str,
+                    sources: Optional[List[Dict[str, str]]] = None) -> str:
+    """Pack the cached index directory for cache_key into <output_dir>/<cache_key>.tar.gz.
+    The manifest records the SHA-256 of every file and, optionally, the PDFs it was built from.
+    Nothing time-dependent is stored, so the same index and sources always pack to the same bytes."""
+    index_dir = os.path.join(cache_dir, cache_key)
+    if not os.path.isdir(index_dir):
+        raise ArtifactError(f"No cached index {cache_key} in {cache_dir}")
+    names = sorted(name for name in os.listdir(index_dir) if os.path.isfile(os.path.join(index_dir, name)))
+    files = {}
+    contents = {}
+    for name in names:
+        with open(os.path.join(index_dir, name), 'rb') as f:
+            contents[name] = f.read()
+        files[name] = {"sha256": _sha256(contents[name]), "size": len(contents[name])}
+    manifest = {"format": ARTIFACT_FORMAT, "cache_key": cache_key, "files": files, "sources": sources or []}
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = artifact_path(output_dir, cache_key)
+    temp_path = f"{path}.tmp"
+    # The gzip header carries no file name or time, and tar entries keep TarInfo's fixed defaults
+    with open(temp_path, 'wb') as f, gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as gz, \
+            tarfile.open(fileobj=gz, mode="w") as tar:
+        for name, data in [(MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())] + \
+                          [(INDEX_PREFIX + name, contents[name]) for name in names]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    os.replace(temp_path, path)
+    return path
+
+
+def read_artifact(path: str) -> Dict[str, Any]:
+    """Read an artifact and check every file against the manifest checksums.
+    Returns the manifest with the file contents under "contents"."""
+    try:
+        with tarfile.open(path, "r:gz") as tar:
+            members = {member.name: member for member in tar.getmembers() if member.isfile()}
+            if MANIFEST_NAME not in members:
+                raise ArtifactError(f"{path} has no {MANIFEST_NAME}")
+            manifest = json.loads(tar.extractfile(members[MANIFEST_NAME]).read())
+            if manifest.get("format") != ARTIFACT_FORMAT:
+                raise ArtifactError(f"{path} has unsupported format {manifest.get('format')}")
+            # The key names the cache directory an import replaces, so it must be a plain directory name
+            cache_key = manifest.get("cache_key")
+            if not isinstance(cache_key, str) or os.path.basename(cache_key) != cache_key \
+                    or ".." in cache_key or cache_key in ("", "."):
+                raise ArtifactError(f"{path} has an invalid cache key {cache_key!r}")
+            contents = {}
+            for name, expected in manifest["files"].items():
+                # Names come from the manifest, never from archive paths, so nothing lands outside the cache
+                if os.path.basename(name) != name or name in ("", ".", ".."):
+                    raise ArtifactError(f"{path} lists an invalid file name {name!r}")
+                member = members.get(INDEX_PREFIX + name)
+                if member is None:
+                    raise ArtifactError(f"{path} is missing {name}")
+                data = tar.extractfile(member).read()
+                if len(data) != expected["size"] or _sha256(data) != expected["sha256"]:
+                    raise ArtifactError(f"{path}: checksum mismatch for {name}")
+                contents[name] = data
+    except (OSError, tarfile.TarError, ValueError, KeyError, EOFError) as e:
+        raise ArtifactError(f"Unreadable artifact {path}: {str(e)}") from e
+    manifest["contents"] = contents
+    return manifest
+
+
+def import_artifact(path: str, cache_dir: str, cache_key: Optional[str] = None) -> str:
+    """Verify an artifact and install its index into cache_dir, replacing any cached copy.
+    With cache_key, the artifact must be for that key. Returns the installed cache key."""
+    manifest = read_artifact(path)
+    if cache_key is not None and manifest["cache_key"] != cache_key:
+        raise ArtifactError(f"{path} holds index {manifest['cache_key']}, expected {cache_key}")
+    os.makedirs(cache_dir, exist_ok=True)
+    target = os.path.join(cache_dir, manifest["cache_key"])
+    staging = tempfile.mkdtemp(prefix=f".{manifest['cache_key']}_", dir=cache_dir)
+    try:
+        for name, data in manifest["contents"].items():
+            with open(os.path.join(staging, name), 'wb') as f:
+                f.write(data)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(staging, target)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return manifest["cache_key"]
+
+
+def _directory_sources(processor: Any, pdf_dir: str) -> List[Dict[str, str]]:
+    return [{"path": name, "hash": processor._get_file_hash(os.path.join(pdf_dir, name))}
+            for name in sorted(os.listdir(pdf_dir)) if name.endswith('.pdf')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, import and verify portable index artifacts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Pack the cached index of a PDF directory")
+    export_parser.add_argument("--pdf-dir", help="Directory of PDFs (default: the app's test_pdfs directory)")
+    export_parser.add_argument("--cache-dir", help="Vector cache directory (default: vector_cache)")
+    export_parser.add_argument("--output-dir", default=DEFAULT_ARTIFACT_DIR,
+                               help="Where to write the artifact (default: index_artifacts, "
+                                    "which the app imports from on a cache miss)")
+    import_parser = commands.add_parser("import", help="Verify an artifact and install it into the cache")
+    import_parser.add_argument("artifact")
+    import_parser.add_argument("--cache-dir", help="Vector cache directory (default: vector_cache)")
+    verify_parser = commands.add_parser("verify", help="Check an artifact's checksums")
+    verify_parser.add_argument("artifact")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "verify":
+            manifest = read_artifact(args.artifact)
+            print(f"✓ {args.artifact}: index {manifest['cache_key']}, {len(manifest['files'])} files, "
+                  f"built from {len(manifest['sources'])} PDFs")
+            return 0
+
+        from dotenv import load_dotenv
+        from pdf_processor import PDFProcessor
+        load_dotenv()
+        # The processor resolves the cache key the app would look up (extractor and embedding backend included)
+        processor = PDFProcessor(os.getenv("OPENAI_API_KEY", ""), cache_dir=args.cache_dir,
+                                 isolate_extraction=False)
+        if args.command == "import":
+            cache_key = import_artifact(args.artifact, processor.cache_dir)
+            print(f"✓ Installed index {cache_key} into {processor.cache_dir}")
+            return 0
+
+        pdf_dir = args.pdf_dir or processor.default_pdf_dir
+        if not processor.validate_directory(pdf_dir):
+            return 1
+        cache_key = processor._get_cache_key("directory", processor._get_directory_hash(pdf_dir))
+        if not os.path.isdir(os.path.join(processor.cache_dir, cache_key)):
+            print(f"❌ No cached index {cache_key} for {pdf_dir}; build it first with python build_index.py",
+                  file=sys.stderr)
+            return 1
+        path = export_artifact(processor.cache_dir, cache_key, args.output_dir, _directory_sources(processor, pdf_dir))
+        print(f"✓ Exported index {cache_key} to {path} ({os.path.getsize(path) / (1024 * 1024):.2f} MB)")
+        return 0
+    except ArtifactError as e:
+        print(f"❌ {str(e)}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Recall@k of reduced-dimension embeddings against the full-dimension baseline, with index size and search time.
+Embeds the corpus chunks and a query set once at full size, then compares each PCA size (and, with --native,
+the API's dimensions option) by how many of each query's full-dimension top-k chunks it still retrieves.
+Runs against the fake OpenAI server unless --base-url is given.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from fake_openai import FakeOpenAIServer
+from pdf_processor import PDFProcessor
+from reduced_embeddings import fit_projection
+from benchmark_pipeline import DEFAULT_PDF_DIR, DEFAULT_QUESTIONS, load_questions, percentile
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def search(documents: np.ndarray, queries: np.ndarray, k: int) -> Dict:
+    """Exact top-k with the flat L2 index the vector store uses; sizes and per-query latency."""
+    index = faiss.IndexFlatL2(documents.shape[1])
+    index.add(documents)
+    latencies = []
+    results = []
+    for query in queries:
+        start_time = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start_time)
+        results.append([i for i in ids[0] if i >= 0])
+    return {"ids": results, "index_bytes": len(faiss.serialize_index(index)),
+            "search_p50_us": round(percentile(latencies, 50) * 1e6, 1)}
+
+
+def recall_at_k(baseline: List[List[int]], candidate: List[List[int]], k: int) -> float:
+    """Mean share of each query's baseline top-k that the candidate also returns in its top-k."""
+    return float(np.mean([len(set(b[:k]) & set(c[:k])) / max(1, min(k, len(b))) for b, c in zip(baseline, candidate)]))
+
+
+def sample_queries(chunks: List[str], count: int, seed: int) -> List[str]:
+    """Pseudo-queries cut from random chunks (about 20 words each), to add to the question set."""
+    generator = random.Random(seed)
+    queries = []
+    for chunk in generator.sample(chunks, min(count, len(chunks))):
+        words = chunk.split()
+        start = generator.randrange(max(1, len(words) - 20))
+        queries.append(" ".join(words[start:start + 20]))
+    return queries
+
+
+def evaluate(processor: PDFProcessor, chunks: List[str], queries: List[str], dimensions: List[int],
+             k: int, native: bool) -> List[Dict]:
+    embeddings = processor.embeddings
+    start_time = time.perf_counter()
+    full_documents = _normalize(np.asarray(embeddings.embed_documents(chunks), dtype=np.float32))
+    full_queries = _normalize(np.asarray(embeddings.embed_documents(queries), dtype=np.float32))
+    embed_seconds = time.perf_counter() - start_time
+    baseline = search(full_documents, full_queries, k)
+    rows = [{"setting": "full", "dimensions": full_documents.shape[1], f"recall@{k}": 1.0,
+             "index_mb": round(baseline["index_bytes"] / 2 ** 20, 3), "search_p50_us": baseline["search_p50_us"],
+             "build_seconds": round(embed_seconds, 3)}]
+
+    for size in dimensions:
+        start_time = time.perf_counter()
+        projection = fit_projection(full_documents, size)
+        fit_seconds = time.perf_counter() - start_time
+        result = search(_normalize(full_documents @ projection.T), _normalize(full_queries @ projection.T), k)
+        rows.append({"setting": "pca", "dimensions": projection.shape[0],
+                     f"recall@{k}": round(recall_at_k(baseline["ids"], result["ids"], k), 4),
+                     "index_mb": round(result["index_bytes"] / 2 ** 20, 3), "search_p50_us": result["search_p50_us"],
+                     "build_seconds": round(fit_seconds, 3)})
+        if native:
+            native_processor = PDFProcessor(processor.openai_api_key, isolate_extraction=False,
+                                            embedding_backend="openai", openai_base_url=processor.openai_base_url,
+                                            pdf_dir=processor.default_pdf_dir, cache_dir=processor.cache_dir,
+                                            embedding_dimensions=size, embedding_reduction="native")
+            start_time = time.perf_counter()
+            native_documents = _normalize(np.asarray(native_processor.embeddings.embed_documents(chunks), dtype=np.float32))
+            native_queries = _normalize(np.asarray(native_processor.embeddings.embed_documents(queries), dtype=np.float32))
+            embed_seconds = time.perf_counter() - start_time
+            result = search(native_documents, native_queries, k)
+            rows.append({"setting": "native", "dimensions": size,
+                         f"recall@{k}": round(recall_at_k(baseline["ids"], result["ids"], k), 4),
+                         "index_mb": round(result["index_bytes"] / 2 ** 20, 3),
+                         "search_p50_us": result["search_p50_us"], "build_seconds": round(embed_seconds, 3)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall of reduced-dimension embeddings against full dimensions")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory of PDFs to index")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[64, 128, 256, 512], help="Reduced sizes")
+    parser.add_argument("--k", type=int, default=4, help="Chunks retrieved per query")
+    parser.add_argument("--questions", help="File with one question per line (or JSONL with a question field)")
+    parser.add_argument("--sample-queries", type=int, default=100,
+                        help="Also query with this many passages cut from random chunks")
+    parser.add_argument("--native", action="store_true",
+                        help="Also embed with the API's dimensions option (text-embedding-3-small; re-embeds the corpus)")
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint (default: the fake server); "
+                                           "uses OPENAI_API_KEY")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the sampled queries")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pdf_dir) or not any(f.endswith('.pdf') for f in os.listdir(args.pdf_dir)):
+        print(f"No PDFs found in {args.pdf_dir}", file=sys.stderr)
+        return 1
+
+    server: Optional[FakeOpenAIServer] = None if args.base_url else FakeOpenAIServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            processor = PDFProcessor(os.getenv("OPENAI_API_KEY", "sk-fake") if args.base_url else "sk-fake",
+                                     isolate_extraction=False, embedding_backend="openai",
+                                     openai_base_url=args.base_url or server.base_url, pdf_dir=args.pdf_dir,
+                                     cache_dir=cache_dir, embedding_dimensions=0)
+            chunks = []
+            for filename in sorted(os.listdir(args.pdf_dir)):
+                if filename.endswith('.pdf'):
+                    text = processor.extract_text_from_pdf(os.path.join(args.pdf_dir, filename))
+                    if text:
+                        chunks.extend(processor.text_splitter.split_text(text))
+            questions = load_questions(args.questions) if args.questions else list(DEFAULT_QUESTIONS)
+            queries = questions + sample_queries(chunks, args.sample_queries, args.seed)
+            rows = evaluate(processor, chunks, queries, args.dimensions, args.k, args.native)
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        print(json.dumps({"chunks": len(chunks), "queries": len(queries), "results": rows}, indent=2))
+        return 0
+    print(f"{len(chunks)} chunks, {len(queries)} queries ({len(questions)} questions); "
+          f"recall@{args.k} is overlap with the full-dimension top {args.k}\n")
+    print(f"{'Setting':<8} {'Dims':>6} {f'Recall@{args.k}':>9} {'Index MB':>9} {'Search p50 (us)':>16} {'Build (s)':>10}")
+    print("-" * 63)
+    for row in rows:
+        print(f"{row['setting']:<8} {row['dimensions']:>6} {row[f'recall@{args.k}']:>9.3f} {row['index_mb']:>9.3f} "
+              f"{row['search_p50_us']:>16.1f} {row['build_seconds']:>10.3f}")
+    print("\nPCA keeps at most one dimension per chunk; Build is embedding time for full and native, fit time for PCA.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
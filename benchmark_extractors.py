@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark the installed PDF text-extraction backends on the document corpus.
+Reports pages per second and the share of pages that came back empty.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pdf_extractors import EXTRACTORS, available_extractors
+
+DEFAULT_PDF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_pdfs")
+
+
+def benchmark_extractor(name, pdf_paths, repeat=1):
+    """Run one extractor over every PDF and collect throughput and empty-page figures."""
+    extractor = EXTRACTORS[name]()
+    pages = 0
+    empty_pages = 0
+    characters = 0
+    failed_files = []
+    elapsed = 0.0
+
+    for _ in range(repeat):
+        pages = empty_pages = characters = 0
+        failed_files = []
+        start_time = time.perf_counter()
+        for pdf_path in pdf_paths:
+            try:
+                page_texts = extractor.extract_pages(pdf_path)
+            except Exception as e:
+                failed_files.append({"file": os.path.basename(pdf_path), "error": str(e)})
+                continue
+            pages += len(page_texts)
+            empty_pages += sum(1 for text in page_texts if not text.strip())
+            characters += sum(len(text) for text in page_texts)
+        elapsed += time.perf_counter() - start_time
+
+    seconds = elapsed / repeat
+    return {
+        "backend": name,
+        "files": len(pdf_paths),
+        "pages": pages,
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(pages / seconds, 2) if seconds > 0 else None,
+        "empty_pages": empty_pages,
+        "empty_page_rate": round(empty_pages / pages, 4) if pages else None,
+        "characters": characters,
+        "failed_files": failed_files,
+    }
+
+
+def print_table(results):
+    """Print the benchmark results as a fixed-width table."""
+    header = f"{'backend':<12} {'pages':>7} {'seconds':>9} {'pages/s':>9} {'empty':>7} {'empty %':>8} {'failed':>7}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        pages_per_second = result["pages_per_second"] if result["pages_per_second"] is not None else 0
+        empty_rate = (result["empty_page_rate"] or 0) * 100
+        print(f"{result['backend']:<12} {result['pages']:>7} {result['seconds']:>9.3f} "
+              f"{pages_per_second:>9.1f} {result['empty_pages']:>7} {empty_rate:>7.1f}% "
+              f"{len(result['failed_files']):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF text-extraction backends")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory of PDFs to benchmark")
+    parser.add_argument("--backends", nargs="*", help="Backends to compare (default: all installed)")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of timed passes per backend")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pdf_dir):
+        print(f"PDF directory not found: {args.pdf_dir}")
+        return 1
+    pdf_paths = sorted(
+        os.path.join(args.pdf_dir, f) for f in os.listdir(args.pdf_dir) if f.endswith('.pdf')
+    )
+    if not pdf_paths:
+        print(f"No PDFs found in {args.pdf_dir}")
+        return 1
+
+    installed = available_extractors()
+    backends = args.backends or installed
+    missing = [name for name in backends if name not in installed]
+    if missing:
+        print(f"Skipping backends that are unknown or not installed: {', '.join(missing)}")
+    backends = [name for name in backends if name in installed]
+
+    print(f"Benchmarking {len(backends)} backend(s) on {len(pdf_paths)} PDF(s) in {args.pdf_dir}\n")
+    results = [benchmark_extractor(name, pdf_paths, args.repeat) for name in backends]
+    print_table(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({"pdf_dir": args.pdf_dir, "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
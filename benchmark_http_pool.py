@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+First-query and steady-state ask_question latency with and without the shared HTTP connection pool.
+Runs against the fake OpenAI server with a simulated per-connection handshake (--connect-latency-ms).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from typing import Dict, List
+
+from fake_openai import FakeOpenAIServer
+from pdf_processor import PDFProcessor
+from agent import AviationAgent
+from http_clients import close_http_client
+from benchmark_pipeline import DEFAULT_PDF_DIR, DEFAULT_QUESTIONS, summarize_latencies
+
+MODES = {
+    "per-client connections": {"HTTP_POOL": "false", "HTTP_WARMUP": "false"},
+    "shared pool": {"HTTP_POOL": "true", "HTTP_WARMUP": "false"},
+    "shared pool + warm-up": {"HTTP_POOL": "true", "HTTP_WARMUP": "true"},
+}
+
+
+def run_mode(server: FakeOpenAIServer, settings: Dict[str, str], pdf_dir: str, cache_dir: str,
+             questions: List[str], idle_seconds: float) -> Dict:
+    """Start a fresh agent in one mode and time its first question, the rest and one after idling."""
+    os.environ.update(settings)
+    close_http_client()
+    connections_before = server.request_counts["connections"]
+
+    start_time = time.perf_counter()
+    processor = PDFProcessor("sk-fake", isolate_extraction=False, embedding_backend="openai",
+                             openai_base_url=server.base_url, pdf_dir=pdf_dir, cache_dir=cache_dir)
+    agent = AviationAgent("sk-fake", openai_base_url=server.base_url, pdf_processor=processor)
+    if not agent.load_documents(directory_path=pdf_dir):
+        raise RuntimeError("Agent failed to load documents")
+    if agent.warm_up_thread is not None:
+        agent.warm_up_thread.join()
+    startup_seconds = time.perf_counter() - start_time
+
+    latencies = []
+    for question in questions:
+        agent.memory.clear()
+        start_time = time.perf_counter()
+        agent.ask_question(question)
+        latencies.append(time.perf_counter() - start_time)
+
+    result = {
+        "startup_ms": round(startup_seconds * 1000, 3),
+        "first_query_ms": round(latencies[0] * 1000, 3),
+        "later_queries": summarize_latencies(latencies[1:]),
+    }
+    if idle_seconds:
+        time.sleep(idle_seconds)
+        agent.memory.clear()
+        start_time = time.perf_counter()
+        agent.ask_question(questions[0])
+        result["after_idle_ms"] = round((time.perf_counter() - start_time) * 1000, 3)
+    result["connections_opened"] = server.request_counts["connections"] - connections_before
+    processor.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared HTTP connection pool")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory of PDFs to ingest")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake server latency per request")
+    parser.add_argument("--connect-latency-ms", type=float, default=100.0,
+                        help="Simulated TCP and TLS handshake per new connection")
+    parser.add_argument("--idle-seconds", type=float, default=0.0,
+                        help="Also time a question after idling this long (httpx drops idle connections after 5s by default)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pdf_dir) or not any(f.endswith('.pdf') for f in os.listdir(args.pdf_dir)):
+        print(f"No PDFs found in {args.pdf_dir}", file=sys.stderr)
+        return 1
+
+    with FakeOpenAIServer(latency_ms=args.latency_ms, connect_latency_ms=args.connect_latency_ms) as server, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        # Build the index once so every mode loads it from the cache
+        PDFProcessor("sk-fake", isolate_extraction=False, embedding_backend="openai",
+                     openai_base_url=server.base_url, pdf_dir=args.pdf_dir,
+                     cache_dir=cache_dir).process_directory(args.pdf_dir)
+        results = {name: run_mode(server, settings, args.pdf_dir, cache_dir, DEFAULT_QUESTIONS, args.idle_seconds)
+                   for name, settings in MODES.items()}
+        close_http_client()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"Fake server: {args.latency_ms:.0f} ms per request, {args.connect_latency_ms:.0f} ms per new connection\n")
+    idle_header = f" {'After idle':>10}" if args.idle_seconds else ""
+    print(f"{'Mode':<24} {'First (ms)':>10} {'Later p50':>10} {'Later p99':>10}{idle_header} {'Connections':>12}")
+    print("-" * (70 + len(idle_header)))
+    for name, result in results.items():
+        idle = f" {result['after_idle_ms']:>10.1f}" if args.idle_seconds else ""
+        print(f"{name:<24} {result['first_query_ms']:>10.1f} {result['later_queries']['p50_ms']:>10.1f} "
+              f"{result['later_queries']['p99_ms']:>10.1f}{idle} {result['connections_opened']:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
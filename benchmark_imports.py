@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the entry modules, in the style of `python -X importtime`.
+Reports cold import cost, the heaviest imports and how long the CLI takes to show its menu.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import List, Dict
+
+ENTRY_MODULES = ["manager", "streamlit_app", "agent", "pdf_processor", "metrics", "token_accounting"]
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+MENU_PROMPT = "Enter your choice"
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parse `-X importtime` lines into {"module", "self_us", "cumulative_us"} records."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        records.append({"module": fields[2].strip(), "self_us": self_us, "cumulative_us": cumulative_us})
+    return records
+
+
+def measure_import(module: str) -> Dict:
+    """Import one module in a fresh interpreter and collect its import-time profile."""
+    start_time = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PACKAGE_DIR, capture_output=True, text=True
+    )
+    wall_seconds = time.perf_counter() - start_time
+    records = parse_importtime(result.stderr)
+    top_level = next((r for r in records if r["module"] == module), None)
+    return {
+        "module": module,
+        "ok": result.returncode == 0,
+        "import_seconds": round(top_level["cumulative_us"] / 1e6, 4) if top_level else None,
+        "wall_seconds": round(wall_seconds, 4),
+        "modules_loaded": len(records),
+        "heaviest": sorted(records, key=lambda r: r["self_us"], reverse=True)[:10],
+    }
+
+
+def measure_menu_latency() -> float:
+    """Seconds from starting `python manager.py` until the 1/2 menu prompt is printed."""
+    start_time = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", "manager.py"], cwd=PACKAGE_DIR,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    output = ""
+    try:
+        while MENU_PROMPT not in output:
+            char = process.stdout.read(1)
+            if not char:
+                raise RuntimeError("manager.py exited before showing its menu")
+            output += char
+        return time.perf_counter() - start_time
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import times of the entry modules")
+    parser.add_argument("--modules", nargs="+", default=ENTRY_MODULES, help="Modules to import")
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="Fail if the CLI menu takes longer than this to appear")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    results = {"imports": [measure_import(module) for module in args.modules],
+               "menu_seconds": round(measure_menu_latency(), 4)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'Module':<20} {'Import (s)':>11} {'Wall (s)':>9} {'Modules':>8}")
+        print("-" * 52)
+        for entry in results["imports"]:
+            import_seconds = f"{entry['import_seconds']:.3f}" if entry["import_seconds"] is not None else "failed"
+            print(f"{entry['module']:<20} {import_seconds:>11} {entry['wall_seconds']:>9.3f} {entry['modules_loaded']:>8}")
+        for entry in results["imports"]:
+            print(f"\nHeaviest imports for {entry['module']} (self time):")
+            for record in entry["heaviest"][:5]:
+                print(f"  {record['self_us'] / 1000:8.1f} ms  {record['module']}")
+        print(f"\nCLI menu shown after {results['menu_seconds']:.3f}s")
+
+    if args.max_seconds is not None and results["menu_seconds"] > args.max_seconds:
+        print(f"❌ CLI menu took longer than {args.max_seconds}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
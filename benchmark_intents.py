@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency of the intent router on the labelled test set (intent_test_set.jsonl).
+Compares the old substring checks, the compiled word-boundary router and the router with the centroid classifier.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Callable, Dict, List, Tuple
+
+from intent_router import IntentRouter, CentroidIntentClassifier, GREETING, OFF_TOPIC, AVIATION
+
+DEFAULT_TEST_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_test_set.jsonl")
+
+
+def legacy_route(question: str) -> str:
+    """The substring checks ask_question used before the intent router."""
+    casual_greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening", "how are you", "what's up"]
+    question_lower = question.lower().strip()
+    if any(greeting in question_lower for greeting in casual_greetings):
+        return GREETING
+    non_aviation_keywords = ["weather", "news", "sports", "food", "movie", "music", "travel", "shopping"]
+    aviation_words = ["airport", "aviation", "aircraft", "runway", "taxiway", "terminal", "airspace", "navigation", "approach", "departure"]
+    if any(keyword in question_lower for keyword in non_aviation_keywords) and not any(word in question_lower for word in aviation_words):
+        return OFF_TOPIC
+    return AVIATION
+
+
+def load_test_set(path: str) -> List[Tuple[str, str]]:
+    with open(path, 'r') as f:
+        return [(record["text"], record["label"]) for record in map(json.loads, f) if record]
+
+
+def evaluate(route: Callable[[str], str], examples: List[Tuple[str, str]], repeat: int) -> Dict:
+    """Accuracy per label, misrouted examples and per-call latency in microseconds."""
+    correct: Dict[str, int] = {}
+    totals: Dict[str, int] = {}
+    errors = []
+    for text, label in examples:
+        totals[label] = totals.get(label, 0) + 1
+        predicted = route(text)
+        if predicted == label:
+            correct[label] = correct.get(label, 0) + 1
+        else:
+            errors.append({"text": text, "expected": label, "predicted": predicted})
+
+    latencies = []
+    for _ in range(repeat):
+        for text, _ in examples:
+            start_time = time.perf_counter()
+            route(text)
+            latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+    return {
+        "accuracy": round(sum(correct.values()) / len(examples), 4),
+        "per_label": {label: f"{correct.get(label, 0)}/{count}" for label, count in sorted(totals.items())},
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 2),
+        "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6, 2),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate intent routing accuracy and latency")
+    parser.add_argument("--test-set", default=DEFAULT_TEST_SET, help="JSONL file of {text, label} records")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing passes over the test set")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    examples = load_test_set(args.test_set)
+    routers = {
+        "substring (old)": legacy_route,
+        "compiled": IntentRouter().route,
+        "compiled + centroid": IntentRouter(CentroidIntentClassifier()).route,
+    }
+    results = {name: evaluate(route, examples, args.repeat) for name, route in routers.items()}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{len(examples)} labelled questions, {args.repeat} timing passes\n")
+    print(f"{'Router':<22} {'Accuracy':>9} {'p50 (us)':>9} {'p99 (us)':>9}  Per label")
+    print("-" * 80)
+    for name, result in results.items():
+        per_label = ", ".join(f"{label} {score}" for label, score in result["per_label"].items())
+        print(f"{name:<22} {result['accuracy']:>9.1%} {result['p50_us']:>9.2f} {result['p99_us']:>9.2f}  {per_label}")
+    for name, result in results.items():
+        for error in result["errors"]:
+            print(f"  {name}: {error['text']!r} -> {error['predicted']} (expected {error['expected']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark against the deterministic fake OpenAI server.
+Needs no API key or network; writes machine-readable JSON results.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from typing import List, Dict
+
+from fake_openai import FakeOpenAIServer
+from pdf_processor import PDFProcessor
+from agent import AviationAgent
+
+DEFAULT_PDF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_pdfs")
+
+DEFAULT_QUESTIONS = [
+    "What is the minimum runway width for airplane design group III?",
+    "What are the runway safety area dimensions?",
+    "What is the required taxiway to taxiway separation?",
+    "How are runway holding position markings painted?",
+    "What obstacle clearance surfaces apply to an instrument approach?",
+    "What does the document say about apron design?",
+    "What are the requirements for runway shoulders and blast pads?",
+    "How is the runway object free area defined?",
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    """Summarize latencies in milliseconds."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def load_questions(path: str) -> List[str]:
+    """Load one question per line, or the "question" field of JSONL records."""
+    questions = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                questions.append(json.loads(line)["question"])
+            else:
+                questions.append(line)
+    return questions
+
+
+def run_benchmark(pdf_dir: str, questions: List[str], runs: int, latency_ms: float,
+                  error_rate: float, k: int) -> Dict:
+    """Run every pipeline stage once for ingestion and repeatedly for queries."""
+    with FakeOpenAIServer(latency_ms=latency_ms, error_rate=error_rate) as server, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        processor = PDFProcessor("sk-fake", isolate_extraction=False, embedding_backend="openai",
+                                 openai_base_url=server.base_url, pdf_dir=pdf_dir, cache_dir=cache_dir)
+        pdf_paths = sorted(os.path.join(pdf_dir, f) for f in os.listdir(pdf_dir) if f.endswith('.pdf'))
+
+        # Ingestion: extraction and splitting
+        pages = 0
+        texts = []
+        start_time = time.perf_counter()
+        for pdf_path in pdf_paths:
+            page_texts = processor.extractor.extract_pages(pdf_path)
+            pages += len(page_texts)
+            texts.append("".join(page_texts))
+        extract_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        chunks = [chunk for text in texts for chunk in processor.text_splitter.split_text(text)]
+        split_seconds = time.perf_counter() - start_time
+
+        # Index build (embedding calls plus FAISS insertion)
+        start_time = time.perf_counter()
+        vector_store = processor._build_vector_store(chunks)
+        build_seconds = time.perf_counter() - start_time
+
+        # Retrieval only
+        retrieval_latencies = []
+        for _ in range(runs):
+            for question in questions:
+                start_time = time.perf_counter()
+                vector_store.similarity_search(question, k=k)
+                retrieval_latencies.append(time.perf_counter() - start_time)
+
+        # End-to-end ask_question, single-turn so history does not grow across samples
+        agent = AviationAgent("sk-fake", openai_base_url=server.base_url, pdf_processor=processor)
+        if not agent.load_documents(directory_path=pdf_dir):
+            raise RuntimeError("Agent failed to load documents")
+        ask_latencies = []
+        for _ in range(runs):
+            for question in questions:
+                agent.memory.clear()
+                start_time = time.perf_counter()
+                agent.ask_question(question)
+                ask_latencies.append(time.perf_counter() - start_time)
+
+        return {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "extractor": processor.extractor.name,
+                "fake_latency_ms": latency_ms,
+                "fake_error_rate": error_rate,
+            },
+            "corpus": {"pdf_dir": pdf_dir, "files": len(pdf_paths), "pages": pages, "chunks": len(chunks)},
+            "ingestion": {
+                "extract_seconds": round(extract_seconds, 4),
+                "pages_per_second": round(pages / extract_seconds, 2) if extract_seconds else None,
+                "split_seconds": round(split_seconds, 4),
+                "chunks_per_second": round(len(chunks) / split_seconds, 2) if split_seconds else None,
+                "index_build_seconds": round(build_seconds, 4),
+            },
+            "retrieval": dict(summarize_latencies(retrieval_latencies), k=k),
+            "ask_question": summarize_latencies(ask_latencies),
+            "fake_server_requests": dict(server.request_counts),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, retrieval and ask_question offline")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory of PDFs to ingest")
+    parser.add_argument("--questions", help="File with one question per line (or JSONL with a question field)")
+    parser.add_argument("--runs", type=int, default=3, help="Passes over the question set")
+    parser.add_argument("--k", type=int, default=4, help="Chunks retrieved per query")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fake server latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake server error rate")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pdf_dir) or not any(f.endswith('.pdf') for f in os.listdir(args.pdf_dir)):
+        print(f"No PDFs found in {args.pdf_dir}", file=sys.stderr)
+        return 1
+    questions = load_questions(args.questions) if args.questions else DEFAULT_QUESTIONS
+
+    results = run_benchmark(args.pdf_dir, questions, args.runs, args.latency_ms, args.error_rate, args.k)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Load test: replay a captured request log (REQUEST_LOG) against AviationAgent and the fake OpenAI server.
+Questions arrive at their logged times (scaled by --speed) or as a Poisson process at --rate per second,
+and run on up to --concurrency client threads. Reports throughput, queueing delay and tail latency.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from fake_openai import FakeOpenAIServer
+from pdf_processor import PDFProcessor
+from agent import AviationAgent
+from request_log import RequestLog, load_requests
+from benchmark_pipeline import DEFAULT_PDF_DIR, DEFAULT_QUESTIONS, percentile
+
+
+class CollectingRequestLog(RequestLog):
+    """Keeps each thread's latest capture entry for the harness; also writes them when given a path."""
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path)
+        self.entries: Dict[int, Dict[str, Any]] = {}
+
+    def append(self, entry: Dict[str, Any]):
+        self.entries[threading.get_ident()] = entry
+        if self.path:
+            super().append(entry)
+
+
+def arrival_offsets(requests: List[Dict[str, Any]], rate: Optional[float] = None, speed: float = 1.0,
+                    seed: int = 0) -> List[float]:
+    """Seconds after the start at which each request arrives: Poisson arrivals at rate per second,
+    or the logged arrival times compressed by speed."""
+    if rate:
+        generator = random.Random(seed)
+        offsets, offset = [], 0.0
+        for _ in requests:
+            offsets.append(offset)
+            offset += generator.expovariate(rate)
+        return offsets
+    first = requests[0]["time"] if requests else 0.0
+    return [(request["time"] - first) / speed for request in requests]
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    """Tail summary of samples in seconds, in milliseconds."""
+    summary = {f"p{pct}_ms": round(percentile(samples, pct) * 1000, 3) for pct in (50, 90, 95, 99)}
+    summary["max_ms"] = round(max(samples) * 1000, 3) if samples else 0.0
+    summary["mean_ms"] = round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0
+    return summary
+
+
+def replay(agent: AviationAgent, requests: List[Dict[str, Any]], concurrency: int, offsets: List[float],
+           sessions: int = 0) -> Dict[str, Any]:
+    """Send each request to agent.ask_question at its arrival offset on a pool of concurrency threads.
+    Queueing delay is the wait for a client thread plus the agent's admission wait."""
+    capture = agent.request_log if isinstance(agent.request_log, CollectingRequestLog) else CollectingRequestLog()
+    agent.request_log = capture
+    agent.clear_chat_history()
+    samples = [None] * len(requests)
+
+    def send(index: int, arrived: float):
+        request = requests[index]
+        started = time.perf_counter()
+        session_id = f"planner-{index % sessions}" if sessions else request.get("session_id") or f"replay-{index}"
+        sample = {"client_wait": started - arrived, "route": None, "busy": False, "error": None}
+        try:
+            result = agent.ask_question(request["question"], session_id=session_id,
+                                        documents=request.get("documents") or None,
+                                        corpora=request.get("corpora") or None)
+            sample["busy"] = bool(result.get("busy"))
+        except Exception as e:
+            sample["error"] = type(e).__name__
+        sample["latency"] = time.perf_counter() - arrived
+        entry = capture.entries.pop(threading.get_ident(), {})
+        sample["route"] = entry.get("route")
+        sample["error"] = sample["error"] or entry.get("error")
+        sample["admission_wait"] = entry.get("stages", {}).get("admission_wait", 0.0)
+        samples[index] = sample
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, offset in enumerate(offsets):
+            delay = start_time + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, index, start_time + offset)
+    elapsed = time.perf_counter() - start_time
+
+    answered = [sample for sample in samples if not sample["busy"] and not sample["error"]]
+    routes: Dict[str, int] = {}
+    for sample in samples:
+        routes[sample["route"] or "error"] = routes.get(sample["route"] or "error", 0) + 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "answered": len(answered),
+        "busy": sum(sample["busy"] for sample in samples),
+        "errors": sum(bool(sample["error"]) for sample in samples),
+        "elapsed_seconds": round(elapsed, 3),
+        "offered_per_second": round(len(samples) / offsets[-1], 3) if len(offsets) > 1 and offsets[-1] else None,
+        "throughput_per_second": round(len(answered) / elapsed, 3) if elapsed else 0.0,
+        "queueing_delay": summarize_ms([sample["client_wait"] + sample["admission_wait"] for sample in samples]),
+        "latency": summarize_ms([sample["latency"] for sample in answered]),
+        "routes": routes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured request log against the agent")
+    parser.add_argument("log", nargs="?", help="Request log captured with REQUEST_LOG, or one question per line "
+                                               "(default: the benchmark question set)")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory of PDFs to ingest")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 50],
+                        help="Client threads; one run per value")
+    parser.add_argument("--rate", type=float, help="Poisson arrivals per second instead of the logged timing")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay logged timing this many times faster")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the log")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="Spread requests over this many sessions (default: the logged session ids)")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Fake server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Fake server latency jitter")
+    parser.add_argument("--capture", help="Also write the replayed requests to this request log")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for Poisson arrivals")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pdf_dir) or not any(f.endswith('.pdf') for f in os.listdir(args.pdf_dir)):
+        print(f"No PDFs found in {args.pdf_dir}", file=sys.stderr)
+        return 1
+    if args.log:
+        requests = load_requests(args.log)
+    else:
+        requests = [{"question": question, "time": float(i)} for i, question in enumerate(DEFAULT_QUESTIONS)]
+    if not requests:
+        print(f"No requests in {args.log}", file=sys.stderr)
+        return 1
+    span = requests[-1]["time"] - requests[0]["time"] + 1.0
+    requests = [dict(request, time=request["time"] + n * span) for n in range(args.repeat) for request in requests]
+    offsets = arrival_offsets(requests, args.rate, args.speed, args.seed)
+
+    with FakeOpenAIServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed) as server, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        processor = PDFProcessor("sk-fake", isolate_extraction=False, embedding_backend="openai",
+                                 openai_base_url=server.base_url, pdf_dir=args.pdf_dir, cache_dir=cache_dir)
+        agent = AviationAgent("sk-fake", openai_base_url=server.base_url, pdf_processor=processor)
+        if not agent.load_documents(directory_path=args.pdf_dir):
+            print("Agent failed to load documents", file=sys.stderr)
+            return 1
+        agent.request_log = CollectingRequestLog(args.capture)
+        results = [replay(agent, requests, concurrency, offsets, args.sessions) for concurrency in args.concurrency]
+        processor.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    arrivals = f"Poisson {args.rate:g}/s" if args.rate else f"logged timing x{args.speed:g}"
+    print(f"{len(requests)} requests, {arrivals}; fake server {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms; "
+          f"admission limit {agent.admission.max_concurrent}\n")
+    print(f"{'Threads':>7} {'Answered':>8} {'Busy':>5} {'Err':>4} {'Thru/s':>7} {'Queue p50':>10} {'Queue p99':>10} "
+          f"{'Lat p50':>9} {'Lat p95':>9} {'Lat p99':>9} {'Lat max':>9}")
+    print("-" * 100)
+    for result in results:
+        queue, latency = result["queueing_delay"], result["latency"]
+        print(f"{result['concurrency']:>7} {result['answered']:>8} {result['busy']:>5} {result['errors']:>4} "
+              f"{result['throughput_per_second']:>7.2f} {queue['p50_ms']:>10.1f} {queue['p99_ms']:>10.1f} "
+              f"{latency['p50_ms']:>9.1f} {latency['p95_ms']:>9.1f} {latency['p99_ms']:>9.1f} {latency['max_ms']:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Retrieval evaluation: sweep chunk size and overlap, FAISS index type and k over a golden set of questions
+with expected source passages, and report recall@k, MRR, index size, build time and query latency.
+Rows can be appended to a TSV tagged with the git commit (--output), to compare settings across commits.
+Runs against the fake OpenAI server unless --base-url is given (or --backend local).
+
+Golden set: one JSON object per line,
+    {"question": "...", "passages": ["text expected in a retrieved chunk", ...], "source": "file.pdf"}
+("passage" may be given instead of "passages"; "source" is optional and restricts which chunks match).
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import faiss
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from fake_openai import FakeOpenAIServer
+from pdf_processor import PDFProcessor
+from benchmark_pipeline import DEFAULT_PDF_DIR, percentile
+
+DEFAULT_GOLDEN_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_golden_set.jsonl")
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+SHINGLE_WORDS = 5
+MATCH_FRACTION = 0.5
+TSV_COLUMNS = ["commit", "date", "chunk_size", "chunk_overlap", "index", "k", "chunks", "recall", "mrr",
+               "index_mb", "embed_seconds", "build_seconds", "query_p50_ms", "query_p99_ms"]
+
+
+def load_golden_set(path: str) -> List[Dict[str, Any]]:
+    """Read the golden set, normalizing "passage" to a "passages" list."""
+    golden = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            passages = record.get("passages") or [record["passage"]]
+            golden.append({"question": record["question"], "passages": passages, "source": record.get("source")})
+    return golden
+
+
+def shingles(text: str) -> Set[str]:
+    """Overlapping five-word sequences of the lowercased words; short texts are one shingle."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def contains_passage(chunk_shingles: Set[str], passage_shingles: Set[str]) -> bool:
+    """A chunk holds a passage if it has most of the passage, or is mostly made of the passage
+    (a chunk smaller than the passage it was cut from)."""
+    if not chunk_shingles or not passage_shingles:
+        return False
+    shared = len(chunk_shingles & passage_shingles)
+    return shared >= MATCH_FRACTION * len(passage_shingles) or shared >= MATCH_FRACTION * len(chunk_shingles)
+
+
+def relevant_chunks(golden: List[Dict[str, Any]], chunks: List[str], sources: List[str]) -> List[List[Set[int]]]:
+    """For each question, for each expected passage, the ids of the chunks that hold it."""
+    chunk_shingles = [shingles(chunk) for chunk in chunks]
+    relevant = []
+    for record in golden:
+        per_passage = []
+        for passage in record["passages"]:
+            passage_shingles = shingles(passage)
+            per_passage.append({i for i, s in enumerate(chunk_shingles)
+                                if (record["source"] is None or sources[i] == record["source"])
+                                and contains_passage(s, passage_shingles)})
+        relevant.append(per_passage)
+    return relevant
+
+
+def score(ranked: List[List[int]], relevant: List[List[Set[int]]], k: int) -> Dict[str, float]:
+    """recall@k: share of expected passages held by a top-k chunk; MRR@k: reciprocal rank of the first
+    chunk holding any expected passage (0 when none is in the top k)."""
+    recalls, reciprocal_ranks = [], []
+    for ids, passages in zip(ranked, relevant):
+        top = ids[:k]
+        recalls.append(sum(bool(chunk_ids & set(top)) for chunk_ids in passages) / len(passages))
+        any_relevant = set().union(*passages)
+        rank = next((position for position, i in enumerate(top, 1) if i in any_relevant), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    return {"recall": round(float(np.mean(recalls)), 4), "mrr": round(float(np.mean(reciprocal_ranks)), 4)}
+
+
+def build_index(index_type: str, vectors: np.ndarray) -> Any:
+    """A FAISS index over unit vectors: exact flat L2 (what the app uses), HNSW, or IVF with
+    sqrt(n) lists and an eighth of them probed."""
+    dimensions = vectors.shape[1]
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dimensions)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimensions, 32)
+    elif index_type == "ivf":
+        n_lists = max(1, int(len(vectors) ** 0.5))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dimensions), dimensions, n_lists)
+        index.train(vectors)
+        index.nprobe = max(1, n_lists // 8)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    index.add(vectors)
+    return index
+
+
+def _unit(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def evaluate_config(texts: Dict[str, str], golden: List[Dict[str, Any]], query_vectors: np.ndarray,
+                    embeddings: Any, chunk_size: int, chunk_overlap: int, index_types: List[str],
+                    ks: List[int]) -> List[Dict[str, Any]]:
+    """Chunk, embed and index the texts one way, then score every index type and k."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len)
+    chunks, sources = [], []
+    for source, text in texts.items():
+        for chunk in splitter.split_text(text):
+            chunks.append(chunk)
+            sources.append(source)
+    relevant = relevant_chunks(golden, chunks, sources)
+    start_time = time.perf_counter()
+    vectors = _unit(embeddings.embed_documents(chunks))
+    embed_seconds = time.perf_counter() - start_time
+
+    rows = []
+    for index_type in index_types:
+        start_time = time.perf_counter()
+        index = build_index(index_type, vectors)
+        build_seconds = time.perf_counter() - start_time
+        latencies, ranked = [], []
+        for query in query_vectors:
+            start_time = time.perf_counter()
+            _, ids = index.search(query[None, :], max(ks))
+            latencies.append(time.perf_counter() - start_time)
+            ranked.append([int(i) for i in ids[0] if i >= 0])
+        index_mb = round(len(faiss.serialize_index(index)) / 2 ** 20, 3)
+        for k in ks:
+            rows.append(dict(score(ranked, relevant, k), chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                             index=index_type, k=k, chunks=len(chunks), index_mb=index_mb,
+                             embed_seconds=round(embed_seconds, 3), build_seconds=round(build_seconds, 4),
+                             query_p50_ms=round(percentile(latencies, 50) * 1000, 4),
+                             query_p99_ms=round(percentile(latencies, 99) * 1000, 4)))
+    return rows
+
+
+def run_sweep(texts: Dict[str, str], golden: List[Dict[str, Any]], embeddings: Any, chunk_sizes: List[int],
+              overlaps: List[int], index_types: List[str], ks: List[int]) -> List[Dict[str, Any]]:
+    query_vectors = _unit(embeddings.embed_documents([record["question"] for record in golden]))
+    rows = []
+    for chunk_size in chunk_sizes:
+        for chunk_overlap in overlaps:
+            if chunk_overlap < chunk_size:
+                rows.extend(evaluate_config(texts, golden, query_vectors, embeddings, chunk_size, chunk_overlap,
+                                            index_types, ks))
+    return rows
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def append_tsv(path: str, rows: List[Dict[str, Any]]):
+    """Append rows to a tab-separated results file, writing the header when the file is new."""
+    commit, date = current_commit(), datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    new_file = not os.path.exists(path)
+    with open(path, 'a') as f:
+        if new_file:
+            f.write("\t".join(TSV_COLUMNS) + "\n")
+        for row in rows:
+            values = dict(row, commit=commit, date=date)
+            f.write("\t".join(str(values[column]) for column in TSV_COLUMNS) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep chunking, index type and k over a retrieval golden set")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN_SET, help="Golden set JSONL (see the module docstring)")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory of PDFs the golden set refers to")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500, 1000, 1500])
+    parser.add_argument("--overlaps", type=int, nargs="+", default=[0, 200])
+    parser.add_argument("--index-types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 4, 8], help="Chunks retrieved per query")
+    parser.add_argument("--backend", choices=("openai", "local"), default="openai",
+                        help="Embedding backend (openai uses the fake server unless --base-url is given)")
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint; uses OPENAI_API_KEY")
+    parser.add_argument("--output", help="Append the rows to this TSV, tagged with the commit")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.golden):
+        print(f"No golden set at {args.golden}; see the format in this script's docstring", file=sys.stderr)
+        return 1
+    if not os.path.isdir(args.pdf_dir) or not any(f.endswith('.pdf') for f in os.listdir(args.pdf_dir)):
+        print(f"No PDFs found in {args.pdf_dir}", file=sys.stderr)
+        return 1
+    golden = load_golden_set(args.golden)
+
+    server: Optional[FakeOpenAIServer] = None
+    if args.backend == "openai" and not args.base_url:
+        server = FakeOpenAIServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            processor = PDFProcessor(os.getenv("OPENAI_API_KEY", "sk-fake") if args.base_url else "sk-fake",
+                                     isolate_extraction=False, embedding_backend=args.backend,
+                                     openai_base_url=args.base_url or (server.base_url if server else None),
+                                     pdf_dir=args.pdf_dir, cache_dir=cache_dir, embedding_dimensions=0)
+            texts = {}
+            for filename in sorted(os.listdir(args.pdf_dir)):
+                if filename.endswith('.pdf'):
+                    text = processor.extract_text_from_pdf(os.path.join(args.pdf_dir, filename))
+                    if text:
+                        texts[filename] = text
+            rows = run_sweep(texts, golden, processor.embeddings, args.chunk_sizes, args.overlaps,
+                             args.index_types, sorted(set(args.k)))
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        append_tsv(args.output, rows)
+        print(f"Results appended to {args.output}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{len(golden)} questions over {len(texts)} documents; commit {current_commit()}\n")
+    print(f"{'Size':>5} {'Overlap':>7} {'Index':<5} {'k':>3} {'Chunks':>7} {'Recall':>7} {'MRR':>6} {'Index MB':>9} "
+          f"{'Embed s':>8} {'Build s':>8} {'Query p50 ms':>13} {'p99 ms':>8}")
+    print("-" * 100)
+    for row in rows:
+        print(f"{row['chunk_size']:>5} {row['chunk_overlap']:>7} {row['index']:<5} {row['k']:>3} {row['chunks']:>7} "
+              f"{row['recall']:>7.3f} {row['mrr']:>6.3f} {row['index_mb']:>9.3f} {row['embed_seconds']:>8.3f} "
+              f"{row['build_seconds']:>8.4f} {row['query_p50_ms']:>13.4f} {row['query_p99_ms']:>8.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Search latency of the sharded index against shard count, on a synthetic corpus of random unit vectors.
+Each shard count is checked against an exact in-process search so the merged top-k is known to be correct.
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from sharded_index import ShardedIndex
+
+
+def synthetic_corpus(n_vectors: int, dimension: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_vectors, dimension), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentile_ms(latencies: List[float], fraction: float) -> float:
+    ordered = sorted(latencies)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3)
+
+
+def benchmark_in_process(vectors: np.ndarray, queries: np.ndarray, k: int) -> Dict:
+    """Single-threaded flat search in this process, the baseline the shards are compared with."""
+    import faiss
+
+    faiss.omp_set_num_threads(1)
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    latencies = []
+    neighbours = []
+    for query in queries:
+        start_time = time.perf_counter()
+        _, positions = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start_time)
+        neighbours.append(set(positions[0].tolist()))
+    return {"p50_ms": percentile_ms(latencies, 0.5), "p99_ms": percentile_ms(latencies, 0.99),
+            "neighbours": neighbours}
+
+
+def benchmark_shards(vectors: np.ndarray, queries: np.ndarray, n_shards: int, k: int,
+                     expected: List[set]) -> Dict:
+    with tempfile.TemporaryDirectory() as directory:
+        start_time = time.perf_counter()
+        sharded_index = ShardedIndex.build(vectors, n_shards, directory)
+        startup_s = time.perf_counter() - start_time
+        try:
+            sharded_index.search(queries[0], k)  # warm-up
+            latencies = []
+            matches = 0
+            for query, truth in zip(queries, expected):
+                start_time = time.perf_counter()
+                hits = sharded_index.search(query, k)
+                latencies.append(time.perf_counter() - start_time)
+                matches += len({position for _, position in hits} & truth)
+        finally:
+            sharded_index.close()
+    return {
+        "shards": n_shards,
+        "startup_s": round(startup_s, 3),
+        "p50_ms": percentile_ms(latencies, 0.5),
+        "p99_ms": percentile_ms(latencies, 0.99),
+        "recall": round(matches / (len(queries) * k), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scatter-gather search latency by shard count")
+    parser.add_argument("--vectors", type=int, default=200000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard counts to test")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per shard count")
+    parser.add_argument("--k", type=int, default=4, help="Results per query")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    vectors = synthetic_corpus(args.vectors, args.dimension)
+    queries = synthetic_corpus(args.queries, args.dimension, seed=1)
+    baseline = benchmark_in_process(vectors, queries, args.k)
+    results = [benchmark_shards(vectors, queries, n_shards, args.k, baseline["neighbours"])
+               for n_shards in args.shards]
+
+    if args.json:
+        print(json.dumps({"in_process": {"p50_ms": baseline["p50_ms"], "p99_ms": baseline["p99_ms"]},
+                          "sharded": results}, indent=2))
+        return 0
+    print(f"{args.vectors} vectors x {args.dimension} dims, {args.queries} queries, k={args.k}\n")
+    print(f"{'Index':<16} {'Startup (s)':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Speed-up':>9} {'Recall':>7}")
+    print("-" * 66)
+    print(f"{'in-process':<16} {'-':>11} {baseline['p50_ms']:>9.3f} {baseline['p99_ms']:>9.3f} {'1.00x':>9} {'1.0000':>7}")
+    for result in results:
+        speedup = baseline["p50_ms"] / result["p50_ms"] if result["p50_ms"] else 0.0
+        print(f"{str(result['shards']) + ' shards':<16} {result['startup_s']:>11.3f} {result['p50_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {speedup:>8.2f}x {result['recall']:>7.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Build the vector cache for a PDF directory ahead of deployment.
+Extracted text and embedded batches are checkpointed, so an interrupted build resumes where it stopped.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from metrics import METRICS
+from pdf_processor import PDFProcessor
+from token_accounting import record_embedding_usage
+
+DEFAULT_BATCH_SIZE = 64
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def _write_atomic(path: str, write: Callable[[str], None]):
+    """Write through a temporary file so a crash never leaves a half-written checkpoint."""
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class BuildCheckpoint:
+    """Checkpoint directory of one index build: extracted text per file, a manifest
+    describing the chunk list, and one .npy file of vectors per embedded batch."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "text"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "batches"), exist_ok=True)
+
+    def load_manifest(self) -> Dict:
+        try:
+            with open(os.path.join(self.directory, "manifest.json"), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest: Dict):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+        _write_atomic(os.path.join(self.directory, "manifest.json"), write)
+
+    def load_text(self, file_hash: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, "text", f"{file_hash}.json"), 'r') as f:
+                return json.load(f)["text"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save_text(self, file_hash: str, pdf_path: str, text: str):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump({"file": pdf_path, "text": text}, f)
+        _write_atomic(os.path.join(self.directory, "text", f"{file_hash}.json"), write)
+
+    def _batch_path(self, index: int) -> str:
+        return os.path.join(self.directory, "batches", f"{index:06d}.npy")
+
+    def load_batch(self, index: int) -> Optional[np.ndarray]:
+        try:
+            return np.load(self._batch_path(index))
+        except (OSError, ValueError):
+            return None
+
+    def save_batch(self, index: int, vectors: np.ndarray):
+        def write(path):
+            with open(path, 'wb') as f:
+                np.save(f, vectors)
+        _write_atomic(self._batch_path(index), write)
+
+    def clear_batches(self):
+        """Drop embedded batches but keep extracted text."""
+        shutil.rmtree(os.path.join(self.directory, "batches"), ignore_errors=True)
+        os.makedirs(os.path.join(self.directory, "batches"), exist_ok=True)
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ProgressReporter:
+    """Prints done/total, throughput and ETA for one phase of the build."""
+
+    def __init__(self, phase: str, total: int, unit: str, output: Callable[[str], None] = print):
+        self.phase = phase
+        self.total = total
+        self.unit = unit
+        self.output = output
+        self.start_time = time.monotonic()
+        self.done = 0
+        self.resumed = 0
+
+    def skip(self, count: int):
+        """Count items restored from the checkpoint (excluded from throughput)."""
+        self.done += count
+        self.resumed += count
+
+    def advance(self, count: int, detail: str = ""):
+        self.done += count
+        elapsed = time.monotonic() - self.start_time
+        rate = (self.done - self.resumed) / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        message = (f"[{self.phase}] {self.done}/{self.total} {self.unit} "
+                   f"({rate:.1f} {self.unit}/s, ETA {_format_duration(eta)})")
+        self.output(f"{message} {detail}".rstrip())
+
+
+def build_index(processor: PDFProcessor, pdf_dir: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                restart: bool = False, output: Callable[[str], None] = print) -> Optional[str]:
+    """Build and cache the directory index that PDFProcessor.process_directory loads.
+    Returns the cache key, or None if no text could be extracted."""
+    pdf_dir = pdf_dir or processor.default_pdf_dir
+    if not processor.validate_directory(pdf_dir):
+        return None
+    directory_hash = processor._get_directory_hash(pdf_dir)
+    checkpoint = BuildCheckpoint(os.path.join(processor.cache_dir, f"build_{directory_hash}"))
+    if restart:
+        checkpoint.remove()
+        checkpoint = BuildCheckpoint(checkpoint.directory)
+    manifest = checkpoint.load_manifest()
+
+    # Extraction: each file's text is checkpointed as soon as it is extracted
+    pdf_paths = sorted(os.path.join(pdf_dir, f) for f in os.listdir(pdf_dir) if f.endswith('.pdf'))
+    progress = ProgressReporter("extract", len(pdf_paths), "files", output)
+    texts = []
+    sources = []
+    for pdf_path in pdf_paths:
+        file_hash = processor._get_file_hash(pdf_path)
+        text = checkpoint.load_text(file_hash)
+        if text is not None:
+            texts.append(text)
+            sources.append(os.path.basename(pdf_path))
+            progress.skip(1)
+            continue
+        if processor.is_quarantined(pdf_path):
+            progress.advance(1, f"skipped quarantined {os.path.basename(pdf_path)}")
+            continue
+        text = processor.extract_text_from_pdf(pdf_path)
+        if text is None:
+            progress.advance(1, f"failed {os.path.basename(pdf_path)}")
+            continue
+        checkpoint.save_text(file_hash, pdf_path, text)
+        texts.append(text)
+        sources.append(os.path.basename(pdf_path))
+        progress.advance(1, os.path.basename(pdf_path))
+    if progress.resumed:
+        output(f"[extract] {progress.resumed} files restored from checkpoint")
+
+    chunks = []
+    metadatas = []
+    with METRICS.span("split"):
+        for text, source in zip(texts, sources):
+            file_chunks = processor.text_splitter.split_text(text)
+            chunks.extend(file_chunks)
+            metadatas.extend({"source": source} for _ in file_chunks)
+    if not chunks:
+        output("No text could be extracted; nothing to index")
+        return None
+
+    # A checkpoint for a different chunk list or backend cannot be reused
+    processor._check_ingestion_budget(chunks)
+    build_embeddings = processor._get_embeddings_for_build(chunks)
+    backend_id = processor._get_embedding_backend_id()
+    if manifest and (manifest.get("chunks") != len(chunks) or manifest.get("backend") != backend_id):
+        output("[embed] checkpoint does not match the current corpus or backend; re-embedding")
+        checkpoint.clear_batches()
+        manifest = {}
+    # Resumed builds keep the batch size their checkpoint files were written with
+    batch_size = manifest.get("batch_size", batch_size)
+    checkpoint.save_manifest({"chunks": len(chunks), "backend": backend_id, "batch_size": batch_size})
+
+    # Embedding: one checkpoint file per batch
+    batch_count = (len(chunks) + batch_size - 1) // batch_size
+    progress = ProgressReporter("embed", len(chunks), "chunks", output)
+    usage_scope = f"ingestion:build_{directory_hash}"
+    vectors = []
+    for index in range(batch_count):
+        batch = chunks[index * batch_size:(index + 1) * batch_size]
+        batch_vectors = checkpoint.load_batch(index)
+        if batch_vectors is not None and len(batch_vectors) == len(batch):
+            vectors.append(batch_vectors)
+            progress.skip(len(batch))
+            continue
+        with METRICS.span("embed_index"):
+            batch_vectors = np.asarray(build_embeddings.embed_documents(batch), dtype=np.float32)
+        if processor.embedding_backend == "openai":
+            record_embedding_usage([usage_scope], batch)
+        checkpoint.save_batch(index, batch_vectors)
+        vectors.append(batch_vectors)
+        progress.advance(len(batch), f"batch {index + 1}/{batch_count}")
+    if progress.resumed:
+        output(f"[embed] {progress.resumed} chunks restored from checkpoint")
+    METRICS.increment("chunks_indexed", len(chunks))
+
+    all_vectors = np.concatenate(vectors)
+    vector_store = processor._store_from_vectors(chunks, all_vectors, build_embeddings, metadatas)
+    cache_key = processor._get_cache_key("directory", directory_hash)
+    if not processor._save_vector_store_to_cache(vector_store, cache_key, dict(zip(sources, texts))):
+        raise RuntimeError(f"Failed to save the index {cache_key}; the checkpoint is kept for a retry")
+    checkpoint.remove()
+    output(f"Index {cache_key} built from {len(texts)} files and {len(chunks)} chunks")
+    return cache_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the vector cache for a PDF directory (resumable)")
+    parser.add_argument("--pdf-dir", help="Directory of PDFs (default: the app's test_pdfs directory, "
+                                          "which is what the app looks up in the cache)")
+    parser.add_argument("--cache-dir", help="Vector cache directory (default: vector_cache)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Chunks embedded per checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Discard any checkpoint and build from scratch")
+    args = parser.parse_args()
+
+    load_dotenv()
+    processor = PDFProcessor(os.getenv("OPENAI_API_KEY", ""), cache_dir=args.cache_dir)
+    try:
+        cache_key = build_index(processor, args.pdf_dir, args.batch_size, args.restart)
+    except KeyboardInterrupt:
+        print("\n⏸️ Build interrupted; run the command again to resume", file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"❌ Build stopped: {str(e)}; run the command again to resume", file=sys.stderr)
+        return 1
+    finally:
+        if processor.isolated_extractor is not None:
+            processor.isolated_extractor.close()
+    return 0 if cache_key else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
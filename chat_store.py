@@ -0,0 +1,202 @@
+##This is the file where chat history is persisted per session.
+# Messages live in a SQLite database in WAL mode, so many sessions can read and write concurrently.
+
+import os
+import re
+import json
+import time
+import sqlite3
+import secrets
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_DB_PATH = "chat_history.db"
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_SESSION_TTL_DAYS = 30.0
+DEFAULT_EXPIRY_INTERVAL = 3600.0  # seconds between expiry runs triggered by writes
+# Single-user history from earlier versions: the JSONL log, which already holds any older JSON list
+LEGACY_HISTORY_PATHS = ("chat_history.jsonl", "chat_history.json")
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{32,128}")
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_session ON messages(session_id, id);
+CREATE INDEX IF NOT EXISTS sessions_by_age ON sessions(updated_at);
+CREATE TABLE IF NOT EXISTS legacy_imports (
+    path TEXT PRIMARY KEY,
+    session_id TEXT,
+    imported_at REAL NOT NULL
+);
+"""
+
+
+def new_session_id() -> str:
+    """A random, unguessable session id. Anyone holding it can read the session's history."""
+    return secrets.token_urlsafe(32)
+
+
+def is_valid_session_id(session_id: Optional[str]) -> bool:
+    """Reject short or hand-picked ids ("default", "alice") that others could guess."""
+    return bool(session_id) and SESSION_ID_PATTERN.fullmatch(session_id) is not None
+
+
+def _read_legacy_messages(path: str) -> List[Dict[str, str]]:
+    with open(path, 'r') as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+class ChatStore:
+    """Transactional chat history keyed by session id.
+    Each thread gets its own connection; WAL lets readers proceed while one writer
+    commits, and writers wait up to `busy_timeout` seconds for each other.
+    Idle sessions are expired by the first write and then at most every `expiry_interval`
+    seconds, so a long-running server keeps to the TTL."""
+
+    def __init__(self, path: Optional[str] = None, session_ttl_days: Optional[float] = None,
+                 busy_timeout: float = 30.0, expiry_interval: float = DEFAULT_EXPIRY_INTERVAL):
+        self.path = path or os.getenv("CHAT_DB_PATH", DEFAULT_DB_PATH)
+        if session_ttl_days is None:
+            session_ttl_days = float(os.getenv("CHAT_SESSION_TTL_DAYS", DEFAULT_SESSION_TTL_DAYS))
+        self.session_ttl_days = session_ttl_days
+        self.busy_timeout = busy_timeout
+        self.expiry_interval = expiry_interval
+        self._next_expiry = time.monotonic()
+        self._expiry_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def append(self, session_id: str, role: str, content: str):
+        """Append one message to a session, creating the session if needed."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (session_id, now, now)
+            )
+            conn.execute(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, now)
+            )
+        self._expire_if_due()
+
+    def _expire_if_due(self):
+        """Expire idle sessions if expiry_interval has passed since the last run; one writer runs it."""
+        with self._expiry_lock:
+            if time.monotonic() < self._next_expiry:
+                return
+            self._next_expiry = time.monotonic() + self.expiry_interval
+        try:
+            self.expire_sessions()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to expire chat sessions: {str(e)}")
+
+    def count(self, session_id: str) -> int:
+        """Number of messages stored for a session."""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0]
+
+    def read_recent(self, session_id: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> List[Dict[str, str]]:
+        """Read up to `limit` messages of a session, skipping the `offset` most recent ones, oldest first."""
+        rows = self._connection().execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (session_id, limit, offset)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def import_legacy_history(self, paths: Sequence[str] = LEGACY_HISTORY_PATHS) -> Optional[str]:
+        """Copy the history of earlier single-user versions into a new session, once.
+        The first existing file is imported; every existing file is then marked as done.
+        Returns the new session id (open the app with ?session=<id> to see it), or None."""
+        existing = [path for path in paths if os.path.exists(path)]
+        conn = self._connection()
+        done = {row[0] for row in conn.execute("SELECT path FROM legacy_imports")}
+        pending = [path for path in existing if os.path.abspath(path) not in done]
+        if not pending or len(pending) < len(existing):
+            return None
+        try:
+            messages = _read_legacy_messages(pending[0])
+        except (OSError, ValueError) as e:
+            logger.error(f"Error importing chat history from {pending[0]}: {str(e)}")
+            return None
+        session_id = new_session_id() if messages else None
+        now = time.time()
+        with conn:
+            if session_id is not None:
+                conn.execute("INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?)",
+                             (session_id, now, now))
+                conn.executemany(
+                    "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    [(session_id, message.get("role", "user"), str(message.get("content", "")), now)
+                     for message in messages]
+                )
+            conn.executemany(
+                "INSERT OR IGNORE INTO legacy_imports (path, session_id, imported_at) VALUES (?, ?, ?)",
+                [(os.path.abspath(path), session_id, now) for path in existing]
+            )
+        if session_id is not None:
+            logger.info(f"Imported {len(messages)} messages from {pending[0]} into chat session {session_id}; "
+                        f"open the app with ?session={session_id} to see them")
+        return session_id
+
+    def clear_session(self, session_id: str):
+        """Delete a session and its messages."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def expire_sessions(self, max_age_seconds: Optional[float] = None) -> int:
+        """Delete sessions idle for longer than the TTL; returns how many were removed."""
+        with self._expiry_lock:
+            self._next_expiry = time.monotonic() + self.expiry_interval
+        if max_age_seconds is None:
+            if self.session_ttl_days <= 0:
+                return 0
+            max_age_seconds = self.session_ttl_days * 86400
+        cutoff = time.time() - max_age_seconds
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            removed = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+        if removed:
+            logger.info(f"Expired {removed} chat sessions idle for more than {max_age_seconds / 86400:.1f} days")
+        return removed
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
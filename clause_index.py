@@ -0,0 +1,131 @@
+##This is the file where section and paragraph numbers are indexed for exact citation lookup.
+# "301. Runway Design" and "3.2.1 Width" headings map to the text up to the next heading, per document.
+
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+CLAUSE_FILE = "clauses.json"
+MAX_CLAUSE_CHARS = 4000
+MAX_ANSWER_CLAUSES = 5  # spans quoted in one answer, e.g. a section's sub-clauses or the same paragraph in several documents
+
+# FAA paragraph numbers ("301. Title") and dotted section numbers ("3.2.1 Title")
+HEADING_PATTERN = re.compile(r"^\s*(?:(\d{3,4})\.|(\d+(?:\.\d+)+)\.?)\s+(?=[A-Z(])", re.MULTILINE)
+# "paragraph 305", "section 3.2.1", "para. 4", "clause 2.1", "§ 301", or a bare dotted number like "3.2.1"
+REFERENCE_PATTERN = re.compile(
+    r"(?:\b(?:section|sec|paragraph|para|clause|chapter|§)\.?\s*(\d+(?:\.\d+)*)\b|\b(\d+\.\d+\.\d+(?:\.\d+)*)\b)",
+    re.IGNORECASE)
+# Contents-page entries: "301. Runway Design ........ 45" or "301. Runway Design    45"
+CONTENTS_LINE_PATTERN = re.compile(r"(?:\.{3,}|…+|\s{2,})\s*\d+\s*$")
+
+logger = logging.getLogger(__name__)
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def document_aliases(source: str) -> List[str]:
+    """Compact names a question may use for a document: "ac_150_5300_13b.pdf" is
+    "AC 150/5300-13B" or "150/5300-13B", "icao_annex14.pdf" is "ICAO Annex 14" or "Annex 14"."""
+    parts = [part for part in re.split(r"[^a-z0-9]+", os.path.splitext(source)[0].lower()) if part]
+    aliases = ["".join(parts)]
+    if len(parts) > 1 and len("".join(parts[1:])) >= 4:
+        aliases.append("".join(parts[1:]))
+    return aliases
+
+
+def parse_clauses(text: str) -> Dict[str, Dict[str, Any]]:
+    """Map each numbered heading to its heading line and text span (up to the next heading).
+    Contents-page entries end spans but are never clauses; a number that repeats (running
+    headers) keeps its longest span, the one with the body text."""
+    headings = [(match.start(), match.group(1) or match.group(2)) for match in HEADING_PATTERN.finditer(text)]
+    clauses = {}
+    for i, (start, number) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        span = text[start:end].strip()
+        heading = span.splitlines()[0].strip()
+        if CONTENTS_LINE_PATTERN.search(heading):
+            continue
+        if number in clauses and clauses[number]["end"] - clauses[number]["start"] >= end - start:
+            continue
+        clauses[number] = {"heading": heading, "start": start, "end": end, "text": span[:MAX_CLAUSE_CHARS]}
+    return clauses
+
+
+def find_references(question: str) -> List[str]:
+    """Clause numbers cited in a question."""
+    return [match.group(1) or match.group(2) for match in REFERENCE_PATTERN.finditer(question)]
+
+
+class ClauseIndex:
+    """Exact-match index from (document, clause number) to the clause's text span."""
+
+    def __init__(self, documents: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.documents = documents
+        self._aliases = {source: document_aliases(source) for source in documents}
+
+    @classmethod
+    def build(cls, texts: Dict[str, str]) -> "ClauseIndex":
+        """Index the clauses of each document's extracted text, keyed by source file name."""
+        return cls({source: parse_clauses(text) for source, text in texts.items()})
+
+    def __len__(self) -> int:
+        return sum(len(clauses) for clauses in self.documents.values())
+
+    def named_documents(self, question: str) -> List[str]:
+        """Documents the question names by their designation."""
+        compact = _compact(question)
+        return [source for source, aliases in self._aliases.items() if any(alias in compact for alias in aliases)]
+
+    def resolve(self, question: str, sources: Optional[List[str]] = None) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """The (source, clause, entry) spans a question cites. A clause without its own entry
+        resolves to its sub-clauses ("3.2" to "3.2.1", "3.2.2", ...). Documents named in the
+        question, or else the given sources, narrow the search."""
+        references = find_references(question)
+        if not references:
+            return []
+        candidates = self.named_documents(question) or sources or list(self.documents)
+        results = []
+        for source in candidates:
+            clauses = self.documents.get(source, {})
+            for number in references:
+                if number in clauses:
+                    results.append((source, number, clauses[number]))
+                    continue
+                children = sorted((n for n in clauses if n.startswith(number + ".")),
+                                  key=lambda n: [int(part) for part in n.split(".")])
+                results.extend((source, child, clauses[child]) for child in children)
+        return results
+
+    @staticmethod
+    def format_answer(matches: List[Tuple[str, str, Dict[str, Any]]]) -> str:
+        """The cited clauses quoted verbatim, each with its document."""
+        parts = []
+        for source, number, entry in matches[:MAX_ANSWER_CLAUSES]:
+            kind = "Section" if "." in number else "Paragraph"
+            quoted = "\n".join(f"> {line}" for line in entry["text"].splitlines() if line.strip())
+            parts.append(f"**{kind} {number}** ({source}):\n\n{quoted}")
+        if len(matches) > MAX_ANSWER_CLAUSES:
+            parts.append(f"{len(matches) - MAX_ANSWER_CLAUSES} more matching clauses not shown; "
+                         f"name the document or a more specific clause.")
+        return "\n\n".join(parts)
+
+    def save(self, directory: str):
+        with open(os.path.join(directory, CLAUSE_FILE), 'w') as f:
+            json.dump(self.documents, f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["ClauseIndex"]:
+        """Read the clauses cached with an index, or None if it has none."""
+        path = os.path.join(directory, CLAUSE_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable clause index {path}: {str(e)}")
+            return None
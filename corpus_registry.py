@@ -0,0 +1,169 @@
+##This is the file where named document corpora (FAA, ICAO, EASA, client documents...) are registered.
+# Each corpus has its own cached index, loaded on first use and evicted least-recently-used under a memory budget.
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from document_router import DocumentRouter
+from metrics import METRICS
+
+DEFAULT_CORPORA_FILE = "corpora.json"
+DEFAULT_MEMORY_BUDGET_MB = 1024.0
+
+logger = logging.getLogger(__name__)
+
+
+class LoadedCorpus:
+    """A corpus index resident in memory, with its document router and estimated size."""
+
+    def __init__(self, name: str, vector_store: Any, router: Optional[DocumentRouter], pinned: bool = False):
+        self.name = name
+        self.vector_store = vector_store
+        self.router = router
+        self.pinned = pinned
+        self.size_bytes = estimate_index_bytes(vector_store, router)
+
+    def close(self):
+        """Release what the index holds outside this process, such as shard workers."""
+        close = getattr(self.vector_store, "close", None)
+        if close is not None:
+            close()
+
+
+def estimate_index_bytes(vector_store: Any, router: Optional[DocumentRouter] = None) -> int:
+    """Approximate memory held by a FAISS store: its vectors (in shard workers for a sharded
+    store), the router's copies and the chunk text."""
+    sharded_index = getattr(vector_store, "sharded_index", None)
+    if sharded_index is not None:
+        vector_bytes = sharded_index.size * sharded_index.dimension * 4
+    else:
+        vector_bytes = vector_store.index.ntotal * vector_store.index.d * 4
+    text_bytes = sum(len(getattr(document, "page_content", "")) for document in
+                     getattr(vector_store.docstore, "_dict", {}).values())
+    return vector_bytes * (2 if router is not None and router.indexes else 1) + text_bytes
+
+
+class CorpusRegistry:
+    """Named corpora, each a directory of PDFs indexed through a shared PDFProcessor.
+    Corpora are read from CORPORA_FILE (default corpora.json), a JSON object mapping a
+    name to {"pdf_dir": ...}, with relative directories resolved against the file.
+    Loaded indexes are kept in LRU order; when their estimated size exceeds
+    CORPUS_MEMORY_BUDGET_MB the least recently used unpinned ones are evicted and closed.
+    Each corpus loads under its own lock, so a long build never blocks the others."""
+
+    def __init__(self, pdf_processor: Any, corpora: Optional[Dict[str, str]] = None,
+                 memory_budget_mb: Optional[float] = None):
+        self.pdf_processor = pdf_processor
+        self.pdf_dirs: Dict[str, str] = {}
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("CORPUS_MEMORY_BUDGET_MB", DEFAULT_MEMORY_BUDGET_MB))
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._loaded: "OrderedDict[str, LoadedCorpus]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        if corpora is None:
+            corpora = self.load_config(os.getenv("CORPORA_FILE", DEFAULT_CORPORA_FILE))
+        for name, pdf_dir in corpora.items():
+            self.register(name, pdf_dir)
+
+    @staticmethod
+    def load_config(path: str) -> Dict[str, str]:
+        """Read corpus names and PDF directories from a JSON file (empty if it does not exist)."""
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            config = json.load(f)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        return {name: os.path.join(base_dir, entry["pdf_dir"]) for name, entry in config.items()}
+
+    def register(self, name: str, pdf_dir: str):
+        """Add a corpus backed by a directory of PDFs."""
+        self.pdf_dirs[name] = pdf_dir
+
+    def pin(self, name: str, vector_store: Any, router: Optional[DocumentRouter] = None):
+        """Add an index that is already in memory and must never be evicted (such as the default documents)."""
+        with self._lock:
+            replaced = self._loaded.get(name)
+            self._loaded[name] = LoadedCorpus(name, vector_store, router, pinned=True)
+            evicted = self._evict()
+        if replaced is not None and replaced.vector_store is not vector_store:
+            evicted.append(replaced)
+        self._close(evicted)
+
+    def names(self) -> List[str]:
+        """All corpora that questions can target."""
+        return sorted(set(self.pdf_dirs) | set(self._loaded))
+
+    def loaded_names(self) -> List[str]:
+        """Corpora currently resident in memory, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
+
+    def memory_usage_bytes(self) -> int:
+        with self._lock:
+            return sum(corpus.size_bytes for corpus in self._loaded.values())
+
+    def get(self, name: str) -> LoadedCorpus:
+        """Return a corpus index, loading it from the cache (or building it) on first use.
+        Concurrent requests for a corpus that is loading wait for that one load."""
+        corpus = self._get_loaded(name)
+        if corpus is not None:
+            return corpus
+        with self._lock:
+            if name not in self.pdf_dirs:
+                raise KeyError(f"Unknown corpus '{name}'")
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            corpus = self._get_loaded(name)
+            if corpus is not None:
+                return corpus
+            with METRICS.span("corpus_load"):
+                vector_store = self.pdf_processor.process_directory(self.pdf_dirs[name])
+            if vector_store is None:
+                raise ValueError(f"Corpus '{name}' could not be loaded from {self.pdf_dirs[name]}")
+            corpus = LoadedCorpus(name, vector_store, DocumentRouter.from_vector_store(vector_store))
+            with self._lock:
+                self._loaded[name] = corpus
+                evicted = self._evict(keep=name)
+        METRICS.increment("corpus_loads")
+        logger.info(f"Loaded corpus '{name}' ({corpus.size_bytes / (1024 * 1024):.1f} MB)")
+        self._close(evicted)
+        return corpus
+
+    def _get_loaded(self, name: str) -> Optional[LoadedCorpus]:
+        with self._lock:
+            corpus = self._loaded.get(name)
+            if corpus is not None:
+                self._loaded.move_to_end(name)
+            return corpus
+
+    def _evict(self, keep: Optional[str] = None) -> List[LoadedCorpus]:
+        """Evict least recently used unpinned corpora until the budget is met (caller holds the lock).
+        Returns the evicted corpora, for the caller to close once the lock is released."""
+        evicted = []
+        total = sum(corpus.size_bytes for corpus in self._loaded.values())
+        for name in list(self._loaded):
+            if total <= self.memory_budget_bytes:
+                break
+            corpus = self._loaded[name]
+            if corpus.pinned or name == keep:
+                continue
+            del self._loaded[name]
+            total -= corpus.size_bytes
+            evicted.append(corpus)
+            METRICS.increment("corpus_evictions")
+            logger.info(f"Evicted corpus '{name}' to stay within the memory budget")
+        return evicted
+
+    @staticmethod
+    def _close(corpora: List[LoadedCorpus]):
+        for corpus in corpora:
+            try:
+                corpus.close()
+            except Exception as e:
+                logger.warning(f"Error closing corpus '{corpus.name}': {str(e)}")
@@ -0,0 +1,104 @@
+##This is the file where queries are routed to the most relevant documents before chunk search.
+# Each document gets a centroid vector and its own FAISS index built from the chunks of the merged store.
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from metrics import METRICS
+
+DEFAULT_ROUTE_DOCUMENTS = 2
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentRouter:
+    """Per-document centroids and sub-indexes over a merged FAISS store.
+    A query is scored against the centroids first, then searched only in the chosen
+    documents' indexes, so search cost follows the size of those documents.
+    Without sub-indexes the chosen documents are searched by the store itself, which
+    must accept a sources argument (as sharded stores do)."""
+
+    def __init__(self, vector_store: Any, centroids: np.ndarray, sources: List[str],
+                 indexes: Dict[str, Any], docstore_ids: Dict[str, List[str]]):
+        self.vector_store = vector_store
+        self.centroids = centroids
+        self.sources = sources
+        self.indexes = indexes
+        self.docstore_ids = docstore_ids
+
+    @classmethod
+    def from_vector_store(cls, vector_store: Any, sub_indexes: bool = True) -> Optional["DocumentRouter"]:
+        """Build a router from a FAISS store whose chunks carry "source" metadata.
+        Returns the store's own document_router when it has one, and None when the store
+        has no sources (indexes cached before chunks were tagged) or its index cannot
+        return stored vectors."""
+        import faiss
+
+        prebuilt = getattr(vector_store, "document_router", None)
+        if prebuilt is not None:
+            return prebuilt
+        index = vector_store.index
+        positions_by_source: Dict[str, List[int]] = {}
+        for position, docstore_id in vector_store.index_to_docstore_id.items():
+            document = vector_store.docstore.search(docstore_id)
+            source = getattr(document, "metadata", {}).get("source")
+            if source is None:
+                return None
+            positions_by_source.setdefault(source, []).append(position)
+        if not positions_by_source:
+            return None
+        try:
+            vectors = index.reconstruct_n(0, index.ntotal)
+        except RuntimeError as e:
+            logger.warning(f"Document routing disabled, index vectors are not retrievable: {str(e)}")
+            return None
+
+        sources = sorted(positions_by_source)
+        centroids = np.zeros((len(sources), index.d), dtype=np.float32)
+        indexes = {}
+        docstore_ids = {}
+        for row, source in enumerate(sources):
+            positions = positions_by_source[source]
+            document_vectors = np.ascontiguousarray(vectors[positions], dtype=np.float32)
+            centroid = document_vectors.mean(axis=0)
+            norm = np.linalg.norm(centroid)
+            centroids[row] = centroid / norm if norm else centroid
+            if not sub_indexes:
+                continue
+            sub_index = faiss.IndexFlatL2(index.d)
+            sub_index.add(document_vectors)
+            indexes[source] = sub_index
+            docstore_ids[source] = [vector_store.index_to_docstore_id[p] for p in positions]
+        return cls(vector_store, centroids, sources, indexes, docstore_ids)
+
+    def route(self, query_vector: List[float], top_n: int = DEFAULT_ROUTE_DOCUMENTS) -> List[str]:
+        """Return the top_n documents whose centroids are most similar to the query."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = self.centroids @ query
+        order = np.argsort(-scores)[:top_n]
+        return [self.sources[i] for i in order]
+
+    def search(self, query_vector: List[float], sources: List[str], k: int) -> List[Tuple[Document, float]]:
+        """Search the chunks of the given documents only and merge the best k by distance."""
+        METRICS.increment("documents_searched", len(sources))
+        if not self.indexes:
+            return self.vector_store.similarity_search_with_score_by_vector(query_vector, k=k, sources=sources)
+        query = np.asarray([query_vector], dtype=np.float32)
+        candidates = []
+        for source in sources:
+            sub_index = self.indexes.get(source)
+            if sub_index is None:
+                continue
+            distances, positions = sub_index.search(query, min(k, sub_index.ntotal))
+            for distance, position in zip(distances[0], positions[0]):
+                if position >= 0:
+                    candidates.append((float(distance), self.docstore_ids[source][position]))
+        candidates.sort(key=lambda candidate: candidate[0])
+        return [(self.vector_store.docstore.search(docstore_id), distance)
+                for distance, docstore_id in candidates[:k]]
@@ -0,0 +1,204 @@
+##This is the file where PDF extraction is run in an isolated worker process.
+# A worker that misses its page or file deadline, or crashes, is killed and replaced.
+
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+import subprocess
+from typing import List, Optional
+
+DEFAULT_PAGE_TIMEOUT = 30.0
+DEFAULT_FILE_TIMEOUT = 300.0
+STARTUP_TIMEOUT = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a PDF misses its page or file deadline, or kills its worker."""
+
+
+class ExtractionWorkerError(Exception):
+    """Raised when a worker process cannot be started; the file itself is not at fault."""
+
+
+def _extraction_worker(extractor_name: str):
+    """Worker process loop: read PDF paths from stdin and stream their pages to stdout
+    as JSON lines."""
+    from pdf_extractors import get_extractor
+    extractor = get_extractor(extractor_name)
+    _send({"kind": "ready"})
+    for line in sys.stdin:
+        task = json.loads(line)
+        task_id = task["task_id"]
+        try:
+            for page_text in extractor.iter_pages(task["path"]):
+                _send({"kind": "page", "task_id": task_id, "text": page_text})
+            _send({"kind": "done", "task_id": task_id})
+        except Exception as e:
+            _send({"kind": "error", "task_id": task_id, "error": str(e)})
+
+
+def _send(message: dict):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+class IsolatedExtractor:
+    """Runs a PDFExtractor in a separate process with per-page and per-file deadlines.
+    The worker is a plain `python -m extraction_workers` subprocess, so it never
+    re-imports the host's main module (Streamlit, CLI or notebook)."""
+
+    def __init__(self, extractor_name: str, page_timeout: float = DEFAULT_PAGE_TIMEOUT,
+                 file_timeout: float = DEFAULT_FILE_TIMEOUT):
+        self.extractor_name = extractor_name
+        self.page_timeout = page_timeout
+        self.file_timeout = file_timeout
+        self.restart_count = 0
+        self._process = None
+        self._messages = None
+        self._next_task_id = 0
+        self._lock = threading.Lock()
+
+    def _start_worker(self):
+        """Start a fresh worker process and a thread that queues its output, and wait until
+        it has loaded its backend, so startup time never counts against a file's deadlines."""
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "extraction_workers", self.extractor_name],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self._messages = queue.Queue()
+        threading.Thread(target=self._read_output, args=(self._process, self._messages), daemon=True).start()
+        try:
+            message = self._messages.get(timeout=STARTUP_TIMEOUT)
+        except queue.Empty:
+            message = {"kind": "exit"}
+        if message.get("kind") != "ready":
+            self._kill_worker()
+            raise ExtractionWorkerError(f"PDF extraction worker for '{self.extractor_name}' failed to start")
+
+    @staticmethod
+    def _read_output(process, messages):
+        try:
+            for line in process.stdout:
+                try:
+                    messages.put(json.loads(line))
+                except ValueError:
+                    continue
+        except (OSError, ValueError):
+            pass
+        messages.put({"kind": "exit"})
+
+    def _kill_worker(self):
+        """Kill the worker process."""
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait(timeout=5)
+        for stream in (self._process.stdin, self._process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        self._process = None
+
+    def _restart_worker(self):
+        """Kill a stuck or crashed worker; the next file starts a fresh one."""
+        self._kill_worker()
+        self.restart_count += 1
+        logger.warning(f"Restarting PDF extraction worker (restart #{self.restart_count})")
+
+    def _submit(self, task: dict):
+        """Send a task to the worker, starting it if needed. A worker that died since the
+        last file shows up as a broken pipe here and is replaced once."""
+        for attempt in range(2):
+            if self._process is None or self._process.poll() is not None:
+                if self._process is not None:
+                    self._restart_worker()
+                self._start_worker()
+            try:
+                self._process.stdin.write(json.dumps(task) + "\n")
+                self._process.stdin.flush()
+                return
+            except (OSError, ValueError):
+                self._restart_worker()
+                if attempt:
+                    raise ExtractionTimeout("extraction worker died before accepting the file")
+
+    def extract_pages(self, pdf_path: str) -> Optional[List[str]]:
+        """Extract every page of the PDF in the worker process.
+        Returns None if the backend raised an error, raises ExtractionTimeout
+        if a deadline was missed or the worker died, and ExtractionWorkerError
+        if no worker could be started. Callers on other threads wait for the
+        worker to finish the current file."""
+        with self._lock:
+            return self._extract_pages(pdf_path)
+
+    def _extract_pages(self, pdf_path: str) -> Optional[List[str]]:
+        self._next_task_id += 1
+        task_id = self._next_task_id
+        self._submit({"task_id": task_id, "path": os.path.abspath(pdf_path)})
+
+        pages = []
+        start_time = time.monotonic()
+        last_progress = start_time
+        while True:
+            now = time.monotonic()
+            if now - start_time > self.file_timeout:
+                self._restart_worker()
+                raise ExtractionTimeout(
+                    f"file deadline of {self.file_timeout:.0f}s exceeded after {len(pages)} pages")
+            if now - last_progress > self.page_timeout:
+                self._restart_worker()
+                raise ExtractionTimeout(
+                    f"page deadline of {self.page_timeout:.0f}s exceeded on page {len(pages) + 1}")
+
+            wait = min(0.25, start_time + self.file_timeout - now, last_progress + self.page_timeout - now)
+            try:
+                message = self._messages.get(timeout=max(wait, 0.001))
+            except queue.Empty:
+                if self._process.poll() is None:
+                    continue
+                message = {"kind": "exit"}
+            if message.get("kind") == "exit":
+                try:
+                    exit_code = self._process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    exit_code = None
+                self._restart_worker()
+                raise ExtractionTimeout(
+                    f"extraction worker died (exit code {exit_code}) on page {len(pages) + 1}")
+            if message.get("task_id") != task_id:
+                continue
+
+            if message["kind"] == "page":
+                pages.append(message["text"])
+                last_progress = time.monotonic()
+            elif message["kind"] == "done":
+                return pages
+            else:
+                logger.error(f"Error processing PDF {pdf_path}: {message['error']}")
+                return None
+
+    def close(self):
+        """Stop the worker process."""
+        if self._process is not None and self._process.poll() is None:
+            self._process.stdin.close()
+            try:
+                self._process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                pass
+        self._kill_worker()
+
+
+if __name__ == "__main__":
+    _extraction_worker(sys.argv[1])
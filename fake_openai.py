@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Deterministic local stand-in for the OpenAI embeddings and chat-completions endpoints.
+Used for offline tests and benchmarks; latency and error injection are configurable.
+"""
+
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from local_embeddings import HashingEmbeddings
+
+DEFAULT_DIMENSIONS = 1536
+
+
+def _approximate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for the usage fields."""
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIServer:
+    """Serves /v1/embeddings, /v1/chat/completions and /v1/models on a local port.
+    Embeddings come from the local hashing vectorizer, so retrieval stays meaningful,
+    and chat answers are a deterministic function of the prompt.
+    connect_latency_ms delays the first request on each new connection, standing in
+    for the TCP and TLS handshake of the real API."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, error_status: int = 429,
+                 dimensions: int = DEFAULT_DIMENSIONS, seed: int = 0, connect_latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.connect_latency_ms = connect_latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.embeddings = HashingEmbeddings(n_features=dimensions)
+        self.request_counts: Dict[str, int] = {"embeddings": 0, "chat": 0, "models": 0, "errors": 0,
+                                               "connections": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_delay_and_error(self):
+        """Draw this request's injected latency and whether it fails, reproducibly."""
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            failed = self._random.random() < self.error_rate
+        return max(0.0, self.latency_ms + jitter) / 1000.0, failed
+
+    def _count(self, key: str):
+        with self._lock:
+            self.request_counts[key] += 1
+
+    def embeddings_response(self, body: dict) -> dict:
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        # Token-id inputs (sent when the client checks context length) are hashed as text
+        texts = [item if isinstance(item, str) else " ".join(map(str, item)) for item in inputs]
+        vectors = self.embeddings.embed_documents(texts) if texts else []
+        dimensions = body.get("dimensions")
+        if dimensions:
+            # Like text-embedding-3 shortening: the leading components, re-normalized
+            vectors = [vector[:dimensions] for vector in vectors]
+            vectors = [[value / (sum(v * v for v in vector) ** 0.5 or 1.0) for value in vector] for vector in vectors]
+        prompt_tokens = sum(_approximate_tokens(text) for text in texts)
+        return {
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        }
+
+    def chat_response(self, body: dict) -> dict:
+        messages: List[dict] = body.get("messages", [])
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        last_message = str(messages[-1].get("content", "")) if messages else ""
+        digest = hashlib.md5(prompt.encode()).hexdigest()
+        answer = f"Based on the provided aviation documents (ref {digest[:8]}): {last_message.strip()[-200:]}"
+        prompt_tokens = _approximate_tokens(prompt)
+        completion_tokens = _approximate_tokens(answer)
+        return {
+            "id": f"chatcmpl-{digest[:24]}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; Nagle would add ~40ms per response
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                server._count("connections")
+                if server.connect_latency_ms:
+                    time.sleep(server.connect_latency_ms / 1000.0)
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _fail_or_delay(self) -> bool:
+                delay, failed = server._next_delay_and_error()
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    server._count("errors")
+                    self._send_json(server.error_status, {"error": {
+                        "message": "Injected error from fake OpenAI server",
+                        "type": "rate_limit_error" if server.error_status == 429 else "server_error",
+                    }})
+                return failed
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    server._count("models")
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": "gpt-4o-mini", "object": "model"},
+                        {"id": "text-embedding-ada-002", "object": "model"},
+                    ]})
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.endswith("/embeddings"):
+                    server._count("embeddings")
+                    if not self._fail_or_delay():
+                        self._send_json(200, server.embeddings_response(body))
+                elif self.path.endswith("/chat/completions"):
+                    server._count("chat")
+                    if not self._fail_or_delay():
+                        self._send_json(200, server.chat_response(body))
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a deterministic fake OpenAI API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter around the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429, help="HTTP status of injected errors")
+    parser.add_argument("--dimensions", type=int, default=DEFAULT_DIMENSIONS, help="Embedding size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0,
+                        help="Added latency per new connection (simulated handshake)")
+    args = parser.parse_args(argv)
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.jitter_ms,
+                              args.error_rate, args.error_status, args.dimensions, args.seed,
+                              args.connect_latency_ms)
+    print(f"Fake OpenAI API listening on {server.base_url} (set OPENAI_BASE_URL to use it)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+##This is the file where the pooled HTTP client shared by the OpenAI chat and embeddings clients is defined.
+# One keep-alive connection pool per process, so later calls skip the TCP and TLS handshake.
+
+import os
+import logging
+import threading
+from typing import Any, Optional
+
+from metrics import METRICS
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 120.0  # seconds an idle connection is kept open
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def pool_enabled() -> bool:
+    """The shared pool is used unless HTTP_POOL is false."""
+    return os.getenv("HTTP_POOL", "true").lower() not in ("0", "false", "no")
+
+
+def get_http_client() -> Optional[Any]:
+    """The process-wide httpx client, created on first use; None when pooling is disabled,
+    in which case each OpenAI client opens its own connections.
+    Pool limits come from HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY (seconds) and HTTP_TIMEOUT (seconds)."""
+    global _client
+    if not pool_enabled():
+        return None
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            import httpx
+            limits = httpx.Limits(
+                max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+                max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS",
+                                                        DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+                keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY))
+            )
+            timeout = httpx.Timeout(float(os.getenv("HTTP_TIMEOUT", DEFAULT_TIMEOUT)), connect=10.0)
+            _client = httpx.Client(limits=limits, timeout=timeout)
+        return _client
+
+
+def close_http_client():
+    """Close the shared client and its pooled connections."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def warm_up(openai_api_key: str, openai_base_url: Optional[str] = None) -> bool:
+    """Open a pooled connection ahead of the first question with a GET /models request."""
+    client = get_http_client()
+    if client is None:
+        return False
+    import httpx
+    url = (openai_base_url or DEFAULT_OPENAI_BASE_URL).rstrip("/") + "/models"
+    try:
+        with METRICS.span("http_warmup"):
+            response = client.get(url, headers={"Authorization": f"Bearer {openai_api_key}"})
+    except httpx.HTTPError as e:
+        logger.warning(f"HTTP warm-up failed: {str(e)}")
+        return False
+    return response.status_code < 500
+
+
+def warm_up_in_background(openai_api_key: str, openai_base_url: Optional[str] = None) -> Optional[threading.Thread]:
+    """Warm the pool on a background thread when HTTP_WARMUP is true."""
+    if os.getenv("HTTP_WARMUP", "false").lower() not in ("1", "true", "yes") or not pool_enabled():
+        return None
+    thread = threading.Thread(target=warm_up, args=(openai_api_key, openai_base_url), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,136 @@
+##This is the file where questions are routed to greeting, off-topic or aviation handling before retrieval.
+# Keyword lists are compiled into word-boundary regular expressions; an optional centroid classifier handles the rest.
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+GREETING = "greeting"
+OFF_TOPIC = "off_topic"
+AVIATION = "aviation"
+
+GREETING_PHRASES = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening",
+                    "how are you", "what's up", "whats up", "greetings"]
+# Words that may follow a greeting in a message that is still only a greeting ("hello again", "hi team")
+GREETING_TAILS = ["there", "team", "again", "all", "everyone", "anyone there", "can you help me",
+                  "how are you", "is anyone there"]
+# Longest message the classifier may call a greeting
+GREETING_MAX_WORDS = 6
+# Off-topic words that never appear in aviation questions
+OFF_TOPIC_WORDS = ["sports", "movie", "music", "shopping", "restaurant", "recipe", "joke"]
+# Off-topic words that aviation questions also use ("weather minimums", "travel time", "news release"):
+# they divert a question on their own only when no classifier is configured, else the classifier decides
+AMBIGUOUS_OFF_TOPIC_WORDS = ["weather", "news", "food", "travel"]
+AVIATION_WORDS = ["airport", "aviation", "aircraft", "airplane", "runway", "taxiway", "terminal", "airspace",
+                  "navigation", "approach", "departure", "apron", "helipad", "heliport", "pavement",
+                  "threshold", "obstacle", "clearance", "separation", "marking", "lighting", "signage",
+                  "faa", "icao", "easa", "advisory circular", "design group", "safety area", "blast pad",
+                  "holding position", "airfield", "airside", "landside", "gate", "hangar", "pilot", "flight"]
+
+# Labelled examples for the optional centroid classifier. Keep them apart from intent_test_set.jsonl,
+# which measures the classifier on questions it was not built from.
+CLASSIFIER_EXAMPLES: Dict[str, List[str]] = {
+    GREETING: ["thanks, have a nice day", "howdy folks", "cheers mate", "thank you so much",
+               "pleased to make your acquaintance", "salutations", "long time no see", "see you later"],
+    OFF_TOPIC: ["what is the football score", "who won the election", "best pizza recipe",
+                "stock market prices today", "write me a poem about cats", "how do I bake bread",
+                "what is the capital of france", "suggest a holiday destination", "which phone should I buy",
+                "is it going to rain tomorrow", "book me a hotel for the weekend", "latest celebrity gossip"],
+    AVIATION: ["minimum distance between parallel runways", "runway end safety area length",
+               "aircraft stand clearances", "glide slope antenna siting", "fire and rescue response time",
+               "pavement classification number", "helicopter final approach area size",
+               "what is the maximum gradient", "what are the clearance criteria", "how wide must the shoulder be",
+               "what is the design standard for this", "what does the standard require",
+               "what is the allowed transverse grade"],
+}
+
+
+def _compile_phrases(phrases: List[str], plurals: bool = True) -> "re.Pattern":
+    """Compile phrases into one case-insensitive word-boundary alternation, optionally allowing plurals."""
+    alternatives = sorted((re.escape(phrase).replace(r"\ ", r"\s+") for phrase in phrases), key=len, reverse=True)
+    suffix = "s?" if plurals else ""
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")" + suffix + r"\b", re.IGNORECASE)
+
+
+class CentroidIntentClassifier:
+    """Nearest-centroid classifier over embeddings of labelled example questions.
+    Uses the offline hashing embeddings by default, so classifying costs no API call."""
+
+    def __init__(self, embeddings=None, examples: Optional[Dict[str, List[str]]] = None,
+                 min_margin: float = 0.1):
+        if embeddings is None:
+            from local_embeddings import HashingEmbeddings
+            embeddings = HashingEmbeddings(n_features=2048)
+        self.embeddings = embeddings
+        self.min_margin = min_margin
+        examples = examples or CLASSIFIER_EXAMPLES
+        self.labels = sorted(examples)
+        centroids = []
+        for label in self.labels:
+            centroid = np.asarray(embeddings.embed_documents(examples[label]), dtype=np.float32).mean(axis=0)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+        self.centroids = np.vstack(centroids)
+
+    def classify(self, text: str, min_margin: Optional[float] = None) -> Tuple[str, float]:
+        """Return the closest label and its margin over the runner-up.
+        Results below min_margin (default: the classifier's) fall back to aviation so real
+        questions still reach retrieval."""
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        scores = self.centroids @ (vector / (np.linalg.norm(vector) or 1.0))
+        order = np.argsort(-scores)
+        margin = float(scores[order[0]] - scores[order[1]]) if len(order) > 1 else float(scores[order[0]])
+        if margin < (self.min_margin if min_margin is None else min_margin):
+            return AVIATION, margin
+        return self.labels[order[0]], margin
+
+
+def _compile_greeting(phrases: List[str], tails: List[str]) -> "re.Pattern":
+    """Compile a pattern matching a whole message that is only a greeting, optionally followed
+    by greeting tails and punctuation or emoticons ("Hi :)", "hello, anyone there?")."""
+    def alternation(items: List[str]) -> str:
+        return "|".join(sorted((re.escape(item).replace(r"\ ", r"\s+") for item in items), key=len, reverse=True))
+    return re.compile(r"^\W*(?:" + alternation(phrases) + r")(?:\W+(?:" + alternation(tails) + r"))*[\W_]*$",
+                      re.IGNORECASE)
+
+
+class IntentRouter:
+    """Routes a question to "greeting", "off_topic" or "aviation".
+    Only a message that is nothing but a greeting gets the canned greeting ("Hello, what does
+    paragraph 305 say?" is a real question). Aviation vocabulary wins over off-topic words;
+    ambiguous off-topic words and questions matching no list go to the classifier when one
+    is configured, and to aviation otherwise."""
+
+    def __init__(self, classifier: Optional[CentroidIntentClassifier] = None):
+        self.classifier = classifier
+        self.greeting_pattern = _compile_greeting(GREETING_PHRASES, GREETING_TAILS)
+        self.off_topic_pattern = _compile_phrases(OFF_TOPIC_WORDS)
+        self.ambiguous_off_topic_pattern = _compile_phrases(AMBIGUOUS_OFF_TOPIC_WORDS)
+        self.aviation_pattern = _compile_phrases(AVIATION_WORDS)
+
+    @classmethod
+    def from_env(cls) -> "IntentRouter":
+        """Enable the centroid classifier when INTENT_CLASSIFIER is "centroid"."""
+        if os.getenv("INTENT_CLASSIFIER", "").lower() == "centroid":
+            return cls(CentroidIntentClassifier())
+        return cls()
+
+    def route(self, question: str) -> str:
+        if self.greeting_pattern.match(question):
+            return GREETING
+        if self.aviation_pattern.search(question):
+            return AVIATION
+        if self.off_topic_pattern.search(question):
+            return OFF_TOPIC
+        if self.classifier is not None:
+            # An ambiguous off-topic word is a hint: the closest label decides, whatever its margin
+            ambiguous = self.ambiguous_off_topic_pattern.search(question) is not None
+            intent = self.classifier.classify(question, min_margin=0.0 if ambiguous else None)[0]
+            # A greeting inside a longer message is not a greeting
+            if intent == GREETING and len(question.split()) > GREETING_MAX_WORDS:
+                return AVIATION
+            return intent
+        if self.ambiguous_off_topic_pattern.search(question):
+            return OFF_TOPIC
+        return AVIATION
@@ -0,0 +1,76 @@
+##This is the file where the LangChain callbacks of the QA chain are defined.
+# They feed stage timings to the metrics registry and token usage to the ledger.
+
+import time
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import METRICS, MetricsRegistry
+from token_accounting import LEDGER, TokenLedger, DEFAULT_CHAT_MODEL
+
+
+class StageTimingHandler(BaseCallbackHandler):
+    """LangChain callback that times LLM calls as condense_question or completion
+    and counts their tokens."""
+
+    def __init__(self, registry: MetricsRegistry = METRICS):
+        self.registry = registry
+        self._run_names: Dict[UUID, str] = {}
+        self._run_parents: Dict[UUID, Optional[UUID]] = {}
+        self._llm_starts: Dict[UUID, tuple] = {}
+
+    def _remember(self, serialized: Optional[Dict[str, Any]], run_id: UUID,
+                  parent_run_id: Optional[UUID], name: Optional[str]):
+        if name is None and serialized:
+            name = serialized.get("name") or (serialized.get("id") or [""])[-1]
+        self._run_names[run_id] = name or ""
+        self._run_parents[run_id] = parent_run_id
+
+    def _stage_for(self, parent_run_id: Optional[UUID]) -> str:
+        """The final answer runs inside the combine-documents chain; anything else is the condense step."""
+        while parent_run_id is not None:
+            if "StuffDocuments" in self._run_names.get(parent_run_id, ""):
+                return "completion"
+            parent_run_id = self._run_parents.get(parent_run_id)
+        return "condense_question"
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._remember(serialized, run_id, parent_run_id, kwargs.get("name"))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._llm_starts[run_id] = (self._stage_for(parent_run_id), time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._llm_starts[run_id] = (self._stage_for(parent_run_id), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        stage, start_time = self._llm_starts.pop(run_id, ("llm", time.perf_counter()))
+        self.registry.record_duration(stage, time.perf_counter() - start_time)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.registry.increment("llm_calls")
+        self.registry.increment("prompt_tokens", usage.get("prompt_tokens", 0))
+        self.registry.increment("completion_tokens", usage.get("completion_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._llm_starts.pop(run_id, None)
+        self.registry.increment("llm_errors")
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """LangChain callback that records each LLM call's reported token usage in the ledger."""
+
+    def __init__(self, scopes: List[str], ledger: TokenLedger = LEDGER):
+        self.scopes = scopes
+        self.ledger = ledger
+
+    def on_llm_end(self, response, **kwargs):
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        self.ledger.record(
+            self.scopes,
+            llm_output.get("model_name") or DEFAULT_CHAT_MODEL,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+        )
@@ -0,0 +1,95 @@
+##This is the file where the offline embedding backend is defined.
+# It hashes words and word pairs into a fixed-size vector with NumPy, so no network is needed.
+
+import os
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_N_FEATURES = 4096
+PROJECTION_FILE = "local_projection.npy"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+
+
+class HashingEmbeddings(Embeddings):
+    """Signed feature-hashing vectorizer over unigrams and bigrams, with an optional
+    truncated-SVD projection fitted on the indexed chunks."""
+
+    is_local = True  # no API calls, so queries are not billed
+
+    def __init__(self, n_features: int = DEFAULT_N_FEATURES, n_components: int = 0,
+                 projection: Optional[np.ndarray] = None):
+        self.n_features = n_features
+        self.n_components = n_components
+        self.projection = projection
+
+    @property
+    def backend_id(self) -> str:
+        """Identifier of the vector space, used to keep caches from different settings apart."""
+        backend_id = f"local-h{self.n_features}"
+        if self.n_components:
+            backend_id += f"-svd{self.n_components}"
+        return backend_id
+
+    def _hash_features(self, text: str) -> np.ndarray:
+        """Map a text to its sublinear term-frequency hashing vector."""
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = zlib.crc32(feature.encode())
+            vector[h % self.n_features] += 1.0 if h & 0x80000000 else -1.0
+        return np.sign(vector) * np.log1p(np.abs(vector))
+
+    def _hash_matrix(self, texts: List[str]) -> np.ndarray:
+        """Hash a batch of texts into a (len(texts), n_features) matrix."""
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self._hash_features(text)
+        return matrix
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        matrix = self._hash_matrix(texts)
+        if self.projection is not None:
+            matrix = matrix @ self.projection.T
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+    def fit(self, texts: List[str]) -> "HashingEmbeddings":
+        """Return a copy whose SVD projection is fitted on the given texts.
+        Without n_components, or with too few texts, this returns self unchanged."""
+        if not self.n_components or len(texts) <= self.n_components:
+            return self
+        matrix = self._hash_matrix(texts)
+        # Randomized range finder (Halko et al.) keeps the fit cheap for wide hashing matrices
+        rng = np.random.default_rng(0)
+        sketch = matrix @ rng.standard_normal((self.n_features, self.n_components + 10), dtype=np.float32)
+        for _ in range(2):
+            sketch = matrix @ (matrix.T @ sketch)
+        basis, _ = np.linalg.qr(sketch)
+        _, _, components = np.linalg.svd(basis.T @ matrix, full_matrices=False)
+        return HashingEmbeddings(self.n_features, self.n_components,
+                                 components[:self.n_components].astype(np.float32))
+
+    def save_projection(self, directory: str):
+        """Store the fitted projection next to a saved FAISS index."""
+        if self.projection is not None:
+            np.save(os.path.join(directory, PROJECTION_FILE), self.projection)
+
+    def load_projection(self, directory: str) -> "HashingEmbeddings":
+        """Return a copy using the projection saved with a FAISS index, if there is one."""
+        projection_path = os.path.join(directory, PROJECTION_FILE)
+        if not os.path.exists(projection_path):
+            return self
+        return HashingEmbeddings(self.n_features, self.n_components, np.load(projection_path))
@@ -2,7 +2,6 @@
 import os
 import sys
 import subprocess
-from agent import AviationAgent
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,6 +25,9 @@ def run_cli():
         raise ValueError("Please set the OPENAI_API_KEY environment variable")
 
     print("🤖 Initializing Aviation Agent...")
+    # Imported here so the menu appears before LangChain, OpenAI and FAISS are loaded
+    from agent import AviationAgent
+    
     # Initialize the aviation agent
     agent = AviationAgent(openai_api_key)
     
@@ -36,6 +38,9 @@ def run_cli():
         print("❌ Failed to load documents from default directory.")
         return
     
+    for entry in agent.pdf_processor.get_quarantined_files():
+        print(f"⚠️ Skipped {entry['file']}: {entry['reason']}")
+    
     print("✅ PDF processing complete! You can now ask questions about the documents.")
     print("💡 Type 'exit' to quit the conversation.")
     print("📄 Available documents: Check the 'test_pdfs' directory for loaded files.")
@@ -0,0 +1,162 @@
+##This is the file where latency spans and counters are collected.
+# Metrics can be read as JSON, as Prometheus text, or over a small HTTP endpoint.
+
+import time
+import json
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+METRIC_PREFIX = "aviation"
+QUANTILES = (0.5, 0.9, 0.99)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+class MetricsRegistry:
+    """Thread-safe store of named timing spans, counters and recent query traces."""
+
+    def __init__(self, max_samples: int = 1000, max_traces: int = 50):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._timings: Dict[str, Dict[str, Any]] = {}
+        self._counters: Dict[str, float] = {}
+        self._traces = deque(maxlen=max_traces)
+
+    def record_duration(self, name: str, seconds: float):
+        """Record one timing sample for a stage, and add it to the active query trace."""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = {"count": 0, "sum": 0.0, "samples": deque(maxlen=self.max_samples)}
+                self._timings[name] = timing
+            timing["count"] += 1
+            timing["sum"] += seconds
+            timing["samples"].append(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["stages"][name] = round(trace["stages"].get(name, 0.0) + seconds, 6)
+
+    def increment(self, name: str, value: float = 1):
+        """Increase a counter, and the matching counter of the active query trace."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["counters"][name] = trace["counters"].get(name, 0) + value
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as one sample of the named stage."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_duration(name, time.perf_counter() - start_time)
+
+    @contextmanager
+    def trace(self, session_id: Optional[str] = None):
+        """Collect the stage breakdown of one query; kept in the recent-traces list.
+        Traces never hold the question text, and the session is only used to filter them."""
+        trace = {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "session_id": session_id,
+            "stages": {},
+            "counters": {},
+        }
+        token = _current_trace.set(trace)
+        start_time = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace["total_seconds"] = round(time.perf_counter() - start_time, 6)
+            _current_trace.reset(token)
+            with self._lock:
+                self._traces.append(trace)
+
+    def recent_traces(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the most recent query traces, newest first, optionally only one session's.
+        Session ids are left out, as they give access to a session's chat history."""
+        with self._lock:
+            traces = list(reversed(self._traces))
+        return [{key: value for key, value in trace.items() if key != "session_id"}
+                for trace in traces if session_id is None or trace["session_id"] == session_id]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get all metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            timings = {}
+            for name, timing in self._timings.items():
+                samples = sorted(timing["samples"])
+                timings[name] = {
+                    "count": timing["count"],
+                    "sum_seconds": round(timing["sum"], 6),
+                    "mean_seconds": round(timing["sum"] / timing["count"], 6),
+                }
+                for quantile in QUANTILES:
+                    index = min(len(samples) - 1, int(quantile * len(samples)))
+                    timings[name][f"p{int(quantile * 100)}_seconds"] = round(samples[index], 6)
+            return {"timings": timings, "counters": dict(self._counters)}
+
+    def to_json(self) -> str:
+        return json.dumps(dict(self.snapshot(), recent_traces=self.recent_traces()), indent=2)
+
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Latency of pipeline stages.",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds summary",
+        ]
+        for name, timing in sorted(snapshot["timings"].items()):
+            for quantile in QUANTILES:
+                value = timing[f"p{int(quantile * 100)}_seconds"]
+                lines.append(f'{METRIC_PREFIX}_stage_seconds{{stage="{name}",quantile="{quantile}"}} {value}')
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{name}"}} {timing["sum_seconds"]}')
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{name}"}} {timing["count"]}')
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            lines.append(f"{METRIC_PREFIX}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Forget all recorded metrics."""
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._traces.clear()
+
+
+# Process-wide registry shared by the PDF processor and the agent
+METRICS = MetricsRegistry()
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1", registry: MetricsRegistry = METRICS) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json on a background thread.
+    The endpoint has no authentication, so it listens on localhost unless a host is given."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, content_type = registry.to_json().encode(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, content_type = registry.render_prometheus().encode(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
@@ -0,0 +1,117 @@
+##This is the file where the PDF text-extraction backends are defined.
+# PyPDF2 is the default; faster backends are used when they are installed.
+
+import os
+import logging
+from typing import List, Dict, Iterator, Optional, Type
+
+DEFAULT_EXTRACTOR = "pypdf2"
+
+logger = logging.getLogger(__name__)
+
+
+class PDFExtractor:
+    """Base class for PDF text extractors. Subclasses return one string per page."""
+
+    name = ""
+    module = ""
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """Check whether the backend's library is installed."""
+        try:
+            __import__(cls.module)
+            return True
+        except ImportError:
+            return False
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        """Yield the text of each page in the PDF as it is extracted."""
+        raise NotImplementedError
+
+    def extract_pages(self, pdf_path: str) -> List[str]:
+        """Extract the text of every page in the PDF."""
+        return list(self.iter_pages(pdf_path))
+
+    def extract_text(self, pdf_path: str) -> str:
+        """Extract the text of the whole PDF as a single string."""
+        return "".join(self.extract_pages(pdf_path))
+
+
+class PyPDF2Extractor(PDFExtractor):
+    """Pure-Python extractor using PyPDF2.PdfReader."""
+
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        import PyPDF2
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page in pdf_reader.pages:
+                yield page.extract_text() or ""
+
+
+class PypdfExtractor(PDFExtractor):
+    """Extractor using pypdf, the maintained successor of PyPDF2."""
+
+    name = "pypdf"
+    module = "pypdf"
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        import pypdf
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = pypdf.PdfReader(file)
+            for page in pdf_reader.pages:
+                yield page.extract_text() or ""
+
+
+class PyMuPDFExtractor(PDFExtractor):
+    """Extractor using PyMuPDF (MuPDF bindings), usually the fastest option."""
+
+    name = "pymupdf"
+    module = "pymupdf"
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        import pymupdf
+        with pymupdf.open(pdf_path) as document:
+            for page in document:
+                yield page.get_text() or ""
+
+
+class PdfplumberExtractor(PDFExtractor):
+    """Extractor using pdfplumber, slower but better on layout-heavy pages."""
+
+    name = "pdfplumber"
+    module = "pdfplumber"
+
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as document:
+            for page in document.pages:
+                yield page.extract_text() or ""
+
+
+EXTRACTORS: Dict[str, Type[PDFExtractor]] = {
+    extractor.name: extractor
+    for extractor in (PyPDF2Extractor, PypdfExtractor, PyMuPDFExtractor, PdfplumberExtractor)
+}
+
+
+def available_extractors() -> List[str]:
+    """Get the names of all extractors whose library is installed."""
+    return [name for name, extractor in EXTRACTORS.items() if extractor.is_available()]
+
+
+def get_extractor(name: Optional[str] = None) -> PDFExtractor:
+    """Get an extractor by name. Defaults to the PDF_EXTRACTOR environment variable,
+    falling back to PyPDF2 when the requested backend is unknown or not installed."""
+    name = (name or os.getenv("PDF_EXTRACTOR") or DEFAULT_EXTRACTOR).strip().lower()
+    extractor = EXTRACTORS.get(name)
+    if extractor is None:
+        logger.warning(f"Unknown PDF extractor '{name}', using {DEFAULT_EXTRACTOR}")
+        extractor = EXTRACTORS[DEFAULT_EXTRACTOR]
+    elif not extractor.is_available():
+        logger.warning(f"PDF extractor '{name}' is not installed, using {DEFAULT_EXTRACTOR}")
+        extractor = EXTRACTORS[DEFAULT_EXTRACTOR]
+    return extractor()
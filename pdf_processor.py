@@ -1,29 +1,108 @@
 ##This is the file where the PDF processor is defined. 
-# It uses OpenAI embeddings to process the PDFs.
+# It uses OpenAI embeddings to process the PDFs, or a local hashing backend when offline.
+# LangChain, FAISS and the embeddings client are imported on first use to keep startup fast.
 
-import PyPDF2
-from typing import List, Dict, Optional, Any
+from __future__ import annotations
+from typing import List, Dict, Optional, Any, TYPE_CHECKING
 import os
 import logging
 import pickle
 import hashlib
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+import json
+import threading
+from datetime import datetime
+from pdf_extractors import get_extractor, DEFAULT_EXTRACTOR
+from metrics import METRICS
+from token_accounting import TokenBudget, estimate_tokens, record_embedding_usage
+from clause_index import ClauseIndex
+from table_store import TableStore, extract_tables
+from extraction_workers import (IsolatedExtractor, ExtractionTimeout, ExtractionWorkerError,
+                                DEFAULT_PAGE_TIMEOUT, DEFAULT_FILE_TIMEOUT)
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+EMBEDDING_BACKENDS = ("openai", "local")
+EMBEDDING_REDUCTIONS = ("pca", "native")
+NATIVE_DIMENSIONS_MODEL = "text-embedding-3-small"  # ada-002 has no dimensions option
 
 class PDFProcessor:
-    def __init__(self, openai_api_key: str):
-        """Initialize the PDF processor with OpenAI API key."""
-        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
-        self.processed_files = []
-        self.default_pdf_dir = os.path.join(os.path.dirname(__file__), "test_pdfs")
-        self.cache_dir = os.path.join(os.path.dirname(__file__), "vector_cache")
+    def __init__(self, openai_api_key: str, extractor: Optional[str] = None,
+                 isolate_extraction: Optional[bool] = None,
+                 page_timeout: Optional[float] = None, file_timeout: Optional[float] = None,
+                 embedding_backend: Optional[str] = None, openai_base_url: Optional[str] = None,
+                 pdf_dir: Optional[str] = None, cache_dir: Optional[str] = None,
+                 token_budget: Optional[TokenBudget] = None, index_shards: Optional[int] = None,
+                 artifact_dir: Optional[str] = None, embedding_dimensions: Optional[int] = None,
+                 embedding_reduction: Optional[str] = None):
+        """Initialize the PDF processor with OpenAI API key.
+        openai_base_url (default: the OPENAI_BASE_URL environment variable) points the
+        embeddings client at a compatible endpoint such as the local fake server.
+        The embedding backend defaults to the EMBEDDING_BACKEND environment variable
+        ("openai" or "local"); with EMBEDDING_FALLBACK enabled (the default) the local
+        backend is used when the OpenAI API is unavailable.
+        embedding_dimensions (default: EMBEDDING_DIMENSIONS; 0 keeps the full size) reduces
+        OpenAI vectors, either with a PCA projection fitted on each index at build time
+        (embedding_reduction "pca", the default; see reduced_embeddings.py) or with the
+        API's native dimensions option ("native", which uses text-embedding-3-small).
+        Both are recorded in the cache key (EMBEDDING_REDUCTION selects the default).
+        An ingestion run whose embedding tokens would exceed the token budget's ingestion
+        limit is downgraded to local embeddings (or refused when fallback is disabled).
+        The text-extraction backend defaults to the PDF_EXTRACTOR environment variable.
+        Extraction runs in an isolated worker with page and file deadlines unless
+        PDF_ISOLATED_EXTRACTION is false; the deadlines default to PDF_PAGE_TIMEOUT
+        and PDF_FILE_TIMEOUT (seconds).
+        With index_shards (default: the INDEX_SHARDS environment variable) above 1, the
+        chunks of each index are partitioned into that many shards, each searched by its
+        own worker process.
+        Unless SUMMARY_INDEX is false, each index gets document and section summaries
+        (summary_index.py), cached with it and available as vector_store.summary_index.
+        Captioned tables found in the extracted text are stored with each index as
+        vector_store.table_store (table_store.py), and numbered sections and paragraphs
+        as vector_store.clause_index (clause_index.py).
+        Cache keys depend on PDF names and contents only. On a cache miss, an index
+        artifact for the key in artifact_dir (default: the INDEX_ARTIFACT_DIR environment
+        variable, else index_artifacts) is verified and installed instead (artifacts.py)."""
+        self.extractor = get_extractor(extractor)
+        if isolate_extraction is None:
+            isolate_extraction = os.getenv("PDF_ISOLATED_EXTRACTION", "true").lower() not in ("0", "false", "no")
+        self.isolated_extractor = None
+        if isolate_extraction:
+            self.isolated_extractor = IsolatedExtractor(
+                self.extractor.name,
+                page_timeout=page_timeout or float(os.getenv("PDF_PAGE_TIMEOUT", DEFAULT_PAGE_TIMEOUT)),
+                file_timeout=file_timeout or float(os.getenv("PDF_FILE_TIMEOUT", DEFAULT_FILE_TIMEOUT))
+            )
         self.setup_logging()
+        self.openai_api_key = openai_api_key
+        self.openai_base_url = openai_base_url or os.getenv("OPENAI_BASE_URL")
+        self.token_budget = token_budget or TokenBudget.from_env()
+        self.last_ingestion_scope = None
+        self.embedding_fallback = os.getenv("EMBEDDING_FALLBACK", "true").lower() not in ("0", "false", "no")
+        self.embedding_backend = (embedding_backend or os.getenv("EMBEDDING_BACKEND") or "openai").strip().lower()
+        if self.embedding_backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{self.embedding_backend}', expected one of {EMBEDDING_BACKENDS}")
+        if self.embedding_backend == "openai" and not openai_api_key and self.embedding_fallback:
+            self.logger.warning("No OpenAI API key, falling back to local embeddings")
+            self.embedding_backend = "local"
+        self.embedding_dimensions = embedding_dimensions if embedding_dimensions is not None else \
+            int(os.getenv("EMBEDDING_DIMENSIONS", 0))
+        self.embedding_reduction = (embedding_reduction or os.getenv("EMBEDDING_REDUCTION") or "pca").strip().lower()
+        if self.embedding_reduction not in EMBEDDING_REDUCTIONS:
+            raise ValueError(f"Unknown embedding reduction '{self.embedding_reduction}', expected one of {EMBEDDING_REDUCTIONS}")
+        self._embeddings = None
+        self._text_splitter = None
+        self.processed_files = []
+        self.quarantined_files = []
+        self.default_pdf_dir = pdf_dir or os.path.join(os.path.dirname(__file__), "test_pdfs")
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(__file__), "vector_cache")
+        self.index_shards = index_shards if index_shards is not None else int(os.getenv("INDEX_SHARDS", 0))
+        self.sharded_stores = []
+        self.summary_index_enabled = os.getenv("SUMMARY_INDEX", "true").lower() not in ("0", "false", "no")
+        self.artifact_dir = artifact_dir or os.getenv("INDEX_ARTIFACT_DIR") or \
+            os.path.join(os.path.dirname(__file__), "index_artifacts")
+        self._file_hashes = {}
+        self._build_lock = threading.Lock()
         
         # Create default PDF directory if it doesn't exist
         if not os.path.exists(self.default_pdf_dir):
@@ -43,6 +122,132 @@ class PDFProcessor:
         )
         self.logger = logging.getLogger(__name__)
     
+    @property
+    def embeddings(self):
+        """Embeddings client for the current backend, created on first use."""
+        if self._embeddings is None:
+            self._embeddings = self._create_embeddings(self.embedding_backend)
+        return self._embeddings
+    
+    @embeddings.setter
+    def embeddings(self, embeddings):
+        self._embeddings = embeddings
+    
+    @property
+    def text_splitter(self):
+        """Text splitter, created on first use."""
+        if self._text_splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=200,
+                length_function=len
+            )
+        return self._text_splitter
+    
+    def _create_embeddings(self, backend: str):
+        """Create the embeddings client for a backend."""
+        if backend == "local":
+            from local_embeddings import HashingEmbeddings, DEFAULT_N_FEATURES
+            return HashingEmbeddings(
+                n_features=int(os.getenv("LOCAL_EMBEDDING_FEATURES", DEFAULT_N_FEATURES)),
+                n_components=int(os.getenv("LOCAL_EMBEDDING_SVD_COMPONENTS", 0))
+            )
+        from langchain_openai import OpenAIEmbeddings
+        from http_clients import get_http_client
+        options = {}
+        if self.embedding_dimensions and self.embedding_reduction == "native":
+            options = {"model": NATIVE_DIMENSIONS_MODEL, "dimensions": self.embedding_dimensions}
+        if self.openai_base_url:
+            # Custom endpoints get raw text; the context-length check needs tiktoken downloads
+            return OpenAIEmbeddings(openai_api_key=self.openai_api_key, openai_api_base=self.openai_base_url,
+                                    check_embedding_ctx_length=False, http_client=get_http_client(), **options)
+        return OpenAIEmbeddings(openai_api_key=self.openai_api_key, http_client=get_http_client(), **options)
+    
+    def _get_embedding_backend_id(self) -> str:
+        """Identify the embedding vector space; OpenAI keeps the original untagged cache keys."""
+        if self.embedding_backend == "local":
+            return self.embeddings.backend_id
+        if self.embedding_dimensions:
+            return f"openai-{self.embedding_reduction}{self.embedding_dimensions}"
+        return "openai"
+    
+    def _uses_pca(self) -> bool:
+        return self.embedding_backend == "openai" and bool(self.embedding_dimensions) and \
+            self.embedding_reduction == "pca"
+    
+    def _build_vector_store(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> FAISS:
+        """Embed texts into a new FAISS store, falling back to local embeddings if the API fails."""
+        from langchain_community.vectorstores import FAISS
+        METRICS.increment("chunks_indexed", len(texts))
+        self._check_ingestion_budget(texts)
+        try:
+            with METRICS.span("embed_index"):
+                vector_store = self._embed_into_store(texts, metadatas)
+            if self.embedding_backend == "openai":
+                self.last_ingestion_scope = f"ingestion:{datetime.now().strftime('%Y%m%dT%H%M%S%f')}"
+                record_embedding_usage([self.last_ingestion_scope], texts)
+            return vector_store
+        except Exception as e:
+            if self.embedding_backend == "local" or not self.embedding_fallback:
+                raise
+            self.logger.warning(f"OpenAI embeddings unavailable ({str(e)}), falling back to local embeddings")
+            self.embedding_backend = "local"
+            self.embeddings = self._create_embeddings("local")
+            with METRICS.span("embed_index"):
+                return self._embed_into_store(texts, metadatas)
+    
+    def _embed_into_store(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> FAISS:
+        from langchain_community.vectorstores import FAISS
+        embeddings = self._get_embeddings_for_build(texts)
+        if not self._uses_pca():
+            return FAISS.from_texts(texts, embeddings, metadatas=metadatas)
+        return self._store_from_vectors(texts, embeddings.embed_documents(texts), embeddings, metadatas)
+    
+    def _store_from_vectors(self, texts: List[str], vectors: Any, embeddings: Any,
+                            metadatas: Optional[List[Dict[str, Any]]] = None) -> FAISS:
+        """Build a FAISS store from the full-dimension vectors of texts, fitting the PCA
+        projection on them first when EMBEDDING_DIMENSIONS asks for one."""
+        from langchain_community.vectorstores import FAISS
+        import numpy as np
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self._uses_pca():
+            from reduced_embeddings import PCAEmbeddings
+            with METRICS.span("fit_projection"):
+                embeddings = PCAEmbeddings.fit(embeddings, vectors, self.embedding_dimensions)
+            vectors = embeddings.transform(vectors)
+        return FAISS.from_embeddings(list(zip(texts, vectors.tolist())), embeddings, metadatas=metadatas)
+    
+    def _check_ingestion_budget(self, texts: List[str]):
+        """Switch to local embeddings, or refuse, when an OpenAI build would exceed the ingestion budget."""
+        if self.embedding_backend != "openai" or not self.token_budget.ingestion_tokens:
+            return
+        estimated_tokens = sum(estimate_tokens(text) for text in texts)
+        if estimated_tokens <= self.token_budget.ingestion_tokens:
+            return
+        message = (f"Ingestion needs about {estimated_tokens} embedding tokens, "
+                   f"over the budget of {self.token_budget.ingestion_tokens}")
+        if not self.embedding_fallback:
+            raise ValueError(message)
+        self.logger.warning(f"{message}; using local embeddings instead")
+        self.embedding_backend = "local"
+        self.embeddings = self._create_embeddings("local")
+    
+    def _get_embeddings_for_build(self, texts: List[str]):
+        """Get the embeddings for a new index, fitting the local projection on its texts."""
+        if self.embedding_backend == "local":
+            return self.embeddings.fit(texts)
+        return self.embeddings
+    
+    def _get_embeddings_for_load(self, cache_path: str):
+        """Get the embeddings matching a cached index, including its saved local projection."""
+        if self.embedding_backend == "local":
+            return self.embeddings.load_projection(cache_path)
+        if self._uses_pca():
+            from reduced_embeddings import PCAEmbeddings
+            return PCAEmbeddings.load(self.embeddings, cache_path)
+        return self.embeddings
+    
     def validate_directory(self, directory_path: str) -> bool:
         """Validate if the directory exists and is accessible."""
         if not os.path.exists(directory_path):
@@ -54,11 +259,17 @@ class PDFProcessor:
         return True
     
     def _get_file_hash(self, file_path: str) -> str:
-        """Generate hash for a file based on its path and modification time."""
+        """Generate hash for a file based on its name and contents, so the same PDFs give the
+        same cache keys on any machine. Hashes are remembered while the file is unchanged."""
         stat = os.stat(file_path)
-        # Include file path, size, and modification time in hash
-        hash_string = f"{file_path}_{stat.st_size}_{stat.st_mtime}"
-        return hashlib.md5(hash_string.encode()).hexdigest()
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._file_hashes:
+            file_hash = hashlib.md5(os.path.basename(file_path).encode() + b"\0")
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    file_hash.update(block)
+            self._file_hashes[memo_key] = file_hash.hexdigest()
+        return self._file_hashes[memo_key]
     
     def _get_directory_hash(self, directory_path: str) -> str:
         """Generate hash for all PDF files in a directory."""
@@ -73,15 +284,38 @@ class PDFProcessor:
         
         return hashlib.md5(combined_hash.encode()).hexdigest()
     
+    def _get_cache_key(self, prefix: str, content_hash: str) -> str:
+        """Build a cache key, tagging it with the extractor and embedding backend when
+        they are not the defaults."""
+        cache_key = f"{prefix}_{content_hash}"
+        if self.extractor.name != DEFAULT_EXTRACTOR:
+            cache_key += f"_{self.extractor.name}"
+        backend_id = self._get_embedding_backend_id()
+        if backend_id != "openai":
+            cache_key += f"_{backend_id}"
+        return cache_key
+    
     def _get_cache_path(self, cache_key: str) -> str:
         """Get the cache file path for a given cache key."""
         return os.path.join(self.cache_dir, f"{cache_key}.pkl")
     
-    def _save_vector_store_to_cache(self, vector_store: FAISS, cache_key: str) -> bool:
-        """Save vector store to cache directory using FAISS native format."""
+    def _save_vector_store_to_cache(self, vector_store: FAISS, cache_key: str,
+                                    texts: Optional[Dict[str, str]] = None) -> bool:
+        """Save vector store to cache directory using FAISS native format, with the
+        tables and clauses extracted from its documents' texts (keyed by file name)."""
         try:
             cache_path = os.path.join(self.cache_dir, cache_key)
             vector_store.save_local(cache_path)
+            if texts is not None:
+                vector_store.table_store = TableStore([table for source, text in texts.items()
+                                                       for table in extract_tables(text, source)])
+                vector_store.table_store.save(cache_path)
+                vector_store.clause_index = ClauseIndex.build(texts)
+                vector_store.clause_index.save(cache_path)
+            save_projection = getattr(vector_store.embedding_function, "save_projection", None)
+            if save_projection is not None:
+                save_projection(cache_path)
+            self._attach_summary_index(vector_store, cache_path)
             self.logger.info(f"Vector store cached at: {cache_path}")
             return True
         except Exception as e:
@@ -90,27 +324,141 @@ class PDFProcessor:
     
     def _load_vector_store_from_cache(self, cache_key: str) -> Optional[FAISS]:
         """Load vector store from cache directory using FAISS native format."""
+        from langchain_community.vectorstores import FAISS
         try:
             cache_path = os.path.join(self.cache_dir, cache_key)
-            if not os.path.exists(cache_path):
+            if not os.path.exists(cache_path) and not self._import_artifact(cache_key):
+                METRICS.increment("cache_misses")
                 return None
                 
-            vector_store = FAISS.load_local(cache_path, self.embeddings, allow_dangerous_deserialization=True)
+            with METRICS.span("cache_load"):
+                vector_store = FAISS.load_local(cache_path, self._get_embeddings_for_load(cache_path), allow_dangerous_deserialization=True)
+            METRICS.increment("cache_hits")
+            self._attach_summary_index(vector_store, cache_path)
+            table_store = TableStore.load(cache_path)
+            if table_store is not None:
+                vector_store.table_store = table_store
+            clause_index = ClauseIndex.load(cache_path)
+            if clause_index is not None:
+                vector_store.clause_index = clause_index
             self.logger.info(f"Vector store loaded from cache: {cache_path}")
             return vector_store
         except Exception as e:
             self.logger.error(f"Failed to load vector store from cache: {str(e)}")
             return None
     
+    def _import_artifact(self, cache_key: str) -> bool:
+        """Install a shipped artifact for cache_key from the artifact directory, if there is one."""
+        from artifacts import ArtifactError, artifact_path, import_artifact
+        path = artifact_path(self.artifact_dir, cache_key)
+        if not os.path.exists(path):
+            return False
+        try:
+            with METRICS.span("artifact_import"):
+                import_artifact(path, self.cache_dir, cache_key)
+        except (ArtifactError, OSError) as e:
+            self.logger.warning(f"Ignoring index artifact {path}: {str(e)}")
+            return False
+        METRICS.increment("artifact_imports")
+        self.logger.info(f"Vector store imported from artifact: {path}")
+        return True
+    
+    def _attach_summary_index(self, vector_store: FAISS, cache_path: str):
+        """Load the summaries cached with an index, building them for indexes cached without any."""
+        if not self.summary_index_enabled:
+            return
+        from summary_index import SummaryIndex
+        summary_index = SummaryIndex.load(cache_path)
+        if summary_index is None:
+            with METRICS.span("summarize"):
+                summary_index = SummaryIndex.build(vector_store)
+            try:
+                summary_index.save(cache_path)
+            except OSError as e:
+                self.logger.warning(f"Failed to cache document summaries: {str(e)}")
+        vector_store.summary_index = summary_index
+
+    def _shard_vector_store(self, vector_store: FAISS, cache_key: str):
+        """Serve the store's searches from shard worker processes when INDEX_SHARDS is above 1.
+        Shard files are kept next to the cached index and reused on the next load."""
+        n_shards = min(self.index_shards, vector_store.index.ntotal)
+        if n_shards <= 1:
+            return vector_store
+        from sharded_index import shard_vector_store
+        try:
+            sharded_store = shard_vector_store(vector_store, n_shards,
+                                               os.path.join(self.cache_dir, f"{cache_key}_shards{n_shards}"))
+        except (OSError, RuntimeError) as e:
+            self.logger.warning(f"Index sharding failed, searching in-process: {str(e)}")
+            return vector_store
+        if sharded_store is None:
+            return vector_store
+        # Stores closed on eviction from the corpus registry no longer need stopping
+        self.sharded_stores = [store for store in self.sharded_stores if not store.closed]
+        self.sharded_stores.append(sharded_store)
+        return sharded_store
+
+    def close(self):
+        """Stop the shard worker processes started by this processor."""
+        for sharded_store in self.sharded_stores:
+            sharded_store.close()
+        self.sharded_stores = []
+
+    def _get_quarantine_path(self) -> str:
+        """Get the path of the quarantine list kept next to the vector cache."""
+        return os.path.join(self.cache_dir, "quarantine.json")
+    
+    def _load_quarantine(self) -> Dict[str, Dict[str, Any]]:
+        """Load quarantined files, keyed by file hash."""
+        try:
+            with open(self._get_quarantine_path(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _quarantine_file(self, pdf_path: str, reason: str):
+        """Record a PDF that hung or crashed extraction so it is skipped until it changes."""
+        entry = {
+            "file": pdf_path,
+            "reason": reason,
+            "quarantined_at": datetime.now().isoformat(timespec="seconds")
+        }
+        quarantine = self._load_quarantine()
+        quarantine[self._get_file_hash(pdf_path)] = entry
+        try:
+            with open(self._get_quarantine_path(), 'w') as f:
+                json.dump(quarantine, f, indent=2)
+        except OSError as e:
+            self.logger.error(f"Failed to write quarantine list: {str(e)}")
+        self.quarantined_files.append(entry)
+        self.logger.warning(f"Quarantined PDF {pdf_path}: {reason}")
+    
+    def is_quarantined(self, pdf_path: str) -> bool:
+        """Check whether the current version of a PDF is quarantined."""
+        entry = self._load_quarantine().get(self._get_file_hash(pdf_path))
+        if entry is not None and entry not in self.quarantined_files:
+            self.quarantined_files.append(entry)
+        return entry is not None
+    
     def extract_text_from_pdf(self, pdf_path: str) -> Optional[str]:
-        """Extract text from a PDF file with error handling."""
+        """Extract text from a PDF file with error handling.
+        Files that miss their extraction deadline are quarantined and return None."""
+        with METRICS.span("extract"):
+            return self._extract_text(pdf_path)
+    
+    def _extract_text(self, pdf_path: str) -> Optional[str]:
+        if self.isolated_extractor is not None:
+            try:
+                pages = self.isolated_extractor.extract_pages(pdf_path)
+            except ExtractionTimeout as e:
+                self._quarantine_file(pdf_path, str(e))
+                return None
+            except ExtractionWorkerError as e:
+                self.logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
+                return None
+            return "".join(pages) if pages is not None else None
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
+            return self.extractor.extract_text(pdf_path)
         except Exception as e:
             self.logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
             return None
@@ -126,17 +474,27 @@ class PDFProcessor:
             return None
         
         # Generate cache key based on file hash
-        cache_key = f"single_pdf_{self._get_file_hash(pdf_path)}"
+        file_hash = self._get_file_hash(pdf_path)
+        cache_key = self._get_cache_key("single_pdf", file_hash)
         
         # Try to load from cache first
         cached_vector_store = self._load_vector_store_from_cache(cache_key)
         if cached_vector_store is not None:
             self.processed_files.append(pdf_path)
             self.logger.info(f"Loaded from cache: {pdf_path}")
-            return cached_vector_store
+            return self._shard_vector_store(cached_vector_store, cache_key)
         
-        # If not in cache, process the PDF
+        # Builds share the extraction worker and switch the embedding backend on fallback,
+        # so they run one at a time; cache hits do not wait for them
+        with self._build_lock:
+            return self._build_pdf_store(pdf_path, file_hash)
+    
+    def _build_pdf_store(self, pdf_path: str, file_hash: str) -> Optional[FAISS]:
+        """Extract, embed and cache one PDF (the caller holds the build lock)."""
         self.logger.info(f"Processing PDF (not in cache): {pdf_path}")
+        if self.is_quarantined(pdf_path):
+            self.logger.warning(f"Skipping quarantined PDF: {pdf_path}")
+            return None
         
         # Extract text
         text = self.extract_text_from_pdf(pdf_path)
@@ -144,17 +502,19 @@ class PDFProcessor:
             return None
         
         # Split text into chunks
-        chunks = self.text_splitter.split_text(text)
+        with METRICS.span("split"):
+            chunks = self.text_splitter.split_text(text)
         
-        # Create vector store using OpenAI embeddings
-        vector_store = FAISS.from_texts(chunks, self.embeddings)
+        # Create vector store using the configured embeddings; chunks are tagged with their file for routing
+        vector_store = self._build_vector_store(chunks, [{"source": os.path.basename(pdf_path)} for _ in chunks])
         self.processed_files.append(pdf_path)
         
-        # Cache the vector store for future use
-        self._save_vector_store_to_cache(vector_store, cache_key)
+        # Cache the vector store for future use (the key follows any embedding fallback)
+        cache_key = self._get_cache_key("single_pdf", file_hash)
+        self._save_vector_store_to_cache(vector_store, cache_key, {os.path.basename(pdf_path): text})
         self.logger.info(f"Successfully processed and cached: {pdf_path}")
         
-        return vector_store
+        return self._shard_vector_store(vector_store, cache_key)
     
     def process_directory(self, directory_path: str = None) -> Optional[FAISS]:
         """Process all PDFs in a directory and combine into one vector store with caching."""
@@ -165,7 +525,8 @@ class PDFProcessor:
             return None
         
         # Generate cache key based on directory contents hash
-        cache_key = f"directory_{self._get_directory_hash(directory_path)}"
+        directory_hash = self._get_directory_hash(directory_path)
+        cache_key = self._get_cache_key("directory", directory_hash)
         
         # Try to load from cache first
         cached_vector_store = self._load_vector_store_from_cache(cache_key)
@@ -177,23 +538,36 @@ class PDFProcessor:
                     if os.path.exists(pdf_path):
                         self.processed_files.append(pdf_path)
             self.logger.info(f"Loaded directory from cache: {directory_path}")
-            return cached_vector_store
+            return self._shard_vector_store(cached_vector_store, cache_key)
         
-        # If not in cache, process all PDFs
+        with self._build_lock:
+            return self._build_directory_store(directory_path, directory_hash)
+    
+    def _build_directory_store(self, directory_path: str, directory_hash: str) -> Optional[FAISS]:
+        """Extract, embed and cache every PDF in a directory as one store (the caller holds the build lock)."""
         self.logger.info(f"Processing directory (not in cache): {directory_path}")
         
         all_chunks = []
+        all_metadatas = []
+        all_texts = {}
         processed_count = 0
         failed_count = 0
         
         for filename in os.listdir(directory_path):
             if filename.endswith('.pdf'):
                 pdf_path = os.path.join(directory_path, filename)
+                if self.is_quarantined(pdf_path):
+                    self.logger.warning(f"Skipping quarantined PDF: {pdf_path}")
+                    failed_count += 1
+                    continue
                 text = self.extract_text_from_pdf(pdf_path)
                 
                 if text is not None:
-                    chunks = self.text_splitter.split_text(text)
+                    with METRICS.span("split"):
+                        chunks = self.text_splitter.split_text(text)
                     all_chunks.extend(chunks)
+                    all_metadatas.extend({"source": filename} for _ in chunks)
+                    all_texts[filename] = text
                     self.processed_files.append(pdf_path)
                     processed_count += 1
                     self.logger.info(f"Successfully processed: {pdf_path}")
@@ -204,19 +578,35 @@ class PDFProcessor:
             self.logger.error("No valid PDFs were processed")
             return None
             
-        # Create combined vector store using OpenAI embeddings
-        vector_store = FAISS.from_texts(all_chunks, self.embeddings)
+        # Create combined vector store using the configured embeddings
+        vector_store = self._build_vector_store(all_chunks, all_metadatas)
         
-        # Cache the vector store for future use
-        self._save_vector_store_to_cache(vector_store, cache_key)
+        # Cache the vector store for future use (the key follows any embedding fallback)
+        cache_key = self._get_cache_key("directory", directory_hash)
+        self._save_vector_store_to_cache(vector_store, cache_key, all_texts)
         self.logger.info(f"Processing complete. Successfully processed {processed_count} PDFs, {failed_count} failed. Cached for future use.")
         
-        return vector_store
+        return self._shard_vector_store(vector_store, cache_key)
     
     def get_processed_files(self) -> List[str]:
         """Get list of successfully processed PDF files."""
         return self.processed_files
         
+    def get_quarantined_files(self) -> List[Dict[str, Any]]:
+        """Get the PDFs skipped during processing because extraction hung or crashed."""
+        return self.quarantined_files
+    
+    def clear_quarantine(self) -> bool:
+        """Forget all quarantined files so they are retried on the next build."""
+        try:
+            if os.path.exists(self._get_quarantine_path()):
+                os.remove(self._get_quarantine_path())
+            self.quarantined_files = []
+            return True
+        except OSError as e:
+            self.logger.error(f"Error clearing quarantine: {str(e)}")
+            return False
+    
     def get_default_pdf_directory(self) -> str:
         """Get the path to the default PDF directory."""
         return self.default_pdf_dir
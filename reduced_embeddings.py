@@ -0,0 +1,63 @@
+##This is the file where reduced-dimension embeddings are defined.
+# A PCA projection fitted on an index's own vectors shrinks them; it is saved with the index like the local SVD projection.
+
+import os
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+PCA_FILE = "pca_projection.npy"
+
+
+def fit_projection(vectors: np.ndarray, n_components: int) -> np.ndarray:
+    """Top principal axes of the vectors, without centering (a truncated SVD), as an
+    (n_components, dimensions) matrix. Without centering, dot products between vectors
+    in the fitted span are kept exactly, so a projection with as many components as there
+    are indexed vectors loses nothing. At most one component per vector is returned."""
+    _, _, components = np.linalg.svd(np.asarray(vectors, dtype=np.float32), full_matrices=False)
+    return components[:n_components].astype(np.float32)
+
+
+class PCAEmbeddings(Embeddings):
+    """Wraps an embeddings client, projecting its vectors onto a fitted PCA basis and re-normalizing."""
+
+    def __init__(self, base: Embeddings, projection: np.ndarray):
+        self.base = base
+        self.projection = projection
+
+    @classmethod
+    def fit(cls, base: Embeddings, vectors: np.ndarray, n_components: int) -> "PCAEmbeddings":
+        """Fit the projection on the full-dimension vectors of the indexed chunks."""
+        return cls(base, fit_projection(vectors, n_components))
+
+    @property
+    def is_local(self) -> bool:
+        """Billed like the client it wraps."""
+        return getattr(self.base, "is_local", False)
+
+    @property
+    def dimensions(self) -> int:
+        return self.projection.shape[0]
+
+    def transform(self, vectors) -> np.ndarray:
+        """Project full-dimension vectors and scale them back to unit length."""
+        reduced = np.asarray(vectors, dtype=np.float32) @ self.projection.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return reduced / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.transform(self.base.embed_documents(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.transform([self.base.embed_query(text)])[0].tolist()
+
+    def save_projection(self, directory: str):
+        """Store the projection next to a saved FAISS index."""
+        np.save(os.path.join(directory, PCA_FILE), self.projection)
+
+    @classmethod
+    def load(cls, base: Embeddings, directory: str) -> "PCAEmbeddings":
+        """The embeddings of an index saved with a projection; raises FileNotFoundError without one."""
+        return cls(base, np.load(os.path.join(directory, PCA_FILE)))
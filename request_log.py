@@ -0,0 +1,74 @@
+##This is the file where answered questions are captured to a JSONL request log for load replay.
+# Capture is off unless REQUEST_LOG names the log file; benchmark_replay.py drives the agent from the log.
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLog:
+    """Appends one JSON line per question: when it arrived, its session and filters,
+    the route it took, its total time, its stage timings (admission_wait is the queueing delay)
+    and counters, and any error."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestLog"]:
+        """The log named by REQUEST_LOG, or None when capture is off."""
+        path = os.getenv("REQUEST_LOG")
+        return cls(path) if path else None
+
+    def record(self, question: str, trace: Dict[str, Any], arrived_at: float, session_id: str,
+               documents: Optional[List[str]] = None, corpora: Optional[List[str]] = None,
+               error: Optional[str] = None):
+        """Append the finished trace of one question, with the question as asked (traces
+        do not keep it whole), so replays send the same text. Write failures are logged,
+        never raised."""
+        entry = {
+            "time": round(arrived_at, 6),
+            "question": question,
+            "session_id": session_id,
+            "documents": documents or [],
+            "corpora": corpora or [],
+            "route": trace.get("route"),
+            "coalesced": trace.get("coalesced", False),
+            "total_seconds": trace.get("total_seconds"),
+            "stages": trace["stages"],
+            "counters": trace["counters"],
+        }
+        if error is None and trace["counters"].get("question_errors"):
+            error = "question_error"  # answered with an apology rather than raised
+        if error is not None:
+            entry["error"] = error
+        self.append(entry)
+
+    def append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry) + "\n"
+        try:
+            with self._lock, open(self.path, 'a') as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning(f"Failed to write request log {self.path}: {str(e)}")
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    """Read a request log, or a plain file of one question per line, ordered by arrival time.
+    Entries without a time are spaced one second apart."""
+    requests = []
+    with open(path, 'r') as f:
+        for number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"question": line}
+            entry.setdefault("time", float(number))
+            requests.append(entry)
+    requests.sort(key=lambda entry: entry["time"])
+    return requests
@@ -0,0 +1,106 @@
+##This is the file where the retriever used by the agent's QA chain is defined.
+# It splits query embedding and FAISS search into separately timed stages.
+
+import contextvars
+from contextlib import contextmanager
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from document_router import DEFAULT_ROUTE_DOCUMENTS
+from metrics import METRICS
+from token_accounting import record_embedding_usage
+
+_search_options: contextvars.ContextVar = contextvars.ContextVar("search_options", default={})
+
+
+@contextmanager
+def search_options(**options):
+    """Override retriever settings (such as k, documents, corpora or usage_scopes) for the enclosed chain call.
+    Uses a context variable so concurrent questions on a shared agent do not interfere."""
+    token = _search_options.set(dict(_search_options.get(), **options))
+    try:
+        yield
+    finally:
+        _search_options.reset(token)
+
+
+def relevance_score(distance: float) -> float:
+    """Turn a squared L2 distance between unit vectors into cosine similarity, clipped to [0, 1]."""
+    return min(1.0, max(0.0, 1.0 - float(distance) / 2.0))
+
+
+def select_adaptive_k(scored: List[Tuple[Document, float]], min_k: int, max_k: int,
+                      score_threshold: float = 0.0, score_margin: float = 0.0) -> List[Tuple[Document, float]]:
+    """Keep the best chunks (sorted by descending score) that score at least score_threshold and,
+    when score_margin is set, lie within score_margin of the best; never fewer than min_k or more than max_k."""
+    if not scored:
+        return []
+    cutoff = score_threshold
+    if score_margin > 0:
+        cutoff = max(cutoff, scored[0][1] - score_margin)
+    kept = [item for item in scored[:max_k] if item[1] >= cutoff]
+    return scored[:min(max_k, max(min_k, len(kept)))]
+
+
+class VectorStoreSearchRetriever(BaseRetriever):
+    """Retrieves up to k chunks from a FAISS store, timing the embedding and search stages.
+    Chunks below score_threshold or more than score_margin below the best chunk are
+    dropped, keeping at least min_k; each returned chunk carries its "score" in metadata.
+    With a document router, the query is first routed to the route_documents most relevant
+    documents (or to the documents named in the "documents" search option) and only their
+    chunks are searched. The "corpora" search option searches the named corpora of the
+    registry instead of vector_store and merges their chunks by distance."""
+
+    vector_store: Any
+    k: int = 4
+    min_k: int = 1
+    score_threshold: float = 0.0
+    score_margin: float = 0.0
+    router: Any = None
+    route_documents: int = DEFAULT_ROUTE_DOCUMENTS
+    registry: Any = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        options = _search_options.get()
+        k = options.get("k", self.k)
+        corpora = options.get("corpora")
+        if corpora and self.registry is not None:
+            targets = [self.registry.get(name) for name in corpora]
+            stores = [(corpus.vector_store, corpus.router) for corpus in targets]
+        else:
+            stores = [(self.vector_store, self.router)]
+
+        # Corpora sharing an embeddings client share one query embedding
+        query_vectors = {}
+        results = []
+        for vector_store, router in stores:
+            embeddings = vector_store.embedding_function
+            if id(embeddings) not in query_vectors:
+                with METRICS.span("embed_query"):
+                    query_vectors[id(embeddings)] = embeddings.embed_query(query)
+                if not getattr(embeddings, "is_local", False):  # only local backends are free
+                    record_embedding_usage(options.get("usage_scopes", []), [query])
+            results.extend(self._search_store(vector_store, router, query_vectors[id(embeddings)],
+                                              k, options.get("documents")))
+        scored = sorted(((document, relevance_score(distance)) for document, distance in results),
+                        key=lambda result: result[1], reverse=True)
+        selected = select_adaptive_k(scored, min(self.min_k, k), k, self.score_threshold, self.score_margin)
+        METRICS.increment("chunks_retrieved", len(selected))
+        METRICS.increment("chunks_dropped_low_score", min(k, len(scored)) - len(selected))
+        # Copies, so the score does not leak into the documents shared by the store
+        return [Document(page_content=document.page_content, metadata=dict(document.metadata, score=round(score, 4)))
+                for document, score in selected]
+
+    def _search_store(self, vector_store: Any, router: Any, query_vector: List[float], k: int,
+                      sources: Optional[List[str]]) -> List[Tuple[Document, float]]:
+        """Search one store, routing to its most relevant documents first when it has a router."""
+        if sources is None and router is not None and 0 < self.route_documents < len(router.sources):
+            with METRICS.span("route_documents"):
+                sources = router.route(query_vector, self.route_documents)
+        with METRICS.span("faiss_search"):
+            if sources is not None and router is not None:
+                return router.search(query_vector, sources, k)
+            return vector_store.similarity_search_with_score_by_vector(query_vector, k=k)
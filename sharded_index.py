@@ -0,0 +1,346 @@
+##This is the file where a vector index is split into shards served by separate worker processes.
+# Queries fan out to every shard in parallel and the per-shard top-k lists are merged by distance.
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import base64
+import logging
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+STARTUP_TIMEOUT = 60.0  # seconds a worker may take to load its shard
+
+logger = logging.getLogger(__name__)
+
+
+def partition(n_items: int, n_shards: int) -> List[np.ndarray]:
+    """Assign item positions to shards round-robin, so shards stay within one item of each other."""
+    positions = np.arange(n_items)
+    return [positions[shard::n_shards] for shard in range(n_shards)]
+
+
+def write_shards(vectors: np.ndarray, n_shards: int, directory: str,
+                 sources: Optional[List[str]] = None) -> List[str]:
+    """Write one flat FAISS index per shard, with the global position of each row; returns the shard paths.
+    With sources (the document of each vector), each shard also lists its rows per document,
+    so a search can be limited to some documents."""
+    import faiss
+
+    os.makedirs(directory, exist_ok=True)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    paths = []
+    for shard, positions in enumerate(partition(len(vectors), n_shards)):
+        path = os.path.join(directory, f"shard_{shard:03d}")
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors[positions])
+        faiss.write_index(index, path + ".faiss")
+        np.save(path + ".ids.npy", positions.astype(np.int64))
+        if sources is not None:
+            rows: Dict[str, List[int]] = {}
+            for row, position in enumerate(positions):
+                rows.setdefault(sources[position], []).append(row)
+            with open(path + ".sources.json", 'w') as f:
+                json.dump(rows, f)
+        paths.append(path)
+    return paths
+
+
+def _encode(vector: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(vector, dtype=np.float32).tobytes()).decode()
+
+
+def _shard_worker(shard_path: str):
+    """Worker process loop: load one shard and answer search requests from stdin as JSON lines."""
+    import faiss
+
+    faiss.omp_set_num_threads(1)  # parallelism comes from the shards, not from threads inside each one
+    index = faiss.read_index(shard_path + ".faiss")
+    ids = np.load(shard_path + ".ids.npy")
+    rows_by_source = {}
+    if os.path.exists(shard_path + ".sources.json"):
+        with open(shard_path + ".sources.json", 'r') as f:
+            rows_by_source = {source: np.asarray(rows, dtype=np.int64) for source, rows in json.load(f).items()}
+    sys.stdout.write(json.dumps({"ready": True, "size": int(index.ntotal), "dimension": int(index.d)}) + "\n")
+    sys.stdout.flush()
+    for line in sys.stdin:
+        request = json.loads(line)
+        query = np.frombuffer(base64.b64decode(request["vector"]), dtype=np.float32).reshape(1, -1)
+        if request.get("sources") is None:
+            distances, positions = index.search(query, min(request["k"], index.ntotal))
+        else:
+            # Only the rows of the requested documents are searched
+            rows = [rows_by_source[source] for source in request["sources"] if source in rows_by_source]
+            rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+            distances, positions = np.zeros((1, 0)), np.zeros((1, 0), dtype=np.int64)
+            if len(rows):
+                params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(rows))
+                distances, positions = index.search(query, min(request["k"], len(rows)), params=params)
+        hits = [(float(d), int(ids[p])) for d, p in zip(distances[0], positions[0]) if p >= 0]
+        sys.stdout.write(json.dumps({"id": request["id"], "hits": hits}) + "\n")
+        sys.stdout.flush()
+
+
+class _ShardWorker:
+    """One shard worker process. A reader thread hands each reply to the search waiting for
+    its request id, so searches from several threads can be in flight at once. A worker
+    that has not loaded its shard within startup_timeout is killed."""
+
+    def __init__(self, shard_path: str, startup_timeout: float = STARTUP_TIMEOUT):
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "sharded_index", os.path.abspath(shard_path)],
+            cwd=module_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+        )
+        self._write_lock = threading.Lock()
+        self._pending: Dict[int, queue.Queue] = {}
+        self._pending_lock = threading.Lock()
+        self._dead = False
+        self._ready: queue.Queue = queue.Queue(maxsize=1)
+        threading.Thread(target=self._read_replies, daemon=True).start()
+        try:
+            ready = self._ready.get(timeout=startup_timeout)
+        except queue.Empty:
+            ready = {}
+        if not ready.get("ready"):
+            self.close(kill=True)
+            raise RuntimeError(f"Shard worker for {shard_path} failed to start")
+        self.size = ready["size"]
+        self.dimension = ready.get("dimension", 0)
+
+    def _read_replies(self):
+        try:
+            ready = json.loads(self.process.stdout.readline() or "{}")
+        except (OSError, ValueError):
+            ready = {}
+        self._ready.put(ready)
+        try:
+            for line in self.process.stdout:
+                reply = json.loads(line)
+                with self._pending_lock:
+                    waiter = self._pending.pop(reply["id"], None)
+                if waiter is not None:  # replies to abandoned requests are dropped
+                    waiter.put(reply)
+        except (OSError, ValueError):
+            pass
+        # The worker exited: fail every search still waiting on it
+        with self._pending_lock:
+            self._dead = True
+            waiters = list(self._pending.values())
+            self._pending.clear()
+        for waiter in waiters:
+            waiter.put(None)
+
+    def send(self, request_id: int, request: str) -> queue.Queue:
+        """Send a request; its reply, or None if the worker died, arrives on the returned queue."""
+        waiter = queue.Queue(maxsize=1)
+        with self._pending_lock:
+            if self._dead:
+                waiter.put(None)
+                return waiter
+            self._pending[request_id] = waiter
+        try:
+            with self._write_lock:
+                self.process.stdin.write(request)
+                self.process.stdin.flush()
+        except (OSError, ValueError):
+            self.abandon(request_id)
+            waiter.put(None)
+        return waiter
+
+    def abandon(self, request_id: int):
+        with self._pending_lock:
+            self._pending.pop(request_id, None)
+
+    def close(self, kill: bool = False):
+        if self.process.poll() is None:
+            try:
+                if kill:
+                    raise OSError("killed")
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+
+class ShardedIndex:
+    """Scatter-gather search over shard worker processes started with `python -m sharded_index`.
+    Searches from several threads run concurrently; every shard searches each of them.
+    A shard that dies or misses search_timeout is restarted and the search retried once."""
+
+    def __init__(self, shard_paths: List[str], search_timeout: float = 30.0,
+                 startup_timeout: float = STARTUP_TIMEOUT):
+        self.shard_paths = shard_paths
+        self.search_timeout = search_timeout
+        self.startup_timeout = startup_timeout
+        self._workers: List[_ShardWorker] = []
+        self._restart_lock = threading.Lock()
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self.size = 0
+        self.dimension = 0
+        self.restart_count = 0
+        self.closed = False
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_shards: int, directory: str,
+              sources: Optional[List[str]] = None) -> "ShardedIndex":
+        """Write the shards of a vector matrix and start their workers."""
+        return cls(write_shards(vectors, n_shards, directory, sources)).start()
+
+    @property
+    def n_shards(self) -> int:
+        return len(self.shard_paths)
+
+    def start(self) -> "ShardedIndex":
+        """Start one worker per shard and wait until each has loaded its index."""
+        try:
+            for shard_path in self.shard_paths:
+                self._workers.append(_ShardWorker(shard_path, self.startup_timeout))
+        except RuntimeError:
+            self.close()
+            raise
+        self.size = sum(worker.size for worker in self._workers)
+        self.dimension = self._workers[0].dimension if self._workers else 0
+        atexit.register(self.close)
+        return self
+
+    def search(self, query_vector: List[float], k: int,
+               sources: Optional[List[str]] = None) -> List[Tuple[float, int]]:
+        """Return the k nearest (squared L2 distance, global position) pairs across all shards,
+        among the vectors of the given documents only when sources is set."""
+        payload = _encode(np.asarray(query_vector, dtype=np.float32))
+        for attempt in range(2):
+            if self.closed:
+                raise RuntimeError("Sharded index is closed")
+            with self._id_lock:
+                self._next_id += 1
+                request_id = self._next_id
+            request = json.dumps({"id": request_id, "k": k, "vector": payload, "sources": sources}) + "\n"
+            workers = list(self._workers)
+            # Scatter to every shard before reading any reply, so the shards search in parallel
+            waiters = [worker.send(request_id, request) for worker in workers]
+            deadline = time.monotonic() + self.search_timeout
+            hits = []
+            failed = []
+            for worker, waiter in zip(workers, waiters):
+                try:
+                    reply = waiter.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    reply = None
+                if reply is None:
+                    worker.abandon(request_id)
+                    failed.append(worker)
+                    continue
+                hits.extend((distance, position) for distance, position in reply["hits"])
+            if not failed:
+                hits.sort()
+                return hits[:k]
+            self._restart(failed)
+        raise RuntimeError("Shard worker stopped responding")
+
+    def _restart(self, failed: List[_ShardWorker]):
+        """Replace dead or hung workers; one already replaced by another search is left alone."""
+        with self._restart_lock:
+            for worker in failed:
+                if self.closed or worker not in self._workers:
+                    continue
+                shard = self._workers.index(worker)
+                logger.warning(f"Restarting shard worker {shard}, it died or stopped responding")
+                worker.close(kill=True)
+                self._workers[shard] = _ShardWorker(self.shard_paths[shard], self.startup_timeout)
+                self.restart_count += 1
+
+    def close(self):
+        """Stop the shard workers."""
+        atexit.unregister(self.close)
+        with self._restart_lock:
+            self.closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+class ShardedVectorStore:
+    """A FAISS store whose searches are served by a ShardedIndex.
+    The docstore and embedding function are delegated to the wrapped store, whose own index
+    is emptied once the shards are written, so the vectors live only in the workers.
+    document_router routes by document centroids and searches the chosen documents in the shards."""
+
+    def __init__(self, vector_store: Any, sharded_index: ShardedIndex, document_router: Any = None):
+        self.vector_store = vector_store
+        self.sharded_index = sharded_index
+        self.document_router = document_router
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.vector_store, name)
+
+    @property
+    def closed(self) -> bool:
+        return self.sharded_index.closed
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               sources: Optional[List[str]] = None,
+                                               **kwargs: Any) -> List[Tuple[Any, float]]:
+        results = []
+        for distance, position in self.sharded_index.search(embedding, k, sources):
+            docstore_id = self.vector_store.index_to_docstore_id[position]
+            results.append((self.vector_store.docstore.search(docstore_id), distance))
+        return results
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Any]:
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Any]:
+        return self.similarity_search_by_vector(self.vector_store.embedding_function.embed_query(query), k)
+
+    def close(self):
+        self.sharded_index.close()
+
+
+def shard_vector_store(vector_store: Any, n_shards: int, directory: str) -> Optional[ShardedVectorStore]:
+    """Split a FAISS store's vectors into n_shards served by worker processes.
+    Shard files already written for the same index size are reused. The store's in-process
+    index is replaced with an empty one, so the parent keeps no copy of the vectors."""
+    import faiss
+    from document_router import DocumentRouter
+
+    index = vector_store.index
+    try:
+        vectors = index.reconstruct_n(0, index.ntotal)
+    except RuntimeError as e:
+        logger.warning(f"Index sharding disabled, index vectors are not retrievable: {str(e)}")
+        return None
+    documents = [vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+                 for position in range(index.ntotal)]
+    sources = [getattr(document, "metadata", {}).get("source") for document in documents]
+    if None in sources:
+        sources = None  # chunks cached before they were tagged with their file cannot be routed
+    router = DocumentRouter.from_vector_store(vector_store, sub_indexes=False) if sources else None
+
+    shard_paths = [os.path.join(directory, f"shard_{shard:03d}") for shard in range(n_shards)]
+    written = all(os.path.exists(path + ".faiss") for path in shard_paths)
+    if sources is not None:
+        written = written and all(os.path.exists(path + ".sources.json") for path in shard_paths)
+    sharded_index = ShardedIndex(shard_paths if written else write_shards(vectors, n_shards, directory, sources)).start()
+    if sharded_index.size != index.ntotal:
+        sharded_index.close()
+        sharded_index = ShardedIndex(write_shards(vectors, n_shards, directory, sources)).start()
+    logger.info(f"Serving {index.ntotal} vectors from {n_shards} shard workers")
+    sharded_store = ShardedVectorStore(vector_store, sharded_index)
+    if router is not None:
+        router.vector_store = sharded_store
+        sharded_store.document_router = router
+    vector_store.index = faiss.IndexFlatL2(index.d)
+    return sharded_store
+
+
+if __name__ == "__main__":
+    _shard_worker(sys.argv[1])
@@ -0,0 +1,58 @@
+##This is the file where concurrent identical calls are coalesced into one (single-flight).
+# The first caller for a key runs the call; callers arriving while it is in flight wait and share its result.
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from metrics import METRICS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key. Nothing is cached: once a call
+    finishes, the next caller with its key runs it again."""
+
+    def __init__(self, counter: str = "coalesced_calls"):
+        self.counter = counter
+        self.saved_calls = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn, or wait for the in-flight call with the same key.
+        Returns the result and whether it was shared from another caller's call;
+        an exception raised by fn is raised in every waiting caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.saved_calls += 1
+        if not leader:
+            METRICS.increment(self.counter)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -2,8 +2,9 @@ import streamlit as st
 import os
 import hashlib
 import time
-import json
-from agent import AviationAgent
+from chat_store import ChatStore, DEFAULT_PAGE_SIZE, new_session_id, is_valid_session_id
+from metrics import METRICS, serve_metrics
+from token_accounting import LEDGER
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -579,38 +580,67 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Chat history storage functions
-def save_chat_history(chat_history):
-    """Save chat history to a local file."""
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", DEFAULT_PAGE_SIZE))
+
+@st.cache_resource
+def get_chat_store():
+    """Open the chat store once per server process, import the history of earlier
+    single-user versions once, and expire idle sessions (the store repeats this hourly as it is written)."""
+    store = ChatStore()
+    store.import_legacy_history()
+    store.expire_sessions()
+    return store
+
+def get_session_id():
+    """Session id from the ?session= URL parameter, so a reload keeps its history.
+    The id is random and long; anyone with the URL can read the session, so it should not be shared.
+    Guessable ids typed into the URL are replaced."""
+    session_id = st.query_params.get("session")
+    if not is_valid_session_id(session_id):
+        session_id = new_session_id()
+        st.query_params["session"] = session_id
+    return session_id
+
+def save_chat_message(role, content):
+    """Append one message to this session's history and to the messages on screen."""
+    st.session_state.chat_history.append({"role": role, "content": content})
     try:
-        with open('chat_history.json', 'w') as f:
-            json.dump(chat_history, f)
+        get_chat_store().append(st.session_state.session_id, role, content)
     except Exception as e:
         st.error(f"Error saving chat history: {str(e)}")
 
 def load_chat_history():
-    """Load chat history from local file."""
+    """Load the most recent page of this session's chat history."""
     try:
-        if os.path.exists('chat_history.json'):
-            with open('chat_history.json', 'r') as f:
-                return json.load(f)
+        return get_chat_store().read_recent(st.session_state.session_id, CHAT_PAGE_SIZE)
     except Exception as e:
         st.error(f"Error loading chat history: {str(e)}")
     return []
 
+def load_earlier_messages():
+    """Prepend the next older page of messages to the messages on screen."""
+    try:
+        older = get_chat_store().read_recent(st.session_state.session_id, CHAT_PAGE_SIZE,
+                                             offset=len(st.session_state.chat_history))
+        st.session_state.chat_history = older + st.session_state.chat_history
+    except Exception as e:
+        st.error(f"Error loading chat history: {str(e)}")
+
 def clear_chat_history():
-    """Clear chat history from both session state and file."""
+    """Clear chat history from both session state and the store."""
     st.session_state.chat_history = []
     try:
-        if os.path.exists('chat_history.json'):
-            os.remove('chat_history.json')
+        get_chat_store().clear_session(st.session_state.session_id)
     except Exception as e:
         st.error(f"Error clearing chat history: {str(e)}")
 
 # Initialize session state
+if "session_id" not in st.session_state:
+    st.session_state.session_id = get_session_id()
 if "agent" not in st.session_state:
     st.session_state.agent = None
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = load_chat_history()  # Load from file
+    st.session_state.chat_history = load_chat_history()  # Most recent page only
 if "documents_loaded" not in st.session_state:
     st.session_state.documents_loaded = False
 if "auto_load_attempted" not in st.session_state:
@@ -622,6 +652,8 @@ def initialize_agent():
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY not found in environment variables")
+    # Imported on first use so the page renders before LangChain, OpenAI and FAISS are loaded
+    from agent import AviationAgent
     return AviationAgent(api_key)
 
 @st.cache_data
@@ -655,6 +687,45 @@ def load_documents_cached(_agent, pdf_hash):
         st.error("❌ Failed to load documents")
         return False
 
+@st.cache_resource
+def start_metrics_endpoint():
+    """Serve /metrics and /metrics.json on METRICS_PORT (on METRICS_HOST, localhost by default),
+    once per server process."""
+    port = os.getenv("METRICS_PORT")
+    if port:
+        serve_metrics(int(port), os.getenv("METRICS_HOST", "127.0.0.1"))
+    return port
+
+def render_diagnostics_panel():
+    """Show counters and the stage breakdown of this session's recent queries in the sidebar."""
+    with st.sidebar:
+        st.markdown("### 📈 Diagnostics")
+        usage = LEDGER.get_usage(f"session:{st.session_state.session_id}")
+        st.caption(f"This session: {usage['total_tokens']} tokens (~${usage['cost_usd']:.4f})")
+        snapshot = METRICS.snapshot()
+        if snapshot["counters"]:
+            st.dataframe(
+                [{"counter": name, "value": value} for name, value in sorted(snapshot["counters"].items())],
+                hide_index=True
+            )
+        traces = METRICS.recent_traces(st.session_state.session_id)
+        if not traces:
+            st.caption("No queries recorded yet.")
+            return
+        st.markdown("**Recent queries (ms per stage)**")
+        st.dataframe(
+            [
+                dict(
+                    {"started": trace["started_at"][11:], "route": trace.get("route", ""),
+                     "total": round(trace["total_seconds"] * 1000, 1)},
+                    **{stage: round(seconds * 1000, 1) for stage, seconds in trace["stages"].items()
+                       if stage != "ask_question"}
+                )
+                for trace in traces
+            ],
+            hide_index=True
+        )
+
 def auto_load_documents():
     """Automatically load documents using cached processing."""
     if st.session_state.agent is None:
@@ -675,11 +746,55 @@ def auto_load_documents():
         st.error(f"Error auto-loading documents: {str(e)}")
         return False
 
+def answer_prompt(prompt, selected_documents, selected_corpora):
+    """Ask the agent and show the answer; the question is saved to the history only once the
+    agent has admitted it, so a question turned away as overloaded leaves no trace."""
+    # Display user message with animation
+    st.markdown(f'<div class="user-bubble">{prompt}</div>', unsafe_allow_html=True)
+
+    # Get agent response with enhanced loading
+    with st.spinner("🔍 Analyzing aviation documents..."):
+        try:
+            response = st.session_state.agent.ask_question(prompt, session_id=st.session_state.session_id,
+                                                           documents=selected_documents or None,
+                                                           corpora=selected_corpora or None)
+            if response.get("busy"):
+                # Overloaded: nothing was sent, so nothing is added to the history
+                st.markdown(f'<div class="status-indicator status-warning">⏳ {response["answer"]}</div>', unsafe_allow_html=True)
+            else:
+                # Add both messages to chat history
+                save_chat_message("user", prompt)
+                save_chat_message("assistant", response["answer"])
+                
+                # Display assistant message with animation
+                st.markdown(f'<div class="assistant-bubble">{response["answer"]}</div>', unsafe_allow_html=True)
+                
+                # Enhanced source documents display
+                if response["source_documents"]:
+                    with st.expander("📄 View Source Documents & Citations", expanded=False):
+                        st.markdown('<div class="source-docs">', unsafe_allow_html=True)
+                        for i, doc in enumerate(response["source_documents"], 1):
+                            st.markdown(f"""
+                            <div class="source-doc-item">
+                                <strong>📋 Source Document {i}: {doc.metadata.get('source', 'unknown')}</strong><br>
+                                <small style="color: var(--text-muted);">Relevance Score: {doc.metadata.get('score', 'N/A')}</small>
+                            </div>
+                            """, unsafe_allow_html=True)
+                            st.markdown(doc.page_content)
+                            st.markdown("---")
+                        st.markdown('</div>', unsafe_allow_html=True)
+        except Exception as e:
+            st.markdown(f'<div class="status-indicator status-error">❌ Error processing request: {str(e)}</div>', unsafe_allow_html=True)
+
 def main():
     # Professional header with gradient text
     st.markdown('<div class="main-header">Arup Aviation Intelligence</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">Advanced Document Analysis for Aviation Planning Teams</div>', unsafe_allow_html=True)
 
+    start_metrics_endpoint()
+    if st.sidebar.checkbox("Show diagnostics", value=os.getenv("SHOW_DIAGNOSTICS", "").lower() in ("1", "true", "yes")):
+        render_diagnostics_panel()
+
     # Initialize agent if not already done
     if st.session_state.agent is None:
         try:
@@ -695,6 +810,34 @@ def main():
                 st.markdown('<div class="status-indicator status-error">❌ Failed to load documents. Please check your setup.</div>', unsafe_allow_html=True)
         st.session_state.auto_load_attempted = True
 
+    # Report documents skipped because their extraction hung or crashed
+    quarantined_files = st.session_state.agent.pdf_processor.get_quarantined_files()
+    if quarantined_files:
+        skipped = ", ".join(os.path.basename(entry["file"]) for entry in quarantined_files)
+        st.markdown(f'<div class="status-indicator status-warning">⚠️ Skipped {len(quarantined_files)} document(s) that could not be read in time: {skipped}</div>', unsafe_allow_html=True)
+
+    # Optional choice of corpora (FAA, ICAO, ...) configured in corpora.json
+    selected_corpora = []
+    corpus_names = st.session_state.agent.get_corpus_names()
+    if len(corpus_names) > 1:
+        selected_corpora = st.sidebar.multiselect(
+            "Search corpora",
+            corpus_names,
+            help="Leave empty to search the default documents"
+        )
+
+    # Optional restriction of retrieval to chosen documents (otherwise queries are routed automatically)
+    try:
+        document_names = st.session_state.agent.get_document_names(selected_corpora or None)
+    except (KeyError, ValueError) as e:
+        st.sidebar.error(str(e))
+        document_names = []
+    selected_documents = st.sidebar.multiselect(
+        "Limit answers to documents",
+        document_names,
+        help="Leave empty to search the most relevant documents automatically"
+    )
+
     # System status (simplified)
     # Removed system ready message
 
@@ -713,9 +856,14 @@ def main():
     
     st.markdown("Ask questions about aviation planning, regulations, and design standards.")
     
-    # Display chat history with smooth animations
+    # Display chat history with smooth animations; older pages are loaded on demand
     if st.session_state.chat_history:
         st.markdown("---")
+        older_count = get_chat_store().count(st.session_state.session_id) - len(st.session_state.chat_history)
+        if older_count > 0:
+            if st.button(f"⬆️ Load earlier messages ({older_count} more)"):
+                load_earlier_messages()
+                st.rerun()
         for message in st.session_state.chat_history:
             if message["role"] == "user":
                 st.markdown(f'<div class="user-bubble">{message["content"]}</div>', unsafe_allow_html=True)
@@ -726,43 +874,8 @@ def main():
     if prompt := st.chat_input("Ask about aviation planning, regulations, or design standards..."):
         if not st.session_state.documents_loaded:
             st.markdown('<div class="status-indicator status-warning">⚠️ Please wait for documents to load or check your setup!</div>', unsafe_allow_html=True)
-            return
-
-        # Add user message to chat history
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
-        save_chat_history(st.session_state.chat_history)  # Save to file
-        
-        # Display user message with animation
-        st.markdown(f'<div class="user-bubble">{prompt}</div>', unsafe_allow_html=True)
-
-        # Get agent response with enhanced loading
-        with st.spinner("🔍 Analyzing aviation documents..."):
-            try:
-                response = st.session_state.agent.ask_question(prompt)
-                
-                # Add assistant message to chat history
-                st.session_state.chat_history.append({"role": "assistant", "content": response["answer"]})
-                save_chat_history(st.session_state.chat_history)  # Save to file
-                
-                # Display assistant message with animation
-                st.markdown(f'<div class="assistant-bubble">{response["answer"]}</div>', unsafe_allow_html=True)
-                
-                # Enhanced source documents display
-                if response["source_documents"]:
-                    with st.expander("📄 View Source Documents & Citations", expanded=False):
-                        st.markdown('<div class="source-docs">', unsafe_allow_html=True)
-                        for i, doc in enumerate(response["source_documents"], 1):
-                            st.markdown(f"""
-                            <div class="source-doc-item">
-                                <strong>📋 Source Document {i}</strong><br>
-                                <small style="color: var(--text-muted);">Relevance Score: {getattr(doc, 'score', 'N/A')}</small>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            st.markdown(doc.page_content)
-                            st.markdown("---")
-                        st.markdown('</div>', unsafe_allow_html=True)
-            except Exception as e:
-                st.markdown(f'<div class="status-indicator status-error">❌ Error processing request: {str(e)}</div>', unsafe_allow_html=True)
+        else:
+            answer_prompt(prompt, selected_documents, selected_corpora)
     
     # Footer with simple branding - moved below chat input
     st.markdown("""
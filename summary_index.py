@@ -0,0 +1,122 @@
+##This is the file where the document summary index, built bottom-up from chunk groups, is defined.
+# Summaries are extractive, built at ingestion with the offline hashing embeddings, and cached with the vector store.
+
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+SUMMARY_FILE = "summaries.json"
+DEFAULT_SECTION_CHUNKS = 8  # consecutive chunks summarized together as one section
+SECTION_SENTENCES = 3
+DOCUMENT_SENTENCES = 6
+MAX_SUMMARY_CHARS = 1500
+
+# Questions about the documents as a whole: the whole question must be one of these forms, so
+# "Summarize the RSA requirements for ADG IV" or "What does the summary table say?" search the chunks
+_DOCUMENTS = r"(?:it|this|them|everything|(?:this|these|the|all(?:\s+the)?|each)\s+(?:documents?|files?|pdfs?))"
+BROAD_QUESTION_PATTERN = re.compile(
+    r"^\W*(?:please\s+)?(?:can\s+you\s+)?(?:"
+    rf"what\s+(?:is|are)\s+{_DOCUMENTS}\s+about"
+    rf"|what\s+do(?:es)?\s+{_DOCUMENTS}\s+(?:cover|contain|say)"
+    rf"|summari[sz]e(?:\s+{_DOCUMENTS})?"
+    rf"|(?:give\s+me\s+)?(?:an?\s+)?(?:overview|summary)(?:\s+of\s+{_DOCUMENTS})?"
+    rf"|(?:what\s+are\s+)?(?:the\s+)?(?:main|key)\s+(?:topics|points|themes)(?:\s+(?:of|in)\s+{_DOCUMENTS})?"
+    r")(?:\s+please)?\W*$",
+    re.IGNORECASE)
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(])")
+
+logger = logging.getLogger(__name__)
+
+
+def is_broad_question(question: str) -> bool:
+    """True for questions about what documents cover, which the summaries answer better than four chunks."""
+    return bool(BROAD_QUESTION_PATTERN.search(question))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of reasonable length, with PDF line breaks collapsed."""
+    sentences = SENTENCE_PATTERN.split(" ".join(text.split()))
+    return [sentence for sentence in sentences if 40 <= len(sentence) <= 400]
+
+
+class ExtractiveSummarizer:
+    """Picks the sentences closest to the centroid of a text, kept in their original order.
+    Uses the offline hashing embeddings, so summarizing costs no API calls."""
+
+    def __init__(self, embeddings=None):
+        if embeddings is None:
+            from local_embeddings import HashingEmbeddings
+            embeddings = HashingEmbeddings(n_features=2048)
+        self.embeddings = embeddings
+
+    def summarize(self, texts: List[str], max_sentences: int) -> str:
+        sentences = list(dict.fromkeys(sentence for text in texts for sentence in split_sentences(text)))
+        if len(sentences) <= max_sentences:
+            return " ".join(sentences)[:MAX_SUMMARY_CHARS]
+        vectors = np.asarray(self.embeddings.embed_documents(sentences), dtype=np.float32)
+        centroid = vectors.mean(axis=0)
+        scores = vectors @ (centroid / (np.linalg.norm(centroid) or 1.0))
+        chosen = sorted(np.argsort(-scores)[:max_sentences])
+        return " ".join(sentences[i] for i in chosen)[:MAX_SUMMARY_CHARS]
+
+
+class SummaryIndex:
+    """Per-document summaries, each summarizing the summaries of its consecutive chunk groups,
+    so no single summarizing pass covers a whole long document. Only the document summaries
+    are kept; questions about specific sections search the chunks."""
+
+    def __init__(self, documents: Dict[str, Dict[str, Any]]):
+        self.documents = documents
+
+    @classmethod
+    def build(cls, vector_store: Any, summarizer: Optional[ExtractiveSummarizer] = None,
+              section_chunks: int = DEFAULT_SECTION_CHUNKS) -> "SummaryIndex":
+        """Summarize the chunks of a FAISS store, grouped by their "source" document in index order."""
+        summarizer = summarizer or ExtractiveSummarizer()
+        chunks: Dict[str, List] = {}
+        for position in sorted(vector_store.index_to_docstore_id):
+            document = vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+            source = document.metadata.get("source", "documents")
+            chunks.setdefault(source, []).append((position, document.page_content))
+
+        documents = {}
+        for source, entries in chunks.items():
+            section_summaries = [summarizer.summarize([text for _, text in entries[start:start + section_chunks]],
+                                                      SECTION_SENTENCES)
+                                 for start in range(0, len(entries), section_chunks)]
+            documents[source] = {"summary": summarizer.summarize(section_summaries, DOCUMENT_SENTENCES),
+                                 "chunks": len(entries)}
+        return cls(documents)
+
+    @property
+    def sources(self) -> List[str]:
+        return sorted(self.documents)
+
+    def document_summaries(self, sources: Optional[List[str]] = None) -> List[Any]:
+        """Summary documents for the given sources (all by default), for use as context."""
+        from langchain_core.documents import Document
+        return [Document(page_content=self.documents[source]["summary"],
+                         metadata={"source": source, "level": "document"})
+                for source in (sources or self.sources) if source in self.documents]
+
+    def save(self, directory: str):
+        with open(os.path.join(directory, SUMMARY_FILE), 'w') as f:
+            json.dump(self.documents, f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["SummaryIndex"]:
+        """Read the summaries cached with an index, or None if it has none."""
+        path = os.path.join(directory, SUMMARY_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable summary index {path}: {str(e)}")
+            return None
@@ -0,0 +1,184 @@
+##This is the file where standards tables are extracted from document text and looked up directly.
+# Tables are detected from their "Table x-y." caption, stored as JSON with the cached index and matched by row and column.
+
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+TABLE_FILE = "tables.json"
+
+CAPTION_PATTERN = re.compile(r"^\s*Table\s+([A-Z]?\d+(?:[-.–]\d+)*)\.?\s+(\S.*?)\s*$", re.IGNORECASE)
+VALUE = (r"(?:\d[\d,]*(?:\.\d+)?(?:\s*(?:ft|feet|m|mm|cm|in|%|percent|deg|degrees|°|lbs?|kg|kts?|knots)\b)?"
+         r"|N/?A\b)")
+ROW_PATTERN = re.compile(rf"^(?P<label>.*?[A-Za-z].*?)\s+(?P<values>{VALUE}(?:\s+{VALUE})*)\s*$")
+VALUE_PATTERN = re.compile(VALUE)
+
+# Spelled-out terms and their abbreviations match each other
+ABBREVIATIONS = [
+    ("taxiway design group", "tdg"), ("airplane design group", "adg"), ("aircraft design group", "adg"),
+    ("design group", "adg"), ("runway safety area", "rsa"), ("taxiway safety area", "tsa"),
+    ("object free area", "ofa"), ("obstacle free zone", "ofz"), ("runway protection zone", "rpz"),
+]
+ROMAN_NUMERALS = {"i": "1", "ii": "2", "iii": "3", "iv": "4", "v": "5", "vi": "6"}
+# Questions asking for reasoning rather than a value go to the LLM
+NOT_A_LOOKUP = re.compile(r"\b(?:why|explain|compare|comparison|difference|rationale|history)\b", re.IGNORECASE)
+STOPWORDS = {"the", "a", "an", "of", "for", "what", "is", "are", "in", "on", "to", "and", "at", "by", "with"}
+# Besides the row and column, a value question may only use these words; "How is the runway
+# width measured?" or "Can the runway width be reduced?" goes to retrieval instead
+VALUE_WORDS = {"s", "value", "values", "required", "requirement", "minimum", "maximum", "min", "max",
+               "standard", "standards", "tell", "show", "give", "me", "list", "table", "please"}
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """Lowercase words with abbreviations applied and design-group numerals as digits."""
+    text = " " + " ".join(re.sub(r"[^a-z0-9.]+", " ", text.lower()).replace(". ", " ").split()) + " "
+    for phrase, abbreviation in ABBREVIATIONS:
+        text = text.replace(f" {phrase} ", f" {abbreviation} ")
+    text = re.sub(r"\b(adg|tdg|group)\s+(i{1,3}|iv|vi?)\b", lambda m: f"{m.group(1)} {ROMAN_NUMERALS[m.group(2)]}", text)
+    return text.strip().rstrip(".")
+
+
+def _split_header(header: str, n_columns: int) -> Tuple[str, List[str]]:
+    """Split a header line into the label column's name and n_columns value column names."""
+    tokens = header.split()
+    # "Item ADG I ADG II ADG III ADG IV": a word repeated once per column starts each column name
+    for start, token in enumerate(tokens[1:], 1):
+        starts = [i for i in range(start, len(tokens)) if tokens[i] == token]
+        if len(starts) == n_columns:
+            bounds = starts + [len(tokens)]
+            return " ".join(tokens[:start]), [" ".join(tokens[bounds[i]:bounds[i + 1]]) for i in range(n_columns)]
+    if len(tokens) > n_columns and (len(tokens) - 1) % n_columns == 0:
+        width = (len(tokens) - 1) // n_columns
+        return tokens[0], [" ".join(tokens[1 + i * width:1 + (i + 1) * width]) for i in range(n_columns)]
+    if len(tokens) > n_columns:
+        return " ".join(tokens[:-n_columns]), tokens[-n_columns:]
+    return "Item", [f"Column {i + 1}" for i in range(n_columns)]
+
+
+def extract_tables(text: str, source: str) -> List[Dict[str, Any]]:
+    """Find captioned tables laid out one row per line: a "Table x-y. Title" caption, a header
+    line, then rows of a label followed by the same number of values."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    tables = []
+    for i, line in enumerate(lines):
+        caption = CAPTION_PATTERN.match(line)
+        if caption is None or i + 2 >= len(lines):
+            continue
+        rows = []
+        n_columns = None
+        for row_line in lines[i + 2:]:
+            match = ROW_PATTERN.match(row_line)
+            if match is None:
+                break
+            values = VALUE_PATTERN.findall(match.group("values"))
+            if n_columns is None:
+                n_columns = len(values)
+            if len(values) != n_columns:
+                break
+            rows.append({"label": match.group("label"), "values": values})
+        if not rows:
+            continue
+        label_header, columns = _split_header(lines[i + 1], n_columns)
+        tables.append({"source": source, "table": caption.group(1), "title": caption.group(2),
+                       "label_header": label_header, "columns": columns, "rows": rows})
+    return tables
+
+
+class TableStore:
+    """Extracted tables with an index from normalized row labels to their rows."""
+
+    def __init__(self, tables: List[Dict[str, Any]]):
+        self.tables = tables
+        self._rows: Dict[str, List[Tuple[int, int]]] = {}
+        for table_index, table in enumerate(tables):
+            for row_index, row in enumerate(table["rows"]):
+                self._rows.setdefault(normalize(row["label"]), []).append((table_index, row_index))
+        self._columns = [[normalize(column) for column in table["columns"]] for table in tables]
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def lookup(self, question: str, sources: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Find the table row named in the question and, if the question names a column, its value.
+        Returns None when no row matches, equally good matches disagree, or the question asks
+        anything besides the value (reasoning, methods, conditions)."""
+        if NOT_A_LOOKUP.search(question):
+            return None
+        text = f" {normalize(question)} "
+        words = set(text.split()) - STOPWORDS
+        best_score, matches = 0.0, []
+        for label, positions in self._rows.items():
+            label_words = set(label.split()) - STOPWORDS
+            if not label_words:
+                continue
+            # A label quoted as a phrase beats one whose words appear scattered through the question
+            if f" {label} " in text:
+                score = len(label_words) + 0.5
+            elif label_words <= words:
+                score = len(label_words)
+            else:
+                continue
+            positions = [p for p in positions if sources is None or self.tables[p[0]]["source"] in sources]
+            if score > best_score and positions:
+                best_score, matches = score, positions
+            elif score == best_score:
+                matches = matches + positions
+        if not matches:
+            return None
+        # Several tables (the same standard quoted by different documents) must agree
+        table_index, row_index = matches[0]
+        columns, row = self._columns[table_index], self.tables[table_index]["rows"][row_index]
+        for other_table, other_row in matches[1:]:
+            if self._columns[other_table] != columns or self.tables[other_table]["rows"][other_row]["values"] != row["values"]:
+                return None
+
+        column_words = {word for column in columns for word in column.split()}
+        if words - set(normalize(row["label"]).split()) - column_words - VALUE_WORDS:
+            return None
+        named = [i for i, column in enumerate(columns) if f" {column} " in text]
+        if len(columns) == 1:
+            named = [0]
+        # The longest column name wins ("adg 3" over a stray "3")
+        column = max(named, key=lambda i: len(columns[i])) if named else None
+        return {"table": self.tables[table_index], "row": row, "column": column,
+                "tables": [self.tables[i] for i, _ in matches]}
+
+    @staticmethod
+    def format_answer(result: Dict[str, Any]) -> str:
+        table, row, column = result["table"], result["row"], result["column"]
+        if column is not None:
+            answer = f"{row['label']} for {table['columns'][column]}: **{row['values'][column]}**."
+        else:
+            values = ", ".join(f"{name} {value}" for name, value in zip(table["columns"], row["values"]))
+            answer = f"{row['label']}: {values}."
+        sources = "; ".join(f"{t['source']}, Table {t['table']} ({t['title']})" for t in result["tables"])
+        return f"{answer}\n\nSource: {sources}."
+
+    @staticmethod
+    def format_table(table: Dict[str, Any]) -> str:
+        """The whole table as plain text, for citations."""
+        lines = [f"Table {table['table']}. {table['title']}",
+                 " | ".join([table["label_header"]] + table["columns"])]
+        lines.extend(" | ".join([row["label"]] + row["values"]) for row in table["rows"])
+        return "\n".join(lines)
+
+    def save(self, directory: str):
+        with open(os.path.join(directory, TABLE_FILE), 'w') as f:
+            json.dump(self.tables, f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["TableStore"]:
+        """Read the tables cached with an index, or None if it has none."""
+        path = os.path.join(directory, TABLE_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable table store {path}: {str(e)}")
+            return None
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test score-aware retrieval: relevance scores in metadata and adaptive k between min and max
+"""
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from local_embeddings import HashingEmbeddings
+from retrieval import VectorStoreSearchRetriever, select_adaptive_k, relevance_score, search_options
+
+
+def _scored(*scores):
+    return [(Document(page_content=f"chunk {i}"), score) for i, score in enumerate(scores)]
+
+
+def test_select_adaptive_k():
+    """Clear winners shrink k; flat score distributions keep up to max_k."""
+    clear = _scored(0.92, 0.71, 0.70, 0.69, 0.68)
+    assert len(select_adaptive_k(clear, min_k=1, max_k=4, score_margin=0.1)) == 1
+    assert len(select_adaptive_k(clear, min_k=2, max_k=4, score_margin=0.1)) == 2
+    flat = _scored(0.81, 0.80, 0.79, 0.78, 0.77)
+    assert len(select_adaptive_k(flat, min_k=1, max_k=4, score_margin=0.1)) == 4
+    assert len(select_adaptive_k(flat, min_k=1, max_k=4, score_threshold=0.795)) == 2
+    assert len(select_adaptive_k(flat, min_k=3, max_k=4, score_threshold=0.9)) == 3
+    assert select_adaptive_k([], min_k=2, max_k=4) == []
+    print("✓ k adapts to the score distribution within [min_k, max_k]")
+
+
+def test_relevance_score():
+    assert relevance_score(0.0) == 1.0
+    assert abs(relevance_score(0.5) - 0.75) < 1e-9
+    assert relevance_score(4.0) == 0.0
+    print("✓ squared L2 distances map to cosine similarity")
+
+
+def test_retriever_returns_scores():
+    """Returned chunks carry their score, best first, without changing the stored documents."""
+    texts = ["Runway width for design group III is 150 feet.",
+             "Holding position markings are painted yellow.",
+             "Taxiway edge lights are blue.",
+             "Apron design considers aircraft parking."]
+    store = FAISS.from_texts(texts, HashingEmbeddings(n_features=1024))
+    retriever = VectorStoreSearchRetriever(vector_store=store, k=4, min_k=1, score_margin=0.2)
+    documents = retriever.invoke("runway width design group III")
+    scores = [document.metadata["score"] for document in documents]
+    assert documents[0].page_content == texts[0]
+    assert scores == sorted(scores, reverse=True) and 0 < scores[0] <= 1
+    assert len(documents) < 4
+    assert all("score" not in document.metadata for document in store.docstore._dict.values())
+    print(f"✓ retrieved {len(documents)} chunk(s) with scores {scores}")
+
+    with search_options(k=1):
+        assert len(retriever.invoke("taxiway lights")) == 1
+    print("✓ per-call k caps the result")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Adaptive-k Retrieval")
+    print("=" * 50)
+    test_select_adaptive_k()
+    test_relevance_score()
+    test_retriever_returns_scores()
+    print("\n🎉 All adaptive-k retrieval tests passed!")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test admission control: concurrency limit, fast rejection, wait deadline and per-user fairness
+"""
+import time
+import threading
+import httpx
+import openai
+from admission import AdmissionController, Overloaded
+from agent import AviationAgent, BUSY_ANSWER
+
+
+def _start(controller, user, log, hold=0.1):
+    def run():
+        try:
+            with controller.admit(user):
+                log.append(user)
+                time.sleep(hold)
+        except Overloaded as e:
+            log.append(f"{user}:{e.reason}")
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.02)  # fix the arrival order
+    return thread
+
+
+def test_limit_queue_and_rejection():
+    """Two run at once, two queue, and the fifth is rejected immediately."""
+    controller = AdmissionController(max_concurrent=2, queue_size=2, queue_timeout=5)
+    log = []
+    threads = [_start(controller, f"user{i}", log, hold=0.3) for i in range(5)]
+    assert controller.stats()["active"] == 2 and controller.stats()["queued"] == 2
+    assert log[-1] == "user4:queue_full"
+    for thread in threads:
+        thread.join()
+    assert sorted(log) == ["user0", "user1", "user2", "user3", "user4:queue_full"]
+    assert controller.stats()["active"] == 0 and controller.stats()["queued"] == 0
+    print("✓ concurrency bounded, overflow rejected without waiting")
+
+
+def test_deadline():
+    controller = AdmissionController(max_concurrent=1, queue_size=4, queue_timeout=0.1)
+    log = []
+    threads = [_start(controller, "alice", log, hold=0.5), _start(controller, "bob", log)]
+    for thread in threads:
+        thread.join()
+    assert log == ["alice", "bob:deadline"]
+    assert controller.stats()["queued"] == 0
+    print("✓ queued question gives up at its deadline")
+
+
+def test_users_served_round_robin():
+    """A user with a backlog does not delay a user who arrives later by the whole backlog."""
+    controller = AdmissionController(max_concurrent=1, queue_size=10, queue_timeout=5)
+    log = []
+    threads = [_start(controller, "alice", log) for _ in range(4)]
+    threads.append(_start(controller, "bob", log))
+    for thread in threads:
+        thread.join()
+    assert log == ["alice", "alice", "bob", "alice", "alice"], log
+    print("✓ users take turns for free slots")
+
+
+class SlowChain:
+    def invoke(self, inputs, config=None):
+        time.sleep(0.3)
+        return {"answer": "ok", "source_documents": []}
+
+
+def test_agent_returns_busy_answer():
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.qa_chain = SlowChain()
+    agent.admission = AdmissionController(max_concurrent=1, queue_size=0, queue_timeout=1)
+    results = {}
+    threads = [threading.Thread(target=lambda q=q: results.__setitem__(q, agent.ask_question(q, session_id=q)))
+               for q in ("What is the runway width?", "What is the taxiway width?")]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+    assert results["What is the runway width?"]["answer"] == "ok"
+    busy = results["What is the taxiway width?"]
+    assert busy["busy"] and busy["answer"] == BUSY_ANSWER and busy["source_documents"] == []
+    print("✓ overloaded agent answers with a busy response")
+
+
+class RateLimitedChain:
+    def invoke(self, inputs, config=None):
+        response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        raise openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_rate_limit_answers_busy():
+    """An API rate limit is reported as busy; other errors get the apology."""
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.qa_chain = RateLimitedChain()
+    assert agent.ask_question("What is the runway width?")["busy"]
+    agent.qa_chain = type("FailingChain", (), {"invoke": lambda self, inputs, config=None: 1 / 0})()
+    result = agent.ask_question("What is the taxiway width?")
+    assert not result.get("busy") and "apologize" in result["answer"]
+    print("✓ rate-limited API answers with a busy response")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Admission Control")
+    print("=" * 50)
+    test_limit_queue_and_rejection()
+    test_deadline()
+    test_users_served_round_robin()
+    test_agent_returns_busy_answer()
+    test_rate_limit_answers_busy()
+    print("\n🎉 All admission control tests passed!")
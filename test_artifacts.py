@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test portable index artifacts and content-based cache keys
+"""
+import io
+import os
+import json
+import time
+import shutil
+import tarfile
+import tempfile
+from langchain_community.vectorstores import FAISS
+from artifacts import ArtifactError, export_artifact, import_artifact, read_artifact
+from local_embeddings import HashingEmbeddings
+from pdf_processor import PDFProcessor
+
+
+def _processor(root, name, **kwargs):
+    return PDFProcessor("", embedding_backend="local", isolate_extraction=False,
+                        pdf_dir=os.path.join(root, f"{name}_pdfs"), cache_dir=os.path.join(root, f"{name}_cache"),
+                        **kwargs)
+
+
+def test_cache_key_is_relocatable():
+    """The same PDFs give the same key from another directory and after a touch; new contents do not."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = _processor(tmp_dir, "a")
+        with open(os.path.join(processor.default_pdf_dir, "ac.pdf"), 'wb') as f:
+            f.write(b"%PDF-1.4 runway design")
+        moved = os.path.join(tmp_dir, "elsewhere")
+        shutil.copytree(processor.default_pdf_dir, moved)
+        os.utime(os.path.join(moved, "ac.pdf"), (1, 1))
+        assert processor._get_directory_hash(moved) == processor._get_directory_hash(processor.default_pdf_dir)
+        with open(os.path.join(moved, "ac.pdf"), 'ab') as f:
+            f.write(b" revised")
+        assert processor._get_directory_hash(moved) != processor._get_directory_hash(processor.default_pdf_dir)
+    print("✓ cache keys follow file names and contents, not paths or times")
+
+
+def test_export_import_round_trip():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        builder = _processor(tmp_dir, "build")
+        store = FAISS.from_texts(["Runway width is 150 feet.", "Taxiway lights are blue."],
+                                 HashingEmbeddings(n_features=256), metadatas=[{"source": "ac.pdf"}] * 2)
+        store.save_local(os.path.join(builder.cache_dir, "directory_abc"))
+        path = export_artifact(builder.cache_dir, "directory_abc", os.path.join(tmp_dir, "artifacts"),
+                               [{"path": "ac.pdf", "hash": "123"}])
+        assert path.endswith("directory_abc.tar.gz")
+        with open(path, 'rb') as f:
+            first_export = f.read()
+        time.sleep(1.1)  # gzip and tar times have one-second resolution
+        export_artifact(builder.cache_dir, "directory_abc", os.path.join(tmp_dir, "artifacts"),
+                        [{"path": "ac.pdf", "hash": "123"}])
+        with open(path, 'rb') as f:
+            assert f.read() == first_export
+        manifest = read_artifact(path)
+        assert sorted(manifest["files"]) == ["index.faiss", "index.pkl"] and manifest["sources"][0]["path"] == "ac.pdf"
+
+        # A fresh deployment installs the artifact on its first cache miss
+        deployment = _processor(tmp_dir, "deploy", artifact_dir=os.path.join(tmp_dir, "artifacts"))
+        loaded = deployment._load_vector_store_from_cache("directory_abc")
+        assert loaded is not None and loaded.index.ntotal == 2
+        assert deployment._load_vector_store_from_cache("directory_other") is None
+        with open(os.path.join(deployment.cache_dir, "directory_abc", "index.pkl"), 'rb') as installed, \
+                open(os.path.join(builder.cache_dir, "directory_abc", "index.pkl"), 'rb') as original:
+            assert installed.read() == original.read()
+        try:
+            import_artifact(path, deployment.cache_dir, cache_key="directory_other")
+            assert False, "an artifact for another key must be refused"
+        except ArtifactError:
+            pass
+    print("✓ exported index installed and loaded by a new deployment")
+
+
+def test_tampered_artifact_is_refused():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_dir = os.path.join(tmp_dir, "cache", "directory_abc")
+        os.makedirs(index_dir)
+        with open(os.path.join(index_dir, "index.faiss"), 'wb') as f:
+            f.write(b"vectors")
+        path = export_artifact(os.path.join(tmp_dir, "cache"), "directory_abc", tmp_dir)
+        with tarfile.open(path, "r:gz") as tar:
+            manifest = tar.extractfile("manifest.json").read()
+        tampered = os.path.join(tmp_dir, "tampered.tar.gz")
+        with tarfile.open(tampered, "w:gz") as tar:
+            for name, data in [("manifest.json", manifest), ("index/index.faiss", b"VECTORS")]:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        for bad_path in [tampered, os.path.join(tmp_dir, "missing.tar.gz")]:
+            try:
+                import_artifact(bad_path, os.path.join(tmp_dir, "deploy"))
+                assert False, "a bad artifact must be refused"
+            except ArtifactError:
+                pass
+        assert not os.path.exists(os.path.join(tmp_dir, "deploy", "directory_abc"))
+    print("✓ artifacts failing their checksums are refused")
+
+
+def test_unsafe_cache_key_is_refused():
+    """A manifest key that is not a plain directory name never reaches the cache."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        victim = os.path.join(tmp_dir, "victim")
+        os.makedirs(victim)
+        deploy = os.path.join(tmp_dir, "deploy")
+        for cache_key in ["../victim", "/tmp", "..", "", "a/b", None]:
+            manifest = json.dumps({"format": 1, "cache_key": cache_key, "files": {}, "sources": []}).encode()
+            path = os.path.join(tmp_dir, "evil.tar.gz")
+            with tarfile.open(path, "w:gz") as tar:
+                info = tarfile.TarInfo("manifest.json")
+                info.size = len(manifest)
+                tar.addfile(info, io.BytesIO(manifest))
+            try:
+                import_artifact(path, deploy)
+                assert False, f"cache key {cache_key!r} must be refused"
+            except ArtifactError as e:
+                assert "invalid cache key" in str(e)
+        assert os.path.isdir(victim)
+    print("✓ artifacts with unsafe cache keys are refused")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Index Artifacts")
+    print("=" * 50)
+    test_cache_key_is_relocatable()
+    test_export_import_round_trip()
+    test_tampered_artifact_is_refused()
+    test_unsafe_cache_key_is_refused()
+    print("\n🎉 All index artifact tests passed!")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the resumable index build: checkpoints survive an interruption and the app can load the result
+"""
+import os
+import tempfile
+import build_index
+from build_index import build_index as run_build, BuildCheckpoint
+from pdf_processor import PDFProcessor
+
+TEXTS = {
+    "design.pdf": "Runway width for design group III is 150 feet. " * 40,
+    "markings.pdf": "Holding position markings are painted yellow. " * 40,
+}
+
+
+def _make_processor(tmp_dir):
+    pdf_dir = os.path.join(tmp_dir, "pdfs")
+    os.makedirs(pdf_dir)
+    for filename in TEXTS:
+        with open(os.path.join(pdf_dir, filename), 'wb') as f:
+            f.write(b"%PDF-1.4 placeholder")
+    processor = PDFProcessor("", isolate_extraction=False, embedding_backend="local",
+                             pdf_dir=pdf_dir, cache_dir=os.path.join(tmp_dir, "cache"))
+    extracted = []
+
+    def extract(pdf_path):
+        extracted.append(os.path.basename(pdf_path))
+        return TEXTS[os.path.basename(pdf_path)]
+    processor.extract_text_from_pdf = extract
+    return processor, pdf_dir, extracted
+
+
+def test_interrupted_build_resumes():
+    """A build stopped after two batches re-extracts nothing and embeds only the rest."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, pdf_dir, extracted = _make_processor(tmp_dir)
+        saved = []
+        original_save_batch = BuildCheckpoint.save_batch
+
+        def save_then_crash(self, index, vectors):
+            original_save_batch(self, index, vectors)
+            saved.append(index)
+            if len(saved) == 2:
+                raise KeyboardInterrupt
+        BuildCheckpoint.save_batch = save_then_crash
+        try:
+            run_build(processor, pdf_dir, batch_size=2, output=lambda message: None)
+            assert False, "expected the build to be interrupted"
+        except KeyboardInterrupt:
+            pass
+        finally:
+            BuildCheckpoint.save_batch = original_save_batch
+        assert sorted(extracted) == sorted(TEXTS)
+        print("✓ build interrupted after two checkpointed batches")
+
+        messages = []
+        cache_key = run_build(processor, pdf_dir, batch_size=64, output=messages.append)
+        assert sorted(extracted) == sorted(TEXTS), "extracted text should come from the checkpoint"
+        assert any("2 files restored" in message for message in messages)
+        assert any("4 chunks restored" in message for message in messages)
+        assert any("ETA" in message for message in messages)
+        assert not any(name.startswith("build_") for name in os.listdir(processor.cache_dir))
+        print("✓ resumed build restored extracted text and embedded batches")
+
+        vector_store = processor.process_directory(pdf_dir)
+        assert cache_key in os.listdir(processor.cache_dir)
+        assert "yellow" in vector_store.similarity_search("holding position markings", k=1)[0].page_content
+        print("✓ app loads the built index from the cache")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Resumable Index Build")
+    print("=" * 50)
+    test_interrupted_build_resumes()
+    print("\n🎉 All index build tests passed!")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite chat store: per-session history, paging, concurrent writers and expiry
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from chat_store import ChatStore, new_session_id, is_valid_session_id
+
+
+def test_sessions_are_isolated_and_paged():
+    """Each session sees only its own messages, newest page first."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ChatStore(os.path.join(tmp_dir, "chat.db"))
+        for i in range(45):
+            store.append("alice", "user", f"a{i}")
+        store.append("bob", "user", "b0")
+
+        assert store.count("alice") == 45 and store.count("bob") == 1
+        assert [m["content"] for m in store.read_recent("alice", 20)] == [f"a{i}" for i in range(25, 45)]
+        assert [m["content"] for m in store.read_recent("alice", 20, offset=40)] == [f"a{i}" for i in range(0, 5)]
+        assert store.read_recent("bob") == [{"role": "user", "content": "b0"}]
+        print("✓ sessions isolated and paged from the end")
+
+        store.clear_session("alice")
+        assert store.count("alice") == 0 and store.count("bob") == 1
+        print("✓ one session cleared without touching others")
+
+
+def test_concurrent_writers():
+    """Writers on separate threads and connections do not lose messages."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ChatStore(os.path.join(tmp_dir, "chat.db"))
+
+        def write(session_id):
+            for i in range(50):
+                store.append(session_id, "user", f"{session_id}-{i}")
+
+        threads = [threading.Thread(target=write, args=(f"s{n}",)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert all(store.count(f"s{n}") == 50 for n in range(8))
+        print("✓ 8 concurrent writers stored 400 messages")
+
+
+def test_idle_sessions_expire():
+    """Sessions idle for longer than the TTL are deleted with their messages."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ChatStore(os.path.join(tmp_dir, "chat.db"), session_ttl_days=30)
+        store.append("old", "user", "hello")
+        time.sleep(0.05)
+        store.append("new", "user", "hello")
+        assert store.expire_sessions(max_age_seconds=0.03) == 1
+        assert store.count("old") == 0 and store.count("new") == 1
+        assert store.expire_sessions() == 0
+        print("✓ idle session expired")
+
+
+def test_writes_expire_sessions_periodically():
+    """A long-running store expires idle sessions from its writes, at most once per interval."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ChatStore(os.path.join(tmp_dir, "chat.db"), session_ttl_days=0.2 / 86400, expiry_interval=1.0)
+        store.append("old", "user", "hello")
+        time.sleep(0.3)
+        store.append("new", "user", "hello")
+        assert store.count("old") == 1  # within the interval of the first write's expiry run
+        time.sleep(0.8)
+        store.append("new", "user", "again")
+        assert store.count("old") == 0 and store.count("new") == 2
+        print("✓ idle sessions expired by later writes")
+
+
+def test_legacy_history_imported_once():
+    """History from the single-user JSON and JSONL files lands in one new session, once."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ChatStore(os.path.join(tmp_dir, "chat.db"))
+        jsonl_path = os.path.join(tmp_dir, "chat_history.jsonl")
+        json_path = os.path.join(tmp_dir, "chat_history.json")
+        with open(json_path, 'w') as f:
+            json.dump([{"role": "user", "content": "hi"}], f)
+        with open(jsonl_path, 'w') as f:
+            f.write('{"role": "user", "content": "hi"}\n{"role": "assistant", "content": "Hello!"}\n')
+
+        session_id = store.import_legacy_history([jsonl_path, json_path])
+        assert is_valid_session_id(session_id)
+        assert store.read_recent(session_id) == [{"role": "user", "content": "hi"},
+                                                 {"role": "assistant", "content": "Hello!"}]
+        assert store.import_legacy_history([jsonl_path, json_path]) is None
+        assert store.count(session_id) == 2
+        assert ChatStore(os.path.join(tmp_dir, "other.db")).import_legacy_history([json_path]) is not None
+        print("✓ legacy history imported into a new session once")
+
+
+def test_session_ids_are_unguessable():
+    assert is_valid_session_id(new_session_id()) and new_session_id() != new_session_id()
+    assert is_valid_session_id("0123456789abcdef0123456789abcdef")  # earlier uuid4 hex ids still work
+    assert not any(is_valid_session_id(s) for s in (None, "", "default", "alice", "a" * 20, "x" * 32 + "/"))
+    print("✓ short or hand-picked session ids rejected")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Chat Store")
+    print("=" * 50)
+    test_sessions_are_isolated_and_paged()
+    test_concurrent_writers()
+    test_idle_sessions_expire()
+    test_writes_expire_sessions_periodically()
+    test_legacy_history_imported_once()
+    test_session_ids_are_unguessable()
+    print("\n🎉 All chat store tests passed!")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test section and paragraph number indexing and direct clause answers
+"""
+import tempfile
+from agent import AviationAgent
+from clause_index import ClauseIndex, document_aliases, find_references, parse_clauses
+
+DESIGN_TEXT = """AC 150/5300-13B Airport Design - Page 12
+301. Runway Design
+Runway width depends on the airplane design group.
+Runway width 60 ft 75 ft 100 ft 150 ft
+3.2.1 Runway Shoulders
+Shoulders protect the runway edges from jet blast.
+3.2.2 Blast Pads
+Blast pads extend the full width of the runway and shoulders.
+302. Runway Safety Area
+The RSA is cleared and graded."""
+LIGHTING_TEXT = """301. Lighting Systems
+Approach lighting guides pilots to the threshold.
+2.5 m wide strips are not headings."""
+CONTENTS_TEXT = """Table of Contents
+301. Runway Design ........ 45
+3.2.1 Runway Shoulders ........ 46
+302. Runway Safety Area    48"""
+
+
+def test_parse_clauses():
+    clauses = parse_clauses(DESIGN_TEXT)
+    assert list(clauses) == ["301", "3.2.1", "3.2.2", "302"]
+    assert clauses["301"]["heading"] == "301. Runway Design"
+    assert clauses["3.2.1"]["text"] == "3.2.1 Runway Shoulders\nShoulders protect the runway edges from jet blast."
+    assert DESIGN_TEXT[clauses["302"]["start"]:clauses["302"]["end"]].startswith("302. Runway Safety Area")
+    assert list(parse_clauses(LIGHTING_TEXT)) == ["301"]
+    print("✓ paragraph and section headings mapped to their text spans")
+
+    with_contents = CONTENTS_TEXT + "\n" + DESIGN_TEXT
+    clauses = parse_clauses(with_contents)
+    assert list(clauses) == ["301", "3.2.1", "3.2.2", "302"]
+    assert clauses["301"]["text"] == parse_clauses(DESIGN_TEXT)["301"]["text"]
+    assert clauses["302"]["heading"] == "302. Runway Safety Area"
+    print("✓ contents-page entries do not replace the clauses they list")
+
+
+def test_references_and_document_names():
+    assert find_references("What does paragraph 305 say?") == ["305"]
+    assert find_references("show AC 150/5300-13B section 3.2.1") == ["3.2.1"]
+    assert find_references("see para. 4 and 3.1.2") == ["4", "3.1.2"]
+    assert find_references("What is the runway width for ADG III?") == []
+    assert document_aliases("ac_150_5300_13b.pdf") == ["ac150530013b", "150530013b"]
+    assert document_aliases("icao_annex14.pdf") == ["icaoannex14", "annex14"]
+    print("✓ clause numbers and document designations recognised")
+
+
+def test_resolve():
+    index = ClauseIndex.build({"ac_150_5300_13b.pdf": DESIGN_TEXT, "ac_150_5340_1m.pdf": LIGHTING_TEXT})
+    assert len(index) == 5
+    assert [(s, n) for s, n, _ in index.resolve("show AC 150/5300-13B section 3.2.1")] == [("ac_150_5300_13b.pdf", "3.2.1")]
+    assert [s for s, _, _ in index.resolve("What does paragraph 301 say?")] == ["ac_150_5300_13b.pdf", "ac_150_5340_1m.pdf"]
+    assert [s for s, _, _ in index.resolve("paragraph 301 of AC 150/5340-1M")] == ["ac_150_5340_1m.pdf"]
+    assert [s for s, _, _ in index.resolve("paragraph 301", sources=["ac_150_5340_1m.pdf"])] == ["ac_150_5340_1m.pdf"]
+    assert [n for _, n, _ in index.resolve("section 3.2")] == ["3.2.1", "3.2.2"]
+    assert index.resolve("paragraph 999") == []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index.save(tmp_dir)
+        assert ClauseIndex.load(tmp_dir).documents == index.documents
+        assert ClauseIndex.load(tmp_dir + "/missing") is None
+    print("✓ references resolved by document, sub-clause and source filter")
+
+
+class FailingChain:
+    def invoke(self, inputs, config=None):
+        raise AssertionError("clause questions must not reach the LLM")
+
+
+def test_agent_quotes_cited_clause():
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.vector_store = type("Store", (), {"clause_index": ClauseIndex.build({"ac_150_5300_13b.pdf": DESIGN_TEXT})})()
+    agent.qa_chain = FailingChain()
+    result = agent.ask_question("What does AC 150/5300-13B paragraph 302 say?")
+    assert result["level"] == "clause" and "**Paragraph 302** (ac_150_5300_13b.pdf)" in result["answer"]
+    assert "> The RSA is cleared and graded." in result["answer"]
+    assert result["source_documents"][0].metadata == {"source": "ac_150_5300_13b.pdf", "clause": "302", "level": "clause"}
+    print("✓ agent quoted the cited clause without an LLM call")
+
+    result = agent.ask_question("Hello, what does paragraph 302 say?")
+    assert result["level"] == "clause" and "**Paragraph 302**" in result["answer"]
+    print("✓ a greeting before a cited clause does not hide it")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Clause Index")
+    print("=" * 50)
+    test_parse_clauses()
+    test_references_and_document_names()
+    test_resolve()
+    test_agent_quotes_cited_clause()
+    print("\n🎉 All clause index tests passed!")
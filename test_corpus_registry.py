@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test the corpus registry: lazy loading, LRU eviction under a memory budget and pinned corpora
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from langchain_community.vectorstores import FAISS
+from corpus_registry import CorpusRegistry, estimate_index_bytes
+from document_router import DocumentRouter
+from local_embeddings import HashingEmbeddings
+from pdf_processor import PDFProcessor
+
+
+def _write_pdf(path, lines):
+    """Write a one-page PDF showing the given lines of text."""
+    stream = "BT /F1 11 Tf 50 750 Td 14 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+               "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+               "/Resources << /Font << /F1 5 0 R >> >> >>",
+               f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class FakeProcessor:
+    """Stands in for PDFProcessor: one small index per directory, counting loads."""
+
+    def __init__(self, delays=None):
+        self.loads = []
+        self.closed = []
+        self.delays = delays or {}
+
+    def process_directory(self, pdf_dir):
+        name = os.path.basename(pdf_dir)
+        self.loads.append(name)
+        time.sleep(self.delays.get(name, 0))
+        texts = [f"{name} chunk {i} " + "text " * 50 for i in range(20)]
+        store = FAISS.from_texts(texts, HashingEmbeddings(n_features=256),
+                                 metadatas=[{"source": f"{name}.pdf"}] * len(texts))
+        store.close = lambda: self.closed.append(name)  # as a sharded store stops its workers
+        return store
+
+
+def test_corpora_load_lazily_and_evict_lru():
+    """Corpora load on first use, stay resident while used, and the LRU one is evicted over budget."""
+    processor = FakeProcessor()
+    probe = processor.process_directory("probe")
+    one_index = estimate_index_bytes(probe, DocumentRouter.from_vector_store(probe))
+    processor.loads.clear()
+
+    registry = CorpusRegistry(processor, {"faa": "/corpora/faa", "icao": "/corpora/icao", "easa": "/corpora/easa"},
+                              memory_budget_mb=2.5 * one_index / (1024 * 1024))
+    assert registry.loaded_names() == [] and processor.loads == []
+    print("✓ nothing loaded at startup")
+
+    registry.get("faa")
+    registry.get("icao")
+    registry.get("faa")
+    assert processor.loads == ["faa", "icao"]
+    assert registry.get("faa").router.sources == ["faa.pdf"]
+    print("✓ corpora loaded once on first use")
+
+    registry.get("easa")
+    assert registry.loaded_names() == ["faa", "easa"], registry.loaded_names()
+    assert registry.memory_usage_bytes() <= registry.memory_budget_bytes
+    assert processor.closed == ["icao"]
+    print("✓ least recently used corpus evicted over budget and closed")
+
+    registry.get("icao")
+    assert processor.loads == ["faa", "icao", "easa", "icao"]
+    print("✓ evicted corpus reloaded on demand")
+
+
+def test_pinned_corpus_and_config_file():
+    """Pinned indexes are never evicted, and corpora.json directories resolve against the file."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "corpora.json")
+        with open(config_path, 'w') as f:
+            json.dump({"faa": {"pdf_dir": "faa"}}, f)
+        processor = FakeProcessor()
+        registry = CorpusRegistry(processor, CorpusRegistry.load_config(config_path), memory_budget_mb=0)
+        assert registry.pdf_dirs["faa"] == os.path.join(tmp_dir, "faa")
+
+        registry.pin("default", processor.process_directory("default"))
+        registry.get("faa")
+        assert registry.loaded_names() == ["default", "faa"]
+        registry.get("faa")
+        assert "default" in registry.loaded_names()
+        assert registry.names() == ["default", "faa"]
+        print("✓ pinned corpus kept and config directories resolved")
+
+
+def test_slow_load_does_not_block_other_corpora():
+    """While one corpus builds, other corpora are served, and concurrent requests share the build."""
+    processor = FakeProcessor(delays={"icao": 1.0})
+    registry = CorpusRegistry(processor, {"faa": "/corpora/faa", "icao": "/corpora/icao"}, memory_budget_mb=100)
+    registry.get("faa")
+    threads = [threading.Thread(target=registry.get, args=("icao",)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    start_time = time.perf_counter()
+    registry.get("faa")
+    assert time.perf_counter() - start_time < 0.5
+    for thread in threads:
+        thread.join()
+    assert processor.loads == ["faa", "icao"]
+    print("✓ loaded corpora served during another corpus's build, which ran once")
+
+
+
+def test_concurrent_builds_share_one_processor():
+    """Two corpora built at once through one PDFProcessor both load, with every PDF
+    extracted by the shared isolated worker and nothing quarantined."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpora = {}
+        for name in ("faa", "icao"):
+            pdf_dir = os.path.join(tmp_dir, name)
+            os.makedirs(pdf_dir)
+            for number in range(3):
+                _write_pdf(os.path.join(pdf_dir, f"{name}_{number}.pdf"),
+                           [f"{name} document {number}.", "Runway width is 150 feet.", "Taxiway lights are blue."])
+            corpora[name] = pdf_dir
+        processor = PDFProcessor("", embedding_backend="local", isolate_extraction=True,
+                                 pdf_dir=os.path.join(tmp_dir, "pdfs"), cache_dir=os.path.join(tmp_dir, "cache"))
+        registry = CorpusRegistry(processor, corpora, memory_budget_mb=100)
+        errors = []
+
+        def load(name):
+            try:
+                registry.get(name)
+            except Exception as e:
+                errors.append(e)
+
+        try:
+            threads = [threading.Thread(target=load, args=(name,)) for name in corpora]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert errors == [] and sorted(registry.loaded_names()) == ["faa", "icao"]
+            assert processor.get_quarantined_files() == []
+            for name in corpora:
+                assert len(registry.get(name).router.sources) == 3
+        finally:
+            processor.close()
+            processor.isolated_extractor.close()
+    print("✓ corpora built concurrently through one processor")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Corpus Registry")
+    print("=" * 50)
+    test_corpora_load_lazily_and_evict_lru()
+    test_pinned_corpus_and_config_file()
+    test_slow_load_does_not_block_other_corpora()
+    test_concurrent_builds_share_one_processor()
+    print("\n🎉 All corpus registry tests passed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test two-stage retrieval: routing queries to documents, then searching only their chunks
+"""
+from langchain_community.vectorstores import FAISS
+from document_router import DocumentRouter
+from local_embeddings import HashingEmbeddings
+
+CHUNKS = {
+    "runways.pdf": ["Runway width for design group III is 150 feet.",
+                    "Runway safety area length beyond the runway end.",
+                    "Runway shoulders and blast pads protect the runway edges."],
+    "markings.pdf": ["Holding position markings are painted yellow.",
+                     "Taxiway centerline markings are yellow lines.",
+                     "Runway threshold markings are white stripes."],
+    "lighting.pdf": ["Approach lighting systems guide pilots to the threshold.",
+                     "Taxiway edge lights are blue.",
+                     "Lighting intensity is controlled from the tower."],
+}
+
+
+def _build_store(with_sources=True):
+    texts = [text for chunks in CHUNKS.values() for text in chunks]
+    metadatas = [{"source": source} for source, chunks in CHUNKS.items() for _ in chunks]
+    return FAISS.from_texts(texts, HashingEmbeddings(n_features=1024),
+                            metadatas=metadatas if with_sources else None)
+
+
+def test_routes_to_relevant_document():
+    """The query is routed to the document that covers it, and only its chunks are returned."""
+    store = _build_store()
+    router = DocumentRouter.from_vector_store(store)
+    assert router.sources == ["lighting.pdf", "markings.pdf", "runways.pdf"]
+
+    query_vector = store.embedding_function.embed_query("blue taxiway edge lights")
+    sources = router.route(query_vector, top_n=1)
+    assert sources == ["lighting.pdf"], sources
+    results = router.search(query_vector, sources, k=2)
+    assert len(results) == 2
+    assert all(document.metadata["source"] == "lighting.pdf" for document, _ in results)
+    assert results[0][0].page_content == "Taxiway edge lights are blue."
+    print("✓ query routed to the lighting document and searched within it")
+
+
+def test_explicit_documents_and_merge():
+    """Searching several named documents merges their best chunks by distance."""
+    store = _build_store()
+    router = DocumentRouter.from_vector_store(store)
+    query_vector = store.embedding_function.embed_query("yellow markings")
+    results = router.search(query_vector, ["markings.pdf", "runways.pdf"], k=4)
+    distances = [distance for _, distance in results]
+    assert distances == sorted(distances)
+    assert {document.metadata["source"] for document, _ in results} <= {"markings.pdf", "runways.pdf"}
+    assert results[0][0].metadata["source"] == "markings.pdf"
+    print("✓ chunks from the named documents merged by distance")
+
+
+def test_store_without_sources_is_not_routed():
+    """Indexes cached before chunks were tagged fall back to searching everything."""
+    assert DocumentRouter.from_vector_store(_build_store(with_sources=False)) is None
+    print("✓ untagged store has no router")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Document Routing")
+    print("=" * 50)
+    test_routes_to_relevant_document()
+    test_explicit_documents_and_merge()
+    test_store_without_sources_is_not_routed()
+    print("\n🎉 All document routing tests passed!")
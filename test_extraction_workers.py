@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test isolated PDF extraction: deadlines, worker restarts and quarantine
+"""
+import os
+import time
+import signal
+import tempfile
+import threading
+from extraction_workers import IsolatedExtractor, ExtractionTimeout, ExtractionWorkerError
+from pdf_processor import PDFProcessor
+
+
+def _write_broken_pdf(tmp_dir: str) -> str:
+    pdf_path = os.path.join(tmp_dir, "broken.pdf")
+    with open(pdf_path, 'wb') as f:
+        f.write(b"this is not a pdf")
+    return pdf_path
+
+
+def _hanging_pdf(tmp_dir: str) -> str:
+    """A FIFO with no writer: the backend blocks opening it, like a PDF that hangs the parser."""
+    pdf_path = os.path.join(tmp_dir, "hangs.pdf")
+    os.mkfifo(pdf_path)
+    return pdf_path
+
+
+def test_broken_pdf_returns_none():
+    """A PDF the backend cannot parse is reported as failed, not quarantined; worker startup
+    does not count against the page deadline."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = _write_broken_pdf(tmp_dir)
+        extractor = IsolatedExtractor("pypdf2", page_timeout=0.05, file_timeout=60)
+        try:
+            assert extractor.extract_pages(pdf_path) is None
+            assert extractor.restart_count == 0
+            print("✓ broken PDF reported as an extraction error")
+        finally:
+            extractor.close()
+
+
+def test_missed_deadline_restarts_worker():
+    """A deadline miss kills the worker and the next file gets a fresh one."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        extractor = IsolatedExtractor("pypdf2", page_timeout=0.5, file_timeout=60)
+        try:
+            try:
+                extractor.extract_pages(_hanging_pdf(tmp_dir))
+                assert False, "expected ExtractionTimeout"
+            except ExtractionTimeout as e:
+                assert "page deadline" in str(e)
+                print(f"✓ deadline enforced: {e}")
+            assert extractor.restart_count == 1
+
+            assert extractor.extract_pages(_write_broken_pdf(tmp_dir)) is None
+            print("✓ restarted worker serves the next file")
+        finally:
+            extractor.close()
+
+
+def test_crashed_worker_is_replaced():
+    """A worker killed mid-file fails only that file; one that died between files is replaced."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        broken_path = _write_broken_pdf(tmp_dir)
+        extractor = IsolatedExtractor("pypdf2", page_timeout=30, file_timeout=60)
+        try:
+            assert extractor.extract_pages(broken_path) is None
+            process = extractor._process
+            threading.Timer(0.3, process.kill).start()
+            start_time = time.monotonic()
+            try:
+                extractor.extract_pages(_hanging_pdf(tmp_dir))
+                assert False, "expected ExtractionTimeout"
+            except ExtractionTimeout as e:
+                assert "died" in str(e) and time.monotonic() - start_time < 5
+            assert extractor.restart_count == 1
+            print("✓ worker crash mid-file reported for that file")
+
+            assert extractor.extract_pages(broken_path) is None
+            os.kill(extractor._process.pid, signal.SIGKILL)
+            time.sleep(0.1)
+            assert extractor.extract_pages(broken_path) is None  # replaced before the file is sent
+            assert extractor.restart_count == 2
+            print("✓ worker that died between files replaced")
+        finally:
+            extractor.close()
+
+
+def test_timed_out_file_is_quarantined():
+    """PDFProcessor quarantines a file that misses its deadline or kills its worker, and skips
+    it afterwards; a worker that cannot start fails the file without quarantining it."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = _write_broken_pdf(tmp_dir)
+        processor = PDFProcessor("sk-test")
+        processor.cache_dir = tmp_dir
+        extractor = processor.isolated_extractor
+
+        def fail_with(error):
+            def extract_pages(path):
+                raise error
+            return extract_pages
+
+        try:
+            extractor.extract_pages = fail_with(ExtractionWorkerError("failed to start"))
+            assert processor.extract_text_from_pdf(pdf_path) is None
+            assert not processor.is_quarantined(pdf_path)
+
+            extractor.extract_pages = fail_with(ExtractionTimeout("extraction worker died (exit code -9)"))
+            assert processor.extract_text_from_pdf(pdf_path) is None
+            assert processor.is_quarantined(pdf_path)
+            assert processor.get_quarantined_files()[0]["file"] == pdf_path
+            print("✓ timed-out PDF quarantined")
+
+            assert processor.clear_quarantine()
+            assert not processor.is_quarantined(pdf_path)
+            print("✓ quarantine cleared")
+        finally:
+            extractor.close()
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Isolated PDF Extraction")
+    print("=" * 50)
+    test_broken_pdf_returns_none()
+    test_missed_deadline_restarts_worker()
+    test_crashed_worker_is_replaced()
+    test_timed_out_file_is_quarantined()
+    print("\n🎉 All isolated extraction tests passed!")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test the shared HTTP connection pool used by the chat and embeddings clients
+"""
+import os
+import tempfile
+
+from fake_openai import FakeOpenAIServer
+from http_clients import get_http_client, close_http_client, warm_up
+from pdf_processor import PDFProcessor
+
+
+def test_shared_client_and_opt_out():
+    """Every caller gets the same client; HTTP_POOL=false leaves clients to their own connections."""
+    try:
+        assert get_http_client() is get_http_client()
+        os.environ["HTTP_POOL"] = "false"
+        assert get_http_client() is None
+    finally:
+        os.environ.pop("HTTP_POOL", None)
+        close_http_client()
+    print("✓ one shared client, disabled by HTTP_POOL=false")
+
+
+def test_warm_up_connection_is_reused():
+    """The warm-up opens the only connection; the embeddings calls reuse it."""
+    with FakeOpenAIServer(connect_latency_ms=20) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            assert warm_up("sk-fake", server.base_url)
+            processor = PDFProcessor("sk-fake", isolate_extraction=False, embedding_backend="openai",
+                                     openai_base_url=server.base_url, pdf_dir=os.path.join(tmp_dir, "pdfs"),
+                                     cache_dir=os.path.join(tmp_dir, "cache"))
+            processor.embeddings.embed_query("runway width")
+            processor.embeddings.embed_documents(["taxiway separation", "apron design"])
+            assert server.request_counts["models"] == 1
+            assert server.request_counts["embeddings"] == 2
+            assert server.request_counts["connections"] == 1, server.request_counts
+        finally:
+            close_http_client()
+    print("✓ warm-up connection reused by embeddings calls")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing HTTP Connection Pool")
+    print("=" * 50)
+    test_shared_client_and_opt_out()
+    test_warm_up_connection_is_reused()
+    print("\n🎉 All HTTP pool tests passed!")
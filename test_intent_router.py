@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test the intent router against the labelled test set
+"""
+from benchmark_intents import load_test_set, evaluate, legacy_route, DEFAULT_TEST_SET
+from intent_router import IntentRouter, CentroidIntentClassifier, GREETING, AVIATION, OFF_TOPIC
+
+
+def test_word_boundaries():
+    """Only a message that is a greeting as a whole gets the canned greeting."""
+    router = IntentRouter()
+    for greeting in ["hi", "Hello!", "Good morning, how are you?", "hey there"]:
+        assert router.route(greeting) == GREETING, greeting
+    for question in ["What is this requirement within the runway safety area?",
+                     "Hi, what is the required taxiway to taxiway separation?",
+                     "Hello, what does paragraph 305 say?",
+                     "hi, show AC 150/5300-13B section 3.2.1",
+                     "Hey, what is the RSA length for ADG IV?",
+                     "How are you supposed to measure the longitudinal slope?",
+                     "hierarchy of design standards", "what is his role"]:
+        assert router.route(question) == AVIATION, question
+    print("✓ word-boundary matching keeps real questions in domain")
+
+    # Without a classifier the baseline off-topic words still divert; with one, it decides
+    assert router.route("What is the travel time?") == OFF_TOPIC
+    assert IntentRouter(CentroidIntentClassifier()).route("What is the travel time?") == AVIATION
+    print("✓ ambiguous off-topic words left to the classifier when one is configured")
+
+
+def test_labelled_set_accuracy():
+    """Keywords divert aviation questions only through the ambiguous off-topic words, which
+    the classifier resolves."""
+    examples = load_test_set(DEFAULT_TEST_SET)
+    legacy = evaluate(legacy_route, examples, repeat=1)
+    compiled = evaluate(IntentRouter().route, examples, repeat=1)
+    centroid = evaluate(IntentRouter(CentroidIntentClassifier()).route, examples, repeat=1)
+
+    keywords = IntentRouter()
+    assert not [error for error in compiled["errors"] if error["expected"] == AVIATION
+                and not keywords.ambiguous_off_topic_pattern.search(error["text"])]
+    assert not [error for error in centroid["errors"] if error["expected"] == AVIATION]
+    assert compiled["accuracy"] > legacy["accuracy"]
+    assert centroid["accuracy"] >= compiled["accuracy"]
+    print(f"✓ accuracy: substring {legacy['accuracy']:.1%}, compiled {compiled['accuracy']:.1%}, "
+          f"compiled + centroid {centroid['accuracy']:.1%}")
+
+
+def test_routing_is_fast():
+    """Keyword routing takes microseconds; the bound only catches a pathological pattern,
+    not timing noise on a loaded machine."""
+    result = evaluate(IntentRouter().route, load_test_set(DEFAULT_TEST_SET), repeat=20)
+    assert result["p50_us"] < 10000, result["p50_us"]
+    print(f"✓ compiled router p50 {result['p50_us']}us")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Intent Router")
+    print("=" * 50)
+    test_word_boundaries()
+    test_labelled_set_accuracy()
+    test_routing_is_fast()
+    print("\n🎉 All intent router tests passed!")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test the offline hashing embedding backend
+"""
+import tempfile
+import numpy as np
+from local_embeddings import HashingEmbeddings
+
+
+def test_embeddings_are_deterministic_and_normalized():
+    """The same text always maps to the same unit vector."""
+    embeddings = HashingEmbeddings(n_features=512)
+    first = np.array(embeddings.embed_query("Runway safety area width for ADG III"))
+    second = np.array(embeddings.embed_documents(["Runway safety area width for ADG III"])[0])
+    assert first.shape == (512,)
+    assert np.allclose(first, second)
+    assert abs(np.linalg.norm(first) - 1.0) < 1e-5
+    print("✓ hashing embeddings are deterministic and unit length")
+
+
+def test_related_texts_score_higher():
+    """Texts sharing words are closer than unrelated texts."""
+    embeddings = HashingEmbeddings(n_features=2048)
+    query = np.array(embeddings.embed_query("taxiway separation distance"))
+    related = np.array(embeddings.embed_query("minimum taxiway to taxiway separation distance"))
+    unrelated = np.array(embeddings.embed_query("terminal building heating system"))
+    assert query @ related > query @ unrelated
+    print("✓ related texts are more similar than unrelated texts")
+
+
+def test_svd_projection_round_trip():
+    """A fitted projection reduces dimensions and survives save and load."""
+    texts = [f"runway {i} taxiway {i * 7} apron {i * 13} approach lighting" for i in range(40)]
+    fitted = HashingEmbeddings(n_features=1024, n_components=8).fit(texts)
+    assert fitted.projection.shape == (8, 1024)
+    assert fitted.backend_id == "local-h1024-svd8"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fitted.save_projection(tmp_dir)
+        loaded = HashingEmbeddings(n_features=1024, n_components=8).load_projection(tmp_dir)
+        assert np.allclose(fitted.embed_query(texts[3]), loaded.embed_query(texts[3]))
+    print("✓ SVD projection fitted, saved and reloaded")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Local Embeddings")
+    print("=" * 50)
+    test_embeddings_are_deterministic_and_normalized()
+    test_related_texts_score_higher()
+    test_svd_projection_round_trip()
+    print("\n🎉 All local embedding tests passed!")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test that query traces keep timings but not questions, and that the endpoint stays local
+"""
+import json
+from urllib.request import urlopen
+from metrics import MetricsRegistry, serve_metrics
+
+
+def test_traces_are_private():
+    registry = MetricsRegistry()
+    for session_id in ("alice", "bob", "alice"):
+        with registry.trace(session_id) as trace, registry.span("completion"):
+            trace["route"] = "retrieval"
+    traces = registry.recent_traces()
+    assert len(traces) == 3 and "completion" in traces[0]["stages"]
+    assert all("question" not in trace and "session_id" not in trace for trace in traces)
+    assert len(registry.recent_traces("alice")) == 2 and registry.recent_traces("carol") == []
+    assert "alice" not in registry.to_json()
+    print("✓ traces hold no question text and are filtered by session")
+
+
+def test_endpoint_binds_localhost():
+    registry = MetricsRegistry()
+    registry.increment("llm_calls")
+    httpd = serve_metrics(0, registry=registry)
+    try:
+        host, port = httpd.server_address
+        assert host == "127.0.0.1"
+        with urlopen(f"http://127.0.0.1:{port}/metrics.json") as response:
+            assert json.loads(response.read())["counters"] == {"llm_calls": 1}
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    print("✓ metrics endpoint listens on localhost by default")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Metrics")
+    print("=" * 50)
+    test_traces_are_private()
+    test_endpoint_binds_localhost()
+    print("\n🎉 All metrics tests passed!")
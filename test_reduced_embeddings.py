@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test reduced-dimension embeddings: PCA projection, native dimensions and the recall report
+"""
+import os
+import tempfile
+import numpy as np
+from benchmark_dimensions import recall_at_k
+from fake_openai import FakeOpenAIServer
+from local_embeddings import HashingEmbeddings
+from pdf_processor import PDFProcessor
+from reduced_embeddings import PCAEmbeddings, fit_projection
+from retrieval import VectorStoreSearchRetriever, search_options
+from token_accounting import LEDGER
+
+TEXTS = [f"Runway {i} width is {100 + i} feet and the safety area extends {i * 10} feet beyond the end."
+         for i in range(30)] + [f"Taxiway {i} edge lights are blue with spacing of {i} feet." for i in range(30)]
+
+
+def test_projection_keeps_similarities():
+    vectors = np.asarray(HashingEmbeddings(n_features=512).embed_documents(TEXTS[:20]), dtype=np.float32)
+    projection = fit_projection(vectors, 64)
+    assert projection.shape == (20, 512)  # at most one component per vector
+    reduced = vectors @ projection.T
+    assert np.allclose(reduced @ reduced.T, vectors @ vectors.T, atol=1e-4)
+    embeddings = PCAEmbeddings(HashingEmbeddings(n_features=512), fit_projection(vectors, 8))
+    assert len(embeddings.embed_query("runway width")) == 8
+    assert abs(np.linalg.norm(embeddings.embed_documents(TEXTS[:1])[0]) - 1.0) < 1e-5
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        embeddings.save_projection(tmp_dir)
+        assert np.array_equal(PCAEmbeddings.load(embeddings.base, tmp_dir).projection, embeddings.projection)
+    print("✓ projection keeps dot products within its span and round-trips")
+
+
+def test_recall_at_k():
+    assert recall_at_k([[1, 2, 3, 4], [5, 6, 7, 8]], [[4, 3, 2, 1], [5, 6, 0, 9]], 4) == 0.75
+    print("✓ recall@k is the overlap with the baseline top k")
+
+
+def test_processor_builds_and_reloads_reduced_index():
+    with FakeOpenAIServer(dimensions=256) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        def processor(**kwargs):
+            return PDFProcessor("sk-fake", isolate_extraction=False, embedding_backend="openai",
+                                openai_base_url=server.base_url, pdf_dir=os.path.join(tmp_dir, "pdfs"),
+                                cache_dir=os.path.join(tmp_dir, "cache"), **kwargs)
+
+        pca = processor(embedding_dimensions=16)
+        store = pca._build_vector_store(TEXTS, [{"source": "ac.pdf"}] * len(TEXTS))
+        assert store.index.d == 16 and isinstance(store.embedding_function, PCAEmbeddings)
+        cache_key = pca._get_cache_key("directory", "abc")
+        assert cache_key == "directory_abc_openai-pca16"
+        assert pca._save_vector_store_to_cache(store, cache_key)
+        embeddings_calls = server.request_counts["embeddings"]
+        reloaded = processor(embedding_dimensions=16)._load_vector_store_from_cache(cache_key)
+        assert reloaded.index.d == 16
+        assert "Runway 7 " in reloaded.similarity_search("Runway 7 width", k=1)[0].page_content
+        assert server.request_counts["embeddings"] == embeddings_calls + 1  # the query only
+
+        native = processor(embedding_dimensions=32, embedding_reduction="native")
+        assert native._get_cache_key("directory", "abc") == "directory_abc_openai-native32"
+        assert native._build_vector_store(TEXTS[:5]).index.d == 32
+        assert processor()._get_cache_key("directory", "abc") == "directory_abc"
+    print("✓ reduced indexes built, tagged in the cache key and reloaded")
+
+
+def test_query_billing_follows_the_wrapped_client():
+    from langchain_community.vectorstores import FAISS
+    with FakeOpenAIServer() as server:
+        openai = PDFProcessor("sk-fake", isolate_extraction=False, embedding_backend="openai",
+                              openai_base_url=server.base_url).embeddings
+        for base, billed in ((HashingEmbeddings(n_features=512), False), (openai, True)):
+            embeddings = PCAEmbeddings(base, fit_projection(np.asarray(base.embed_documents(TEXTS)), 16))
+            assert embeddings.is_local != billed
+            retriever = VectorStoreSearchRetriever(vector_store=FAISS.from_texts(TEXTS, embeddings), k=2)
+            scope = f"query:pca-{billed}"
+            with search_options(usage_scopes=[scope]):
+                retriever.invoke("Runway 7 width")
+            assert (LEDGER.get_usage(scope)["embedding_tokens"] > 0) == billed
+    print("✓ query embeddings billed unless the wrapped client is local")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Reduced Embeddings")
+    print("=" * 50)
+    test_projection_keeps_similarities()
+    test_recall_at_k()
+    test_processor_builds_and_reloads_reduced_index()
+    test_query_billing_follows_the_wrapped_client()
+    print("\n🎉 All reduced embedding tests passed!")
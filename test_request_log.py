@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test request capture and the load-replay harness
+"""
+import os
+import json
+import time
+import tempfile
+from admission import AdmissionController
+from agent import AviationAgent
+from benchmark_replay import arrival_offsets, replay
+from request_log import RequestLog, load_requests
+
+
+class SlowChain:
+    def invoke(self, inputs, config=None):
+        time.sleep(0.1)
+        return {"answer": "ok", "source_documents": []}
+
+
+class FailingChain:
+    def invoke(self, inputs, config=None):
+        raise RuntimeError("API down")
+
+
+def _agent(chain):
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.qa_chain = chain
+    return agent
+
+
+def test_capture():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "request_log.jsonl")
+        os.environ["REQUEST_LOG"] = path
+        try:
+            agent = _agent(SlowChain())
+        finally:
+            del os.environ["REQUEST_LOG"]
+        agent.ask_question("What is the runway width?", session_id="alice")
+        agent.ask_question("Hello")
+        agent.qa_chain = FailingChain()
+        agent.ask_question("What is the taxiway width?")
+        long_question = "What is the runway safety area length " + "for aircraft design group IV " * 20 + "?"
+        agent.qa_chain = SlowChain()
+        agent.ask_question(long_question)
+        with open(path, 'r') as f:
+            entries = [json.loads(line) for line in f]
+        assert [entry["route"] for entry in entries] == ["retrieval", "greeting", "retrieval", "retrieval"]
+        assert entries[0]["session_id"] == "alice" and entries[1]["session_id"] == "default"
+        assert entries[0]["total_seconds"] >= 0.1 and "admission_wait" not in entries[0]["stages"]
+        assert entries[2]["error"] == "question_error" and "error" not in entries[0]
+        assert [entry["question"] for entry in load_requests(path)][0] == "What is the runway width?"
+        assert entries[3]["question"] == long_question  # logged whole, not the trace's shortened copy
+    assert _agent(SlowChain()).request_log is None
+    print("✓ questions captured with route, timings and errors")
+
+
+def test_load_requests_and_arrivals():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "log.jsonl")
+        with open(path, 'w') as f:
+            f.write('{"question": "b", "time": 105.0}\n{"question": "a", "time": 100.0}\n\n')
+        requests = load_requests(path)
+        assert [request["question"] for request in requests] == ["a", "b"]
+        assert arrival_offsets(requests, speed=5.0) == [0.0, 1.0]
+        with open(path, 'w') as f:
+            f.write("What is the runway width?\nWhat is the RSA?\n")
+        assert [request["time"] for request in load_requests(path)] == [0.0, 1.0]
+    offsets = arrival_offsets([{}] * 1000, rate=50.0, seed=1)
+    assert offsets[0] == 0.0 and 15 < offsets[-1] < 25  # mean gap 1/50 s
+    print("✓ logged timing and Poisson arrivals scheduled")
+
+
+def test_replay_reports_queueing():
+    """Four simultaneous questions through one admission slot: three wait, about 0.1 s apart."""
+    agent = _agent(SlowChain())
+    agent.admission = AdmissionController(max_concurrent=1, queue_size=8, queue_timeout=5)
+    requests = [{"question": f"What is the width of runway {i}?", "time": 0.0} for i in range(4)]
+    result = replay(agent, requests, concurrency=4, offsets=[0.0] * 4, sessions=4)
+    assert result["answered"] == 4 and result["busy"] == 0 and result["routes"] == {"retrieval": 4}
+    assert result["queueing_delay"]["max_ms"] >= 250
+    assert result["latency"]["max_ms"] >= 400 and result["throughput_per_second"] > 0
+
+    serial = replay(agent, requests, concurrency=1, offsets=[0.0] * 4)
+    assert serial["queueing_delay"]["max_ms"] >= 250  # now waiting for the one client thread
+    print("✓ replay reports throughput, queueing delay and tail latency")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Request Log and Replay")
+    print("=" * 50)
+    test_capture()
+    test_load_requests_and_arrivals()
+    test_replay_reports_queueing()
+    print("\n🎉 All request log and replay tests passed!")
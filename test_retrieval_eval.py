@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the retrieval evaluation harness: passage matching, recall/MRR scoring and the TSV results
+"""
+import os
+import json
+import tempfile
+from benchmark_retrieval import (TSV_COLUMNS, append_tsv, contains_passage, load_golden_set, run_sweep,
+                                 score, shingles)
+from local_embeddings import HashingEmbeddings
+
+TEXTS = {
+    "runways.pdf": " ".join(f"Runway {i} has a width of {100 + i} feet and a safety area of {i * 10} feet."
+                            for i in range(40)),
+    "lighting.pdf": " ".join(f"Taxiway {i} edge lights are blue and spaced {i} feet apart."
+                             for i in range(40)),
+}
+
+
+def test_passage_matching():
+    passage = shingles("Runway 7 has a width of 107 feet and a safety area of 70 feet.")
+    assert contains_passage(shingles(TEXTS["runways.pdf"]), passage)
+    assert contains_passage(shingles("a width of 107 feet and a safety"), passage)  # chunk cut from the passage
+    assert not contains_passage(shingles(TEXTS["lighting.pdf"]), passage)
+    assert shingles("Runway width") == {"runway width"} and shingles("") == set()
+    print("✓ chunks matched to golden passages by shared word sequences")
+
+
+def test_score():
+    relevant = [[{3}], [{0}, {5}], [{9}]]
+    ranked = [[1, 3, 2], [0, 4, 5], [1, 2, 3]]
+    assert score(ranked, relevant, 2) == {"recall": round(1.5 / 3, 4), "mrr": round(1.5 / 3, 4)}
+    assert score(ranked, relevant, 3)["recall"] == round(2 / 3, 4)
+    print("✓ recall@k and MRR scored")
+
+
+def test_sweep_and_tsv():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        golden_path = os.path.join(tmp_dir, "golden.jsonl")
+        with open(golden_path, 'w') as f:
+            f.write(json.dumps({"question": "What is the width of runway 12?",
+                                "passage": "Runway 12 has a width of 112 feet", "source": "runways.pdf"}) + "\n\n")
+            f.write(json.dumps({"question": "How far apart are taxiway 30 edge lights?",
+                                "passages": ["Taxiway 30 edge lights are blue and spaced 30 feet apart"]}) + "\n")
+        golden = load_golden_set(golden_path)
+        assert golden[0]["passages"] == ["Runway 12 has a width of 112 feet"] and golden[1]["source"] is None
+
+        rows = run_sweep(TEXTS, golden, HashingEmbeddings(n_features=512), [200, 400], [0, 50, 400],
+                         ["flat", "hnsw", "ivf"], [1, 4])
+        assert len(rows) == 4 * 3 * 2  # overlaps not below the chunk size are skipped
+        assert {(row["chunk_size"], row["chunk_overlap"]) for row in rows} == {(200, 0), (200, 50), (400, 0), (400, 50)}
+        for row in rows:
+            assert 0.0 <= row["mrr"] <= row["recall"] <= 1.0 and row["index_mb"] > 0 and row["query_p50_ms"] >= 0
+        flat = {(row["chunk_size"], row["chunk_overlap"], row["k"]): row for row in rows if row["index"] == "flat"}
+        assert flat[(200, 0, 4)]["recall"] >= flat[(200, 0, 1)]["recall"]
+
+        output = os.path.join(tmp_dir, "results.tsv")
+        append_tsv(output, rows[:2])
+        append_tsv(output, rows[2:3])
+        with open(output, 'r') as f:
+            lines = f.read().splitlines()
+        assert lines[0].split("\t") == TSV_COLUMNS and len(lines) == 4
+        assert lines[1].split("\t")[TSV_COLUMNS.index("index")] == rows[0]["index"]
+    print("✓ sweep scored every chunking, index and k, and appended to the TSV")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Retrieval Evaluation")
+    print("=" * 50)
+    test_passage_matching()
+    test_score()
+    test_sweep_and_tsv()
+    print("\n🎉 All retrieval evaluation tests passed!")
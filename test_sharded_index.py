@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test the sharded index: round-robin partitioning, scatter-gather search across worker processes,
+concurrent searches, worker restarts and document routing within the shards
+"""
+import os
+import time
+import gc
+import weakref
+import signal
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from local_embeddings import HashingEmbeddings
+from document_router import DocumentRouter
+from retrieval import VectorStoreSearchRetriever
+from sharded_index import ShardedIndex, partition, shard_vector_store
+
+TEXTS = ["Runway width for design group III is 150 feet.",
+         "Holding position markings are painted yellow.",
+         "Taxiway edge lights are blue.",
+         "Approach lighting systems guide pilots to the threshold.",
+         "Runway safety area length beyond the runway end.",
+         "Taxiway centerline markings are yellow lines.",
+         "Apron design accommodates the critical aircraft."]
+
+
+def test_partition_is_balanced():
+    """Every position lands in exactly one shard and shard sizes differ by at most one."""
+    shards = partition(10, 3)
+    assert sorted(np.concatenate(shards).tolist()) == list(range(10))
+    assert [len(shard) for shard in shards] == [4, 3, 3]
+    print("✓ positions partitioned round-robin")
+
+
+def test_merged_results_match_exact_search():
+    """The merged per-shard top-k equals an exact search over all vectors."""
+    import faiss
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 32)).astype(np.float32)
+    queries = rng.standard_normal((5, 32)).astype(np.float32)
+    index = faiss.IndexFlatL2(32)
+    index.add(vectors)
+    with tempfile.TemporaryDirectory() as directory:
+        sharded_index = ShardedIndex.build(vectors, 4, directory)
+        try:
+            assert sharded_index.size == 500
+            for query in queries:
+                _, expected = index.search(query.reshape(1, -1), 5)
+                hits = sharded_index.search(query, 5)
+                assert [position for _, position in hits] == expected[0].tolist()
+                assert [distance for distance, _ in hits] == sorted(distance for distance, _ in hits)
+        finally:
+            sharded_index.close()
+    print("✓ merged shard results match exact search")
+
+
+def test_concurrent_searches_and_restarts():
+    """Searches from several threads get their own replies, and a killed or hung worker is
+    restarted without leaving stale replies behind."""
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    queries = rng.standard_normal((20, 16)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as directory:
+        sharded_index = ShardedIndex.build(vectors, 3, directory)
+        try:
+            expected = [sharded_index.search(query, 5) for query in queries]
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                assert list(pool.map(lambda query: sharded_index.search(query, 5), queries)) == expected
+            print("✓ concurrent searches get their own replies")
+
+            os.kill(sharded_index._workers[1].process.pid, signal.SIGKILL)
+            assert sharded_index.search(queries[0], 5) == expected[0]
+            assert sharded_index.restart_count == 1
+            print("✓ killed worker restarted and the search retried")
+
+            sharded_index.search_timeout = 0.5
+            os.kill(sharded_index._workers[2].process.pid, signal.SIGSTOP)  # killed when restarted
+            assert sharded_index.search(queries[1], 5) == expected[1]
+            assert sharded_index.restart_count == 2
+            assert [sharded_index.search(query, 5) for query in queries[2:5]] == expected[2:5]
+            print("✓ hung worker restarted; later searches are not answered with stale replies")
+        finally:
+            sharded_index.close()
+    try:
+        sharded_index.search(queries[0], 5)
+        assert False, "expected RuntimeError"
+    except RuntimeError as e:
+        assert "closed" in str(e)
+
+
+def test_startup_timeout_and_exit_handlers():
+    """A worker stuck loading its shard is killed at the startup timeout, and a closed index
+    is no longer kept alive by its exit handler."""
+    with tempfile.TemporaryDirectory() as directory:
+        shard_path = os.path.join(directory, "shard_000")
+        os.mkfifo(shard_path + ".faiss")  # no writer: reading the index blocks, like a hung load
+        start_time = time.monotonic()
+        try:
+            ShardedIndex([shard_path], startup_timeout=0.5).start()
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert "failed to start" in str(e) and time.monotonic() - start_time < 5
+        print("✓ hung worker startup times out")
+
+        vectors = np.random.default_rng(2).standard_normal((20, 8)).astype(np.float32)
+        sharded_index = ShardedIndex.build(vectors, 2, os.path.join(directory, "shards"))
+        reference = weakref.ref(sharded_index)
+        sharded_index.close()
+        del sharded_index
+        gc.collect()
+        assert reference() is None  # the exit handler no longer holds it
+    print("✓ closed indexes unregister their exit handlers")
+
+
+def test_sharded_vector_store():
+    """A sharded FAISS store returns the same documents as the original, reuses its shard files,
+    keeps no vectors in this process and routes to documents within the shards."""
+    embeddings = HashingEmbeddings(n_features=1024)
+    metadatas = [{"source": "lighting.pdf" if "light" in text else "design.pdf"} for text in TEXTS]
+    query_vector = embeddings.embed_query("blue taxiway edge lights")
+    reference = FAISS.from_texts(TEXTS, embeddings, metadatas=metadatas)
+    expected = [document.page_content for document, _ in reference.similarity_search_with_score_by_vector(query_vector, k=3)]
+    routed = DocumentRouter.from_vector_store(reference).search(query_vector, ["design.pdf"], 2)
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(2):
+            store = FAISS.from_texts(TEXTS, embeddings, metadatas=metadatas)
+            sharded_store = shard_vector_store(store, 3, directory)
+            try:
+                results = sharded_store.similarity_search_with_score_by_vector(query_vector, k=3)
+                assert [document.page_content for document, _ in results] == expected
+                assert sharded_store.docstore is store.docstore
+                assert store.index.ntotal == 0
+                assert sharded_store.sharded_index.size == len(TEXTS)
+
+                router = DocumentRouter.from_vector_store(sharded_store)
+                assert router is sharded_store.document_router and router.indexes == {}
+                assert [(d.page_content, s) for d, s in router.search(query_vector, ["design.pdf"], 2)] == \
+                    [(d.page_content, s) for d, s in routed]
+                retriever = VectorStoreSearchRetriever(vector_store=sharded_store, router=router, k=2, route_documents=1)
+                sources = {document.metadata["source"] for document in retriever.invoke("blue taxiway edge lights")}
+                assert sources == {"lighting.pdf"}
+            finally:
+                sharded_store.close()
+            assert sharded_store.closed
+    print("✓ sharded store matches the in-process store and routes within the shards")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Sharded Index")
+    print("=" * 50)
+    test_partition_is_balanced()
+    test_merged_results_match_exact_search()
+    test_concurrent_searches_and_restarts()
+    test_startup_timeout_and_exit_handlers()
+    test_sharded_vector_store()
+    print("\n🎉 All sharded index tests passed!")
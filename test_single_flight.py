@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test single-flight coalescing of concurrent identical questions
+"""
+import time
+import threading
+from agent import AviationAgent
+from single_flight import SingleFlight
+
+
+def _run_concurrently(fn, args_list):
+    results = [None] * len(args_list)
+
+    def worker(i, args):
+        results[i] = fn(*args)
+
+    threads = [threading.Thread(target=worker, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_result():
+    """Callers with the same key while a call is in flight share its result; later calls run again."""
+    flight = SingleFlight()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    results = _run_concurrently(flight.do, [("runway", slow_call)] * 5)
+    assert [result for result, _ in results] == ["answer"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert len(calls) == 1 and flight.saved_calls == 4 and flight.in_flight() == 0
+    flight.do("runway", slow_call)
+    assert len(calls) == 2
+    print("✓ five concurrent calls ran once; results are not cached afterwards")
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    def failing_call():
+        time.sleep(0.1)
+        raise RuntimeError("API down")
+
+    def call():
+        try:
+            flight.do("key", failing_call)
+        except RuntimeError as e:
+            return str(e)
+
+    assert _run_concurrently(call, [()] * 3) == ["API down"] * 3
+    print("✓ the leader's error is raised in every waiting caller")
+
+
+class FakeChain:
+    """Stands in for the retrieval chain, counting runs."""
+
+    def __init__(self):
+        self.questions = []
+
+    def invoke(self, inputs, config=None):
+        self.questions.append(inputs["question"])
+        time.sleep(0.2)
+        return {"answer": f"Answer to {inputs['question']}", "source_documents": []}
+
+
+def test_agent_coalesces_identical_questions():
+    """Identical normalized questions share one chain run; different ones do not."""
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.qa_chain = FakeChain()
+    questions = ["What is the runway width?", "  what is the RUNWAY width ", "What is the runway width?",
+                 "What is the taxiway width?"]
+    results = _run_concurrently(agent.ask_question, [(question,) for question in questions])
+    assert len(agent.qa_chain.questions) == 2, agent.qa_chain.questions
+    assert sum(1 for result in results if result.get("coalesced")) == 2
+    assert results[0]["answer"] == results[1]["answer"] == results[2]["answer"]
+    assert agent.single_flight.saved_calls == 2
+    print("✓ three identical questions answered by one chain run")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Single-Flight Coalescing")
+    print("=" * 50)
+    test_concurrent_calls_share_one_result()
+    test_errors_reach_every_caller()
+    test_agent_coalesces_identical_questions()
+    print("\n🎉 All single-flight tests passed!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the hierarchical summary index and the routing of broad questions to it
+"""
+import tempfile
+from langchain_community.vectorstores import FAISS
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from agent import AviationAgent
+from document_router import DocumentRouter
+from local_embeddings import HashingEmbeddings
+from summary_index import SummaryIndex, is_broad_question
+
+RUNWAY_TEXT = ("Runway width for airplane design group III is 150 feet. The runway safety area extends beyond "
+               "the runway end. Runway shoulders protect the edges from jet blast erosion. ")
+LIGHTING_TEXT = ("Approach lighting systems guide pilots to the runway threshold. Taxiway edge lights are blue "
+                 "and mark the taxiway edges at night. Lighting intensity is controlled from the tower cab. ")
+
+
+def _build_store():
+    texts = [RUNWAY_TEXT * 2] * 10 + [LIGHTING_TEXT * 2] * 3
+    metadatas = [{"source": "runways.pdf"}] * 10 + [{"source": "lighting.pdf"}] * 3
+    return FAISS.from_texts(texts, HashingEmbeddings(n_features=512), metadatas=metadatas)
+
+
+def test_tree_and_cache_round_trip():
+    """Each document gets a summary built from its chunk groups, which survives a save."""
+    store = _build_store()
+    summary_index = SummaryIndex.build(store, section_chunks=4)
+    assert summary_index.sources == ["lighting.pdf", "runways.pdf"]
+    runways = summary_index.documents["runways.pdf"]
+    assert runways["chunks"] == 10 and "sections" not in runways
+    assert "150 feet" in runways["summary"]
+    assert "blue" in summary_index.documents["lighting.pdf"]["summary"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        summary_index.save(tmp_dir)
+        assert SummaryIndex.load(tmp_dir).documents == summary_index.documents
+        assert SummaryIndex.load(tmp_dir + "/missing") is None
+    print("✓ document summaries built and cached")
+
+
+def test_broad_question_detection():
+    for question in ["What is this document about?", "Summarize these documents", "Summarize this",
+                     "Give me an overview", "What are the main topics of these documents?",
+                     "What does this document cover?", "Can you give me a summary of the PDFs?"]:
+        assert is_broad_question(question), question
+    for question in ["What is the runway width?", "What does the document say about taxiway lights?",
+                     "Summarize the runway safety area requirements for ADG IV",
+                     "What are the key points for taxiway edge lighting spacing?",
+                     "What does the summary table say about RSA length?",
+                     "Give me an overview of runway lighting"]:
+        assert not is_broad_question(question), question
+    print("✓ broad questions recognised")
+
+
+class FakeChain:
+    def __init__(self):
+        self.questions = []
+
+    def invoke(self, inputs, config=None):
+        self.questions.append(inputs["question"])
+        return {"answer": "from chunks", "source_documents": []}
+
+
+def test_agent_answers_broad_questions_from_summaries():
+    """Broad questions get one small completion over the summaries; detailed ones still use the chunks."""
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.vector_store = _build_store()
+    agent.vector_store.summary_index = SummaryIndex.build(agent.vector_store)
+    agent.router = DocumentRouter.from_vector_store(agent.vector_store)
+    agent.qa_chain = FakeChain()
+    agent.llm = FakeListChatModel(responses=["An overview of runways and lighting."] * 2)
+
+    result = agent.ask_question("What is this document about?")
+    assert result["level"] == "summary" and result["answer"] == "An overview of runways and lighting."
+    assert [document.metadata["source"] for document in result["source_documents"]] == ["lighting.pdf", "runways.pdf"]
+    result = agent.ask_question("Summarize this", documents=["lighting.pdf"])
+    assert [document.metadata["source"] for document in result["source_documents"]] == ["lighting.pdf"]
+    assert agent.qa_chain.questions == []
+
+    assert agent.ask_question("What is the runway width?")["answer"] == "from chunks"
+    assert agent.ask_question("Summarize the runway safety area requirements for ADG IV")["answer"] == "from chunks"
+    print("✓ broad questions answered from summaries, detailed ones from chunks")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Summary Index")
+    print("=" * 50)
+    test_tree_and_cache_round_trip()
+    test_broad_question_detection()
+    test_agent_answers_broad_questions_from_summaries()
+    print("\n🎉 All summary index tests passed!")
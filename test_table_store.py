@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test standards-table extraction and direct table answers
+"""
+import tempfile
+from agent import AviationAgent
+from table_store import TableStore, extract_tables
+
+PAGE_TEXT = """AC 150/5300-13B Airport Design - Page 2
+Table 3-2. Runway design standards matrix
+Item ADG I ADG II ADG III ADG IV
+Runway width 60 ft 75 ft 100 ft 150 ft
+RSA width 120 ft 150 ft 500 ft 500 ft
+Runway shoulder width 10 ft 10 ft 20 ft 25 ft
+301. Section heading number 1
+The runway width depends on the airplane design group."""
+
+
+def test_extract_captioned_table():
+    tables = extract_tables(PAGE_TEXT, "ac.pdf")
+    assert len(tables) == 1
+    table = tables[0]
+    assert (table["table"], table["title"]) == ("3-2", "Runway design standards matrix")
+    assert table["columns"] == ["ADG I", "ADG II", "ADG III", "ADG IV"]
+    assert [row["label"] for row in table["rows"]] == ["Runway width", "RSA width", "Runway shoulder width"]
+    assert table["rows"][1]["values"] == ["120 ft", "150 ft", "500 ft", "500 ft"]
+    print("✓ caption, header and rows extracted")
+
+
+def test_lookup():
+    store = TableStore(extract_tables(PAGE_TEXT, "ac.pdf"))
+    result = store.lookup("What is the runway width for airplane design group III?")
+    assert result["row"]["label"] == "Runway width" and result["column"] == 2
+    assert "**100 ft**" in TableStore.format_answer(result) and "Table 3-2" in TableStore.format_answer(result)
+    assert store.lookup("runway safety area width for ADG IV")["row"]["values"][3] == "500 ft"
+    assert store.lookup("What is the shoulder width of the runway?")["row"]["label"] == "Runway shoulder width"
+    assert store.lookup("What is the runway width?")["column"] is None
+    assert store.lookup("Why is the runway width 100 ft for ADG III?") is None
+    assert store.lookup("What is the taxiway separation?") is None
+    assert store.lookup("Tell me the required RSA width for ADG II")["column"] == 1
+    for question in ["How is runway width measured?", "Does the runway width include the shoulders?",
+                     "Can the runway width be reduced for a displaced threshold?",
+                     "Can the runway width be reduced for ADG IV?", "What is the runway width for ADG V?"]:
+        assert store.lookup(question) is None, question
+    print("✓ rows and columns matched, other questions about a row left to the LLM")
+
+
+def test_conflicting_tables_are_not_answered():
+    other = PAGE_TEXT.replace("100 ft", "90 ft")
+    store = TableStore(extract_tables(PAGE_TEXT, "a.pdf") + extract_tables(other, "b.pdf"))
+    assert store.lookup("runway width for ADG III") is None
+    assert store.lookup("runway width for ADG III", sources=["b.pdf"])["row"]["values"][2] == "90 ft"
+    assert len(store.lookup("RSA width for ADG II")["tables"]) == 2  # agreeing tables are both cited
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store.save(tmp_dir)
+        assert TableStore.load(tmp_dir).tables == store.tables
+    print("✓ disagreeing tables fall back to the LLM")
+
+
+class FailingChain:
+    def invoke(self, inputs, config=None):
+        raise AssertionError("table questions must not reach the LLM")
+
+
+def test_agent_answers_from_table():
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.vector_store = type("Store", (), {"table_store": TableStore(extract_tables(PAGE_TEXT, "ac.pdf"))})()
+    agent.qa_chain = FailingChain()
+    result = agent.ask_question("What is the RSA width for ADG II?")
+    assert result["level"] == "table" and "**150 ft**" in result["answer"]
+    assert result["source_documents"][0].metadata == {"source": "ac.pdf", "table": "3-2", "level": "table"}
+    print("✓ agent answered from the table without an LLM call")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Table Store")
+    print("=" * 50)
+    test_extract_captioned_table()
+    test_lookup()
+    test_conflicting_tables_are_not_answered()
+    test_agent_answers_from_table()
+    print("\n🎉 All table store tests passed!")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test token accounting: scope limits per type and per-session budget trimming
+"""
+from agent import AviationAgent
+from token_accounting import TokenLedger, TokenBudget
+
+
+class EchoChain:
+    def __init__(self):
+        self.histories = []
+
+    def invoke(self, inputs, config=None):
+        self.histories.append(len(inputs["chat_history"]))
+        return {"answer": "The width is 150 feet. " * 20, "source_documents": []}
+
+
+def test_queries_do_not_evict_sessions():
+    ledger = TokenLedger(max_scopes=10, max_sessions=100)
+    ledger.record(["session:alice", "query:0"], "gpt-4o-mini", prompt_tokens=100)
+    for i in range(1, 50):
+        ledger.record([f"query:{i}"], "gpt-4o-mini", prompt_tokens=10)
+    assert ledger.get_usage("session:alice")["prompt_tokens"] == 100
+    assert ledger.get_usage("query:0")["prompt_tokens"] == 0  # only the last 10 queries are kept
+    assert ledger.get_usage("query:49")["prompt_tokens"] == 10
+    assert ledger.get_totals()["prompt_tokens"] == 100 + 49 * 10
+    print("✓ per-query scopes are evicted without touching session totals")
+
+
+def test_budget_trims_only_the_asking_session():
+    agent = AviationAgent("sk-fake", pdf_processor=object())
+    agent.qa_chain = chain = EchoChain()
+    for question in ("What is the runway width?", "What is the taxiway width?"):
+        agent.ask_question(question, session_id="alice")
+        agent.ask_question(question, session_id="bob")
+    assert chain.histories == [0, 0, 2, 2]  # each session sees only its own turns
+    assert len(agent.get_chat_history("alice")) == 4 and agent.get_chat_history() == []
+
+    agent.token_budget = TokenBudget(query_tokens=agent._estimate_query_tokens("What is the RSA?", 4, []) + 1)
+    result = agent.ask_question("What is the RSA?", session_id="alice")
+    assert result["budget_action"] == "downgraded" and chain.histories[-1] == 0
+    assert len(agent.get_chat_history("alice")) == 2  # trimmed, then this turn added
+    assert len(agent.get_chat_history("bob")) == 4
+    agent.clear_chat_history()
+    assert agent.get_chat_history("bob") == []
+    print("✓ budget trimming drops the asking session's history only")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Token Accounting")
+    print("=" * 50)
+    test_queries_do_not_evict_sessions()
+    test_budget_trims_only_the_asking_session()
+    print("\n🎉 All token accounting tests passed!")
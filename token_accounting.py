@@ -0,0 +1,135 @@
+##This is the file where token usage and cost are accounted for.
+# Usage is aggregated per query, per session and per ingestion run, and checked against budgets.
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+# USD per million tokens: (input, output)
+TOKEN_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "text-embedding-ada-002": (0.10, 0.0),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+DEFAULT_CHAT_MODEL = "gpt-4o-mini"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+_encoding = None
+_encoding_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens with tiktoken when its encoding is available, else about four characters per token."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int = 0) -> float:
+    """Estimate the USD cost of a call; unknown models are priced at zero."""
+    input_price, output_price = TOKEN_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _empty_usage() -> Dict[str, Any]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "embedding_tokens": 0, "cost_usd": 0.0}
+
+
+class TokenBudget:
+    """Hard token limits per query, per session and per ingestion run (0 means unlimited)."""
+
+    def __init__(self, query_tokens: int = 0, session_tokens: int = 0, ingestion_tokens: int = 0):
+        self.query_tokens = query_tokens
+        self.session_tokens = session_tokens
+        self.ingestion_tokens = ingestion_tokens
+
+    @classmethod
+    def from_env(cls) -> "TokenBudget":
+        """Read TOKEN_BUDGET_QUERY, TOKEN_BUDGET_SESSION and TOKEN_BUDGET_INGESTION."""
+        return cls(
+            query_tokens=int(os.getenv("TOKEN_BUDGET_QUERY", 0)),
+            session_tokens=int(os.getenv("TOKEN_BUDGET_SESSION", 0)),
+            ingestion_tokens=int(os.getenv("TOKEN_BUDGET_INGESTION", 0)),
+        )
+
+
+class TokenLedger:
+    """Thread-safe aggregation of prompt, completion and embedding tokens by scope.
+    Scopes are strings such as "session:<id>", "query:<id>" or "ingestion:<id>".
+    Each scope type ("query", "session", ...) has its own least-recently-used limit, so a
+    burst of queries never evicts the session totals that budgets are checked against."""
+
+    def __init__(self, max_scopes: int = 1000, max_sessions: int = 100000):
+        self.max_scopes = max_scopes
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._usage: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._totals = _empty_usage()
+
+    def record(self, scopes: List[str], model: str, prompt_tokens: int = 0,
+               completion_tokens: int = 0, embedding_tokens: int = 0):
+        """Add one call's usage to every given scope and to the process total."""
+        cost = estimate_cost(model, prompt_tokens + embedding_tokens, completion_tokens)
+        with self._lock:
+            for usage in [self._totals] + [self._scope(scope) for scope in scopes]:
+                usage["calls"] += 1
+                usage["prompt_tokens"] += prompt_tokens
+                usage["completion_tokens"] += completion_tokens
+                usage["embedding_tokens"] += embedding_tokens
+                usage["cost_usd"] += cost
+
+    @staticmethod
+    def _scope_type(scope: str) -> str:
+        return scope.split(":", 1)[0]
+
+    def _scope(self, scope: str) -> Dict[str, Any]:
+        scope_type = self._scope_type(scope)
+        scopes = self._usage.setdefault(scope_type, OrderedDict())
+        usage = scopes.get(scope)
+        if usage is None:
+            usage = scopes[scope] = _empty_usage()
+            limit = self.max_sessions if scope_type == "session" else self.max_scopes
+            while len(scopes) > limit:
+                scopes.popitem(last=False)
+        else:
+            scopes.move_to_end(scope)
+        return usage
+
+    def get_usage(self, scope: str) -> Dict[str, Any]:
+        """Get the usage of one scope (zeros if nothing was recorded)."""
+        with self._lock:
+            usage = dict(self._usage.get(self._scope_type(scope), {}).get(scope) or _empty_usage())
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"] + usage["embedding_tokens"]
+        usage["cost_usd"] = round(usage["cost_usd"], 6)
+        return usage
+
+    def get_totals(self) -> Dict[str, Any]:
+        """Get the usage of the whole process."""
+        with self._lock:
+            usage = dict(self._totals)
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"] + usage["embedding_tokens"]
+        usage["cost_usd"] = round(usage["cost_usd"], 6)
+        return usage
+
+
+# Process-wide ledger shared by the PDF processor and the agent
+LEDGER = TokenLedger()
+
+
+def record_embedding_usage(scopes: List[str], texts: List[str], model: Optional[str] = None,
+                           ledger: TokenLedger = LEDGER) -> int:
+    """Record the estimated tokens of texts sent to the embeddings API; returns the count."""
+    tokens = sum(estimate_tokens(text) for text in texts)
+    ledger.record(scopes, model or DEFAULT_EMBEDDING_MODEL, embedding_tokens=tokens)
+    return tokens